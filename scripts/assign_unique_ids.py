@@ -2,12 +2,59 @@
 Assign Unique Numeric IDs to Master_Database
 Adds a new 'id' column with sequential numeric IDs (1, 2, 3...)
 Independent of Student_ID and Source_Sheet
+
+Participations reference students by these ids, so their student_id is
+renumbered in the same save.
 """
 
-import pandas as pd
 import os
+import sys
 from datetime import datetime
 
+from startup import lazy_import
+from workbook_session import WorkbookSession
+
+pd = lazy_import('pandas')
+
+PARTICIPATIONS_SHEET = 'Participations'
+
+
+def assign_numeric_ids(df):
+    """
+    Master_Database frame with sequential ids 1..n as its first column.
+    
+    Drops fully empty rows and any existing 'id' column first.
+    """
+    df = df.dropna(how='all').drop(columns=['id'], errors='ignore')
+    df.insert(0, 'id', range(1, len(df) + 1))
+    return df
+
+
+def id_mapping(old_ids, new_ids):
+    """{old id: new id} of the rows assign_numeric_ids kept; old ids seen twice map to None"""
+    mapping = {}
+    for old, new in zip(old_ids, new_ids):
+        if old != old:  # rows without an id yet
+            continue
+        mapping[old] = None if old in mapping else new
+    return mapping
+
+
+def remap_student_ids(participations, mapping):
+    """
+    Participations frame with student_id renumbered through mapping.
+
+    Ids not in mapping are kept. Raises ValueError if a participation
+    references an id more than one student had.
+    """
+    ambiguous = sorted({v for v in participations['student_id'] if v in mapping and mapping[v] is None})
+    if ambiguous:
+        raise ValueError(f"Participations reference ids shared by several students: {ambiguous[:10]}")
+    df = participations.copy()
+    df['student_id'] = df['student_id'].map(lambda v: mapping.get(v, v))
+    return df
+
+
 class UniqueIDAssigner:
     def __init__(self, file_path=None):
         if file_path is None:
@@ -16,9 +63,45 @@ class UniqueIDAssigner:
             file_path = os.path.join(project_root, "data", "students.xlsx")
         
         self.file_path = file_path
+        self.total_students = 0
+        self.participations_remapped = 0
+        self.saved = False
+        self.backup_id = None
+        self.error = None
+    
+    def summary(self):
+        """Result of the last assign_ids() run, for --json-summary"""
+        summary = {
+            'success': self.error is None,
+            'total_students': self.total_students,
+            'participations_remapped': self.participations_remapped,
+            'saved': self.saved,
+            'backup': self.backup_id,
+        }
+        if self.error is not None:
+            summary['error'] = self.error
+        return summary
+    
+    def _fail(self, message):
+        self.error = message
+        return False
+        
+    def assign_ids(self, regenerate=None, session=None, save=True):
+        """
+        Assign unique numeric IDs to Master_Database sheet
+        
+        Args:
+            regenerate: What to do when an 'id' column already exists. True
+                replaces it, False cancels, None asks (interactive runs only).
+            session: Open WorkbookSession to work on instead of self.file_path
+            save: If False, only update the session's Master_Database frame
+                and leave writing the file to the caller
+        """
+        self.error = None
+        owns_session = session is None
+        if session is not None:
+            self.file_path = session.file_path
         
-    def assign_ids(self):
-        """Assign unique numeric IDs to Master_Database sheet"""
         print("=" * 80)
         print("🔢 UNIQUE ID ASSIGNMENT")
         print("=" * 80)
@@ -28,42 +111,57 @@ class UniqueIDAssigner:
         
         if not os.path.exists(self.file_path):
             print(f"\n❌ ERROR: File not found at {self.file_path}")
-            return False
+            return self._fail(f'File not found: {self.file_path}')
         
         try:
             # Read Excel file
             print("\n📖 Reading Excel file...")
-            excel_file = pd.ExcelFile(self.file_path)
+            if owns_session:
+                session = WorkbookSession(self.file_path)
             
-            if 'Master_Database' not in excel_file.sheet_names:
+            if not session.has_sheet('Master_Database'):
                 print("❌ ERROR: Master_Database sheet not found!")
-                return False
+                return self._fail('Master_Database sheet not found')
             
             # Load Master_Database
-            df = pd.read_excel(self.file_path, sheet_name='Master_Database')
+            df = session.sheet('Master_Database').copy()
             print(f"✓ Loaded Master_Database: {len(df)} rows")
             
             # Check if 'id' column already exists
             if 'id' in df.columns:
                 print("\n⚠️  WARNING: 'id' column already exists!")
-                response = input("Do you want to regenerate IDs? (yes/no): ").strip().lower()
-                if response not in ['yes', 'y']:
+                if regenerate is None:
+                    if not sys.stdin.isatty():
+                        print("❌ Not regenerating without confirmation (use --yes).")
+                        return self._fail("'id' column already exists; pass --yes to regenerate")
+                    response = input("Do you want to regenerate IDs? (yes/no): ").strip().lower()
+                    regenerate = response in ['yes', 'y']
+                if not regenerate:
                     print("❌ Operation cancelled.")
-                    return False
+                    return self._fail('Cancelled')
                 print("✓ Will regenerate IDs...")
             
-            # Remove empty rows (if any)
-            original_count = len(df)
-            df = df.dropna(how='all')
-            if len(df) < original_count:
-                print(f"✓ Removed {original_count - len(df)} empty rows")
-            
-            # Generate sequential IDs
+            # Remove empty rows (if any) and generate sequential IDs as the first column
+            original = df
             print(f"\n🔢 Generating unique numeric IDs...")
-            df.insert(0, 'id', range(1, len(df) + 1))  # Insert as first column
+            df = assign_numeric_ids(df)
+            if len(df) < len(original):
+                print(f"✓ Removed {len(original) - len(df)} empty rows")
+            self.total_students = len(df)
             
             print(f"✓ Assigned IDs: 1 to {len(df)}")
             
+            # Participations follow their students to the new ids
+            participations = None
+            if 'id' in original.columns and session.has_sheet(PARTICIPATIONS_SHEET):
+                current = session.sheet(PARTICIPATIONS_SHEET)
+                if not current.empty and 'student_id' in current.columns:
+                    mapping = id_mapping(original.loc[df.index, 'id'], df['id'])
+                    participations = remap_student_ids(current, mapping)
+                    changed = participations['student_id'].ne(current['student_id']) & current['student_id'].notna()
+                    self.participations_remapped = int(changed.sum())
+                    print(f"✓ Renumbered student_id of {self.participations_remapped} participations")
+            
             # Show sample
             print("\n📋 Sample ID assignments:")
             print("-" * 80)
@@ -73,29 +171,25 @@ class UniqueIDAssigner:
             if len(df) > 10:
                 print("\n   ... and {} more students\n".format(len(df) - 10))
             
-            # Backup original file
-            backup_path = self.file_path.replace('.xlsx', f'_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx')
-            print(f"\n💾 Creating backup: {os.path.basename(backup_path)}")
+            session.set_sheet('Master_Database', df)
+            if participations is not None:
+                session.set_sheet(PARTICIPATIONS_SHEET, participations)
+            if not save:
+                print("\n✓ IDs assigned (not saved yet)")
+                return True
             
-            import shutil
-            shutil.copy2(self.file_path, backup_path)
-            print("✓ Backup created")
+            # Backup original file
+            print(f"\n💾 Creating backup snapshot...")
+            backup = session.backup(label='assign_ids')
+            self.backup_id = backup['id']
+            print(f"✓ Backup created: {backup['id']}")
             
             # Save updated Master_Database
             print(f"\n💾 Saving updated Master_Database...")
             
-            # Read all sheets
-            all_sheets = {}
-            for sheet_name in excel_file.sheet_names:
-                if sheet_name == 'Master_Database':
-                    all_sheets[sheet_name] = df
-                else:
-                    all_sheets[sheet_name] = pd.read_excel(self.file_path, sheet_name=sheet_name)
-            
-            # Write all sheets back
-            with pd.ExcelWriter(self.file_path, engine='openpyxl', mode='w') as writer:
-                for sheet_name, sheet_df in all_sheets.items():
-                    sheet_df.to_excel(writer, sheet_name=sheet_name, index=False)
+            # Only Master_Database and Participations are rewritten, the other sheets are copied as-is
+            session.save()
+            self.saved = True
             
             print("✓ File saved successfully!")
             
@@ -106,7 +200,7 @@ class UniqueIDAssigner:
             print(f"Total students: {len(df)}")
             print(f"ID range: 1 to {len(df)}")
             print(f"Column position: First column")
-            print(f"Backup created: {os.path.basename(backup_path)}")
+            print(f"Backup created: {backup['id']} (restore with scripts/backup_store.py)")
             print("\n✓ Master_Database is now ready for the Electron app!")
             print("=" * 80)
             
@@ -116,12 +210,32 @@ class UniqueIDAssigner:
             print(f"\n❌ ERROR: {e}")
             import traceback
             traceback.print_exc()
-            return False
+            return self._fail(str(e))
+        finally:
+            if owns_session and session is not None:
+                session.close()
 
 if __name__ == "__main__":
-    assigner = UniqueIDAssigner()
+    import argparse
+    
+    from run_log import add_output_arguments, configure_from_args, emit_summary, redirected_prints
+    
+    parser = argparse.ArgumentParser(description='Assign sequential numeric ids to Master_Database')
+    parser.add_argument('--file', '-f', default=None, help='Path to Excel file (default: data/students.xlsx)')
+    parser.add_argument('--yes', '-y', action='store_true',
+                        help='Regenerate ids without asking if the id column already exists')
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    
+    assigner = UniqueIDAssigner(args.file)
+    
+    with redirected_prints(args):
+        succeeded = assigner.assign_ids(regenerate=True if args.yes else None)
+        if succeeded:
+            print("\n🎉 Success! You can now run your Electron app.")
+        else:
+            print("\n❌ Failed to assign IDs. Please check the errors above.")
     
-    if assigner.assign_ids():
-        print("\n🎉 Success! You can now run your Electron app.")
-    else:
-        print("\n❌ Failed to assign IDs. Please check the errors above.")
\ No newline at end of file
+    emit_summary(assigner.summary())
+    sys.exit(0 if succeeded else 1)
\ No newline at end of file
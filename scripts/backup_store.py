@@ -0,0 +1,295 @@
+"""
+Workbook Backup Store
+Content-addressed snapshots of students.xlsx. Each zip part of the
+workbook is stored once, compressed, under its sha256; a snapshot is a
+small JSON list of part hashes. Saving one sheet only adds that sheet's
+part, so backups of small edits cost a few KB instead of a full copy.
+
+Usage:
+    python scripts/backup_store.py list
+    python scripts/backup_store.py snapshot
+    python scripts/backup_store.py restore 20260122_123328 [--output restored.xlsx]
+    python scripts/backup_store.py prune
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+import zlib
+from datetime import datetime, timedelta
+
+# Retention: every snapshot from the last few runs, one per hour for a
+# day, one per day for a month. Anything older is pruned.
+KEEP_LAST = 5
+HOURLY_FOR = timedelta(days=1)
+DAILY_FOR = timedelta(days=30)
+
+SNAPSHOT_TIME_FORMAT = '%Y%m%d_%H%M%S'
+
+
+def default_store_dir(file_path):
+    """data/students.xlsx -> data/backups/students"""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(directory, 'backups', stem)
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class BackupStore:
+    """Deduplicated snapshots of one workbook"""
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.objects_dir = os.path.join(store_dir, 'objects')
+        self.snapshots_dir = os.path.join(store_dir, 'snapshots')
+
+    @classmethod
+    def for_workbook(cls, file_path):
+        return cls(default_store_dir(file_path))
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _snapshot_path(self, snapshot_id):
+        return os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+
+    def _put(self, data):
+        """Store a part's bytes once; returns (hash, bytes newly written)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = zlib.compress(data, 6)
+        _write_atomic(path, compressed)
+        return digest, len(compressed)
+
+    def _get(self, digest):
+        with open(self._object_path(digest), 'rb') as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Backup object {digest[:12]} is corrupted")
+        return data
+
+    def _new_snapshot_id(self, created):
+        snapshot_id = created.strftime(SNAPSHOT_TIME_FORMAT)
+        suffix = 1
+        while os.path.exists(self._snapshot_path(snapshot_id)):
+            suffix += 1
+            snapshot_id = f"{created.strftime(SNAPSHOT_TIME_FORMAT)}_{suffix}"
+        return snapshot_id
+
+    def snapshot(self, file_path, label=None, prune=True):
+        """
+        Back up the workbook as it is now and return the snapshot record.
+
+        Only parts not already in the store are written.
+        """
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        created = datetime.now()
+        parts = []
+        added_bytes = 0
+        with zipfile.ZipFile(file_path) as zf:
+            for info in zf.infolist():
+                digest, written = self._put(zf.read(info.filename))
+                added_bytes += written
+                parts.append({
+                    'name': info.filename,
+                    'hash': digest,
+                    'size': info.file_size,
+                    'date_time': list(info.date_time),
+                })
+
+        record = {
+            'id': self._new_snapshot_id(created),
+            'created': created.isoformat(timespec='seconds'),
+            'label': label,
+            'workbook': os.path.basename(file_path),
+            'size': os.path.getsize(file_path),
+            'added_bytes': added_bytes,
+            'parts': parts,
+        }
+        _write_atomic(self._snapshot_path(record['id']),
+                      json.dumps(record, indent=2).encode('utf-8'))
+
+        if prune:
+            self.prune(now=created)
+        return record
+
+    def snapshots(self):
+        """All snapshot records, oldest first"""
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        records = []
+        for name in sorted(os.listdir(self.snapshots_dir)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.snapshots_dir, name), 'r', encoding='utf-8') as f:
+                    records.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(records, key=lambda record: (record['created'], record['id']))
+
+    def get(self, snapshot_id):
+        for record in self.snapshots():
+            if record['id'] == snapshot_id:
+                return record
+        raise KeyError(f"Snapshot '{snapshot_id}' not found")
+
+    def restore(self, snapshot_id, output_path):
+        """Rebuild the workbook of a snapshot at output_path"""
+        record = self.get(snapshot_id)
+        directory = os.path.dirname(os.path.abspath(output_path))
+        fd, tmp_path = tempfile.mkstemp(suffix='.xlsx', dir=directory)
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+                for part in record['parts']:
+                    info = zipfile.ZipInfo(part['name'], date_time=tuple(part['date_time']))
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    zf.writestr(info, self._get(part['hash']))
+            # mkstemp creates the file 0600: keep the workbook's mode, or use the default for a new file
+            if os.path.exists(output_path):
+                shutil.copymode(output_path, tmp_path)
+            else:
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(tmp_path, 0o666 & ~umask)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return record
+
+    def retained(self, records, now=None):
+        """Ids of the snapshots the retention policy keeps"""
+        now = now or datetime.now()
+        keep = {record['id'] for record in records[-KEEP_LAST:]}
+        hourly, daily = {}, {}
+        # Newest snapshot of each hour (last day) and each day (last month)
+        for record in records:
+            created = datetime.fromisoformat(record['created'])
+            age = now - created
+            if age <= HOURLY_FOR:
+                hourly[created.strftime('%Y%m%d%H')] = record['id']
+            if age <= DAILY_FOR:
+                daily[created.strftime('%Y%m%d')] = record['id']
+        return keep | set(hourly.values()) | set(daily.values())
+
+    def prune(self, now=None):
+        """Drop snapshots outside the retention policy and objects no snapshot uses"""
+        records = self.snapshots()
+        keep = self.retained(records, now)
+        removed = []
+        for record in records:
+            if record['id'] not in keep:
+                os.remove(self._snapshot_path(record['id']))
+                removed.append(record['id'])
+
+        used = {part['hash'] for record in records if record['id'] in keep for part in record['parts']}
+        if os.path.isdir(self.objects_dir):
+            for prefix in os.listdir(self.objects_dir):
+                prefix_dir = os.path.join(self.objects_dir, prefix)
+                for digest in os.listdir(prefix_dir):
+                    if digest not in used:
+                        os.remove(os.path.join(prefix_dir, digest))
+                if not os.listdir(prefix_dir):
+                    os.rmdir(prefix_dir)
+        return removed
+
+    def disk_usage(self):
+        """Bytes used by stored objects"""
+        total = 0
+        for root, _, files in os.walk(self.objects_dir):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return total
+
+
+def backup_workbook(file_path, label=None):
+    """Snapshot a workbook into its default store; returns the snapshot record"""
+    return BackupStore.for_workbook(file_path).snapshot(file_path, label=label)
+
+
+def restore_workbook(file_path, snapshot_id, output_path=None):
+    """
+    Restore a snapshot of a workbook, over the workbook itself by default.
+
+    Before overwriting the workbook its current state is snapshotted too.
+    The store is only pruned once the restore is done, so making room for
+    that safety snapshot can never remove the one being restored.
+    Returns (restored record, safety record or None).
+    """
+    store = BackupStore.for_workbook(file_path)
+    store.get(snapshot_id)
+    output_path = output_path or file_path
+    safety = None
+    if os.path.abspath(output_path) == os.path.abspath(file_path) and os.path.exists(file_path):
+        # Keep the current state restorable too
+        safety = store.snapshot(file_path, label='before-restore', prune=False)
+    record = store.restore(snapshot_id, output_path)
+    store.prune()
+    return record, safety
+
+
+def _format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    default_file = os.path.join(os.path.dirname(script_dir), 'data', 'students.xlsx')
+
+    parser = argparse.ArgumentParser(description='List, create and restore workbook backups')
+    parser.add_argument('--file', '-f', default=default_file, help='Workbook the backups belong to')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='List snapshots')
+    commands.add_parser('snapshot', help='Back up the workbook now')
+    restore_parser = commands.add_parser('restore', help='Restore a snapshot')
+    restore_parser.add_argument('snapshot_id')
+    restore_parser.add_argument('--output', '-o', help='Write here instead of over the workbook')
+    commands.add_parser('prune', help='Apply the retention policy')
+    args = parser.parse_args()
+
+    store = BackupStore.for_workbook(args.file)
+
+    if args.command == 'list':
+        records = store.snapshots()
+        if not records:
+            print("No backups yet")
+        for record in records:
+            label = f"  [{record['label']}]" if record.get('label') else ''
+            print(f"{record['id']}  {record['created']}  {_format_size(record['size'])}"
+                  f"  (+{_format_size(record['added_bytes'])}){label}")
+        print(f"\nStore size: {_format_size(store.disk_usage())} in {store.store_dir}")
+
+    elif args.command == 'snapshot':
+        record = store.snapshot(args.file, label='manual')
+        print(f"📦 Snapshot {record['id']} (+{_format_size(record['added_bytes'])})")
+
+    elif args.command == 'restore':
+        output = args.output or args.file
+        _, safety = restore_workbook(args.file, args.snapshot_id, output)
+        if safety is not None:
+            print(f"📦 Previous workbook saved as snapshot {safety['id']}")
+        print(f"✅ Restored {args.snapshot_id} to {output}")
+
+    elif args.command == 'prune':
+        removed = store.prune()
+        print(f"🧹 Removed {len(removed)} snapshots")
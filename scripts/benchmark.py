@@ -0,0 +1,267 @@
+"""
+Benchmark Suite
+Times the data scripts on synthetic workbooks of several sizes and
+writes the results as JSON, so runs on different commits can be
+compared and regressions caught.
+
+Each benchmark runs in its own Python process on a fresh copy of the
+workbook, so peak memory is per benchmark and no run sees another's
+caches or edits. The 'startup' entries time a cold import of each
+script (best of three), which is what every spawned run pays first.
+
+Usage:
+    python scripts/benchmark.py                          # 1k, 10k, 100k rows
+    python scripts/benchmark.py --sizes 1000 10000 --output before.json
+    python scripts/benchmark.py --sizes 1000 --compare before.json
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_CACHE_DIR = os.path.join(PROJECT_ROOT, 'benchmarks', 'workbooks')
+DEFAULT_RESULTS_DIR = os.path.join(PROJECT_ROOT, 'benchmarks', 'results')
+# A benchmark counts as a regression when it gets this much slower
+REGRESSION_THRESHOLD = 0.20
+# Script modules whose cold start is tracked
+STARTUP_MODULES = ['data_pipeline', 'smart_consolidator', 'migrate_participation',
+                   'generate_student_ids', 'assign_unique_ids', 'excel_analyzer']
+
+
+def _drop_master_ids(path):
+    """assign_ids expects a Master_Database without an id column"""
+    import pandas as pd
+    from xlsx_package import write_sheet
+    master = pd.read_excel(path, sheet_name='Master_Database')
+    write_sheet(path, 'Master_Database', master.drop(columns=['id'], errors='ignore'))
+
+
+def _consolidate(path):
+    from smart_consolidator import SmartConsolidator
+    SmartConsolidator(path, full=True).consolidate()
+
+
+def _migrate_participations(path):
+    from migrate_participation import migrate_participations
+    migrate_participations(path)
+
+
+def _update_student_ids(path):
+    from generate_student_ids import update_student_ids
+    update_student_ids(path, reset=True)
+
+
+def _assign_ids(path):
+    from assign_unique_ids import UniqueIDAssigner
+    UniqueIDAssigner(path).assign_ids()
+
+
+def _pipeline(path):
+    from data_pipeline import DataPipeline
+    DataPipeline(path, full=True).run()
+
+
+def _analyze(path):
+    from excel_analyzer import ExcelAnalyzer
+    ExcelAnalyzer(path).analyze()
+
+
+# name -> (setup run before the clock starts or None, benchmark)
+BENCHMARKS = {
+    'consolidate': (None, _consolidate),
+    'migrate_participations': (None, _migrate_participations),
+    'update_student_ids': (None, _update_student_ids),
+    'assign_ids': (_drop_master_ids, _assign_ids),
+    'analyze': (None, _analyze),
+    'pipeline': (None, _pipeline),
+}
+
+
+def run_one(name, path, rows):
+    """Run one benchmark in this process and return its measurements"""
+    from workbook_session import peak_memory_mb
+
+    setup, benchmark = BENCHMARKS[name]
+    if setup is not None:
+        setup(path)
+
+    output = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        benchmark(path)
+    seconds = time.perf_counter() - started
+
+    peak = peak_memory_mb()
+    return {
+        'benchmark': name,
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'peak_rss_mb': round(peak, 1) if peak is not None else None,
+        'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def measure_startup(module, repeat=3):
+    """Cold import of a script module in a fresh interpreter, best of `repeat`"""
+    from startup import import_cost_ms
+
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        import_ms = import_cost_ms(module, cwd=SCRIPT_DIR)
+        runs.append((time.perf_counter() - started, import_ms))
+    seconds, import_ms = min(runs)
+    return {
+        'benchmark': f'startup:{module}',
+        'rows': 0,
+        'seconds': round(seconds, 3),
+        'import_ms': round(import_ms, 1),
+    }
+
+
+def workbook_for(rows, cache_dir, seed=42):
+    """Path of the synthetic workbook for this size, generating it once"""
+    from synthetic_workbook import generate_workbook
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f'students_{rows}_seed{seed}.xlsx')
+    if not os.path.exists(path):
+        print(f"🏗️  Generating synthetic workbook with {rows} students...")
+        tmp_path = f'{path}.tmp.xlsx'
+        generate_workbook(tmp_path, rows, seed=seed)
+        os.replace(tmp_path, path)
+    return path
+
+
+def run_isolated(name, source, rows):
+    """Run a benchmark in a child process on a scratch copy of the workbook"""
+    with tempfile.TemporaryDirectory(prefix='ugo_bench_') as scratch:
+        path = os.path.join(scratch, 'students.xlsx')
+        shutil.copy2(source, path)
+        command = [sys.executable, os.path.abspath(__file__), '--child', name, path, str(rows)]
+        result = subprocess.run(command, capture_output=True, text=True, cwd=scratch)
+
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines() or ['exit code %d' % result.returncode]
+        return {'benchmark': name, 'rows': rows, 'error': lines[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=PROJECT_ROOT,
+                               capture_output=True, text=True)
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() + ('-dirty' if dirty.stdout.strip() else '')
+
+
+def run_suite(sizes, names, cache_dir, seed=42):
+    results = []
+    if 'startup' in names:
+        for module in STARTUP_MODULES:
+            print(f"⏱️  startup:{module}...", end=' ', flush=True)
+            try:
+                result = measure_startup(module)
+            except RuntimeError as e:
+                result = {'benchmark': f'startup:{module}', 'rows': 0, 'error': str(e)}
+                print(f"❌ {result['error']}")
+            else:
+                print(f"{result['seconds'] * 1000:.0f} ms wall, {result['import_ms']:.0f} ms importing")
+            results.append(result)
+        names = [name for name in names if name != 'startup']
+
+    for rows in sizes:
+        source = workbook_for(rows, cache_dir, seed)
+        for name in names:
+            print(f"⏱️  {name} @ {rows} rows...", end=' ', flush=True)
+            result = run_isolated(name, source, rows)
+            results.append(result)
+            if 'error' in result:
+                print(f"❌ {result['error']}")
+            else:
+                print(f"{result['seconds']:.2f}s, {result['peak_rss_mb']} MB, {result['rows_per_sec']} rows/s")
+
+    return {
+        'revision': git_revision(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """Print per-benchmark changes against a baseline report; returns the regressions"""
+    previous = {(r['benchmark'], r['rows']): r for r in baseline.get('results', []) if 'error' not in r}
+    regressions = []
+    print(f"\n📊 Compared with {baseline.get('revision') or 'baseline'}:")
+    for result in current['results']:
+        key = (result['benchmark'], result['rows'])
+        if 'error' in result or key not in previous:
+            continue
+        before, after = previous[key]['seconds'], result['seconds']
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  ⚠️  REGRESSION'
+            regressions.append(key)
+        print(f"   {key[0]:<24} {key[1]:>7} rows  {before:8.2f}s -> {after:8.2f}s  ({change:+.0%}){flag}")
+    return regressions
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the data scripts on synthetic workbooks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Workbook sizes in students')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS) + ['startup'],
+                        help='Run only these benchmarks')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for the synthetic data')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Where generated workbooks are kept')
+    parser.add_argument('--output', '-o', help='Results file (default: benchmarks/results/<revision>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--child', nargs=3, metavar=('NAME', 'PATH', 'ROWS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        name, path, rows = args.child
+        print(json.dumps(run_one(name, path, int(rows))))
+        return 0
+
+    report = run_suite(args.sizes, args.only or ['startup'] + list(BENCHMARKS), args.cache_dir, args.seed)
+
+    output = args.output
+    if output is None:
+        os.makedirs(DEFAULT_RESULTS_DIR, exist_ok=True)
+        output = os.path.join(DEFAULT_RESULTS_DIR, f"{report['revision'] or 'unknown'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(report, baseline):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Data Pipeline
+Runs the data update steps in one process against one parsed workbook:
+consolidate the cohort sheets, fill in Student_IDs, then migrate
+participations. Every stage works on the same WorkbookSession, so each
+sheet is parsed at most once, and the workbook is backed up and written
+once at the end instead of after every script. Each stage is timed.
+
+With --backend sqlite the same stages run against the SQLite store
+(see sqlite_store; create it with `sqlite_store.py import`).
+
+Usage:
+    python scripts/data_pipeline.py
+    python scripts/data_pipeline.py --stages consolidate participations
+    python scripts/data_pipeline.py --file data/students.xlsx --json-summary --quiet
+    python scripts/data_pipeline.py --backend sqlite --db data/students.db
+"""
+
+import os
+import sys
+import time
+
+from run_log import log
+from workbook_session import BACKENDS, RunTimer, open_session
+
+
+def consolidate_stage(session, options):
+    from smart_consolidator import SmartConsolidator
+
+    consolidator = SmartConsolidator(session.file_path, full=options.get('full', False),
+                                     fuzzy=options.get('fuzzy', True))
+    consolidator.run(session, save=False)
+    summary = consolidator.summary()
+    summary.pop('saved', None)
+    summary.pop('backup', None)
+    return summary
+
+
+def student_ids_stage(session, options):
+    from generate_student_ids import update_student_ids
+
+    return update_student_ids(session, reset=options.get('reset_student_ids', False), save=False)
+
+
+def assign_ids_stage(session, options):
+    from assign_unique_ids import UniqueIDAssigner
+
+    assigner = UniqueIDAssigner(session.file_path)
+    assigner.assign_ids(regenerate=True, session=session, save=False)
+    return assigner.summary()
+
+
+def participations_stage(session, options):
+    from migrate_participation import migrate_participations
+
+    return migrate_participations(session, dry_run=options.get('dry_run', False),
+                                  full=options.get('full', False), save=False)
+
+
+# name -> stage(session, options) returning a summary dict with 'success'
+STAGES = {
+    'consolidate': consolidate_stage,
+    'student_ids': student_ids_stage,
+    # Renumbers every student (and their participations' student_id), so it is opt-in
+    'assign_ids': assign_ids_stage,
+    'participations': participations_stage,
+}
+DEFAULT_STAGES = ['consolidate', 'student_ids', 'participations']
+
+
+class DataPipeline:
+    """Named, timed stages sharing one workbook session and one save"""
+
+    def __init__(self, file_path=None, stages=None, backend='xlsx', **options):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        if file_path is None:
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            default = 'students.db' if backend == 'sqlite' else 'students.xlsx'
+            file_path = os.path.join(os.path.dirname(script_dir), 'data', default)
+
+        unknown = [name for name in stages or [] if name not in STAGES]
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {', '.join(unknown)}")
+
+        self.file_path = file_path
+        self.backend = backend
+        self.stages = list(stages or DEFAULT_STAGES)
+        self.options = options
+        self.results = []
+
+    def _timed(self, name, fn):
+        log.info(f"\n▶️  {name}")
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            log.exception(f"❌ {name} failed: {e}")
+            result = {'success': False, 'error': str(e)}
+        seconds = round(time.perf_counter() - started, 3)
+        self.results.append({**result, 'stage': name, 'seconds': seconds})
+        log.info(f"⏱️  {name}: {seconds:.2f}s")
+        return result
+
+    def run(self, session=None):
+        """
+        Run every stage, then save once; returns the summary.
+
+        session: an open session of self.file_path to reuse (for example
+        one kept warm between runs); one is opened otherwise.
+        """
+        timer = RunTimer()
+        self.results = []
+
+        if not os.path.exists(self.file_path):
+            log.error(f"❌ File not found: {self.file_path}")
+            return {'success': False, 'error': f'File not found: {self.file_path}'}
+
+        summary = {'success': True, 'saved': False, 'backup': None}
+        owns_session = session is None
+        if owns_session:
+            session = open_session(self.file_path, self.backend)
+        try:
+            for name in self.stages:
+                result = self._timed(name, lambda: STAGES[name](session, self.options))
+                if not result.get('success', True):
+                    # Nothing is written if any stage fails
+                    summary.update(success=False, error=f"{name}: {result.get('error', 'failed')}")
+                    break
+
+            if summary['success'] and session.has_changes:
+                def save():
+                    backup = session.backup(label='pipeline')
+                    session.save()
+                    return {'success': True, 'backup': backup['id']}
+
+                result = self._timed('save', save)
+                summary.update(saved=result['success'], backup=result.get('backup'))
+                if not result['success']:
+                    summary.update(success=False, error=f"save: {result['error']}")
+            elif summary['success']:
+                # Nothing to write, but stages may still record their state
+                session.save()
+        finally:
+            if owns_session:
+                session.close()
+
+        summary['stages'] = self.results
+        summary.update(timer.stats())
+
+        log.info("\n" + "=" * 80)
+        log.info("📊 PIPELINE SUMMARY")
+        log.info("=" * 80)
+        for result in self.results:
+            status = '✅' if result.get('success', True) else '❌'
+            log.info(f"  {status} {result['stage']:<16} {result['seconds']:8.2f}s")
+        log.info(f"  {'total':<19} {summary['seconds']:8.2f}s")
+        target = 'database' if self.backend == 'sqlite' else 'workbook'
+        if summary['saved']:
+            log.info(f"\n💾 {target.capitalize()} saved once (backup {summary['backup']})")
+        elif summary['success']:
+            log.info(f"\nℹ️  Nothing changed, {target} left untouched")
+        return summary
+
+
+def main():
+    import argparse
+
+    from run_log import add_output_arguments, configure_from_args, emit_summary, redirected_prints
+
+    parser = argparse.ArgumentParser(description='Consolidate, generate Student_IDs and migrate participations in one run')
+    parser.add_argument('--file', '-f', default=None, help='Path to Excel file (default: data/students.xlsx)')
+    parser.add_argument('--backend', choices=BACKENDS, default='xlsx',
+                        help='Store to work on: the workbook, or the SQLite database (default: xlsx)')
+    parser.add_argument('--db', default=None, help='SQLite database for --backend sqlite (default: data/students.db)')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=DEFAULT_STAGES,
+                        help=f"Stages to run, in order (default: {' '.join(DEFAULT_STAGES)})")
+    parser.add_argument('--full', action='store_true',
+                        help='Reprocess every cohort sheet and student, even if unchanged since the last run')
+    parser.add_argument('--no-fuzzy', action='store_true',
+                        help='Only merge students whose names match exactly')
+    parser.add_argument('--reset-student-ids', action='store_true',
+                        help='Regenerate ALL Student_IDs from 001 instead of only numbering new students')
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    file_path = args.db if args.backend == 'sqlite' else args.file
+    pipeline = DataPipeline(file_path, stages=args.stages, backend=args.backend, full=args.full,
+                            fuzzy=not args.no_fuzzy, reset_student_ids=args.reset_student_ids)
+    with redirected_prints(args):
+        summary = pipeline.run()
+
+    emit_summary(summary)
+    return 0 if summary['success'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
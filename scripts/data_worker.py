@@ -0,0 +1,233 @@
+"""
+Data Worker
+Long-lived Python process for the Electron app. It is started once and
+then takes requests over stdin/stdout, so pandas stays imported and the
+parsed workbook stays cached between clicks. The cache is dropped when
+the file's modification time or size changes, or when a request leaves
+unsaved changes behind; sheets a request wrote are re-parsed right after
+its response is sent, while the worker would otherwise be idle.
+
+Protocol: one JSON object per line.
+    request:  {"id": 1, "method": "pipeline", "params": {"file": "data/students.xlsx"}}
+    response: {"id": 1, "ok": true, "result": {...}, "seconds": 0.42}
+              {"id": 1, "ok": false, "error": "..."}
+
+Methods: ping, pipeline, consolidate, student_ids, assign_ids,
+migrate_participations, analyze, shutdown. The pipeline methods take
+"backend": "sqlite" to work on the SQLite store ("file" then names the
+database, default data/students.db). Only the response lines go to
+stdout; everything the scripts print or log goes to stderr.
+
+Usage:
+    python scripts/data_worker.py
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+# Imported up front so requests never pay for it
+import pandas as pd  # noqa: F401
+
+import run_log
+from data_pipeline import DataPipeline
+from workbook_session import open_session
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FILE = os.path.join(os.path.dirname(SCRIPT_DIR), 'data', 'students.xlsx')
+DEFAULT_DB = os.path.join(os.path.dirname(SCRIPT_DIR), 'data', 'students.db')
+
+
+def _stamp(file_path):
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SessionCache:
+    """One warm session, replaced when the file changes on disk"""
+
+    def __init__(self):
+        self.file_path = None
+        self.backend = None
+        self.session = None
+        self.stamp = None
+
+    def get(self, file_path, backend='xlsx'):
+        file_path = os.path.abspath(file_path)
+        stamp = _stamp(file_path)
+        if (self.session is None or self.file_path != file_path or self.backend != backend
+                or self.stamp != stamp):
+            self.drop()
+            self.file_path = file_path
+            self.backend = backend
+            self.session = open_session(file_path, backend)
+            # Written sheets are re-parsed (and re-mirrored) by warm() after the response
+            self.session.mirror_on_save = False
+            self.stamp = stamp
+        return self.session
+
+    def settle(self):
+        """
+        Call after each request: keep the session only if it matches the file.
+
+        A failed request can leave changes that were never written, and
+        those must not leak into the next one.
+        """
+        if self.session is None:
+            return
+        if self.session.has_changes or not os.path.exists(self.file_path):
+            self.drop()
+            return
+        self.session.close()
+        self.stamp = _stamp(self.file_path)
+
+    def warm(self):
+        """Re-parse the sheets the last request wrote, ready for the next one"""
+        if self.session is None or not self.session.written:
+            return
+        try:
+            for name in sorted(self.session.written):
+                if name in self.session.sheet_names:
+                    self.session.sheet(name)
+        except Exception:
+            self.drop()
+            return
+        self.session.close()
+
+    def drop(self):
+        if self.session is not None:
+            self.session.close()
+        self.session = None
+        self.stamp = None
+
+    @property
+    def cached_sheets(self):
+        return sorted(self.session.frames) if self.session is not None else []
+
+
+class DataWorker:
+    def __init__(self):
+        self.cache = SessionCache()
+        self.running = True
+
+    def _pipeline(self, params, stages, **options):
+        backend = params.get('backend', 'xlsx')
+        file_path = params.get('file') or (DEFAULT_DB if backend == 'sqlite' else DEFAULT_FILE)
+        if not os.path.exists(file_path):
+            return {'success': False, 'error': f'File not found: {file_path}'}
+        session = self.cache.get(file_path, backend)
+        pipeline = DataPipeline(file_path, stages=stages, backend=backend, full=params.get('full', False),
+                                fuzzy=params.get('fuzzy', True), **options)
+        return pipeline.run(session=session)
+
+    def ping(self, params):
+        return {'pid': os.getpid(), 'file': self.cache.file_path, 'cached_sheets': self.cache.cached_sheets}
+
+    def pipeline(self, params):
+        return self._pipeline(params, params.get('stages'),
+                              reset_student_ids=params.get('reset_student_ids', False))
+
+    def consolidate(self, params):
+        return self._pipeline(params, ['consolidate'])
+
+    def student_ids(self, params):
+        mode = params.get('mode', 'continue')
+        if mode not in ('reset', 'continue'):
+            raise ValueError(f"mode must be 'reset' or 'continue', not {mode!r}")
+        return self._pipeline(params, ['student_ids'], reset_student_ids=mode == 'reset')
+
+    def assign_ids(self, params):
+        return self._pipeline(params, ['assign_ids'])
+
+    def migrate_participations(self, params):
+        return self._pipeline(params, ['participations'], dry_run=params.get('dry_run', False))
+
+    def analyze(self, params):
+        from excel_analyzer import ExcelAnalyzer
+
+        file_path = params.get('file') or DEFAULT_FILE
+        if not os.path.exists(file_path):
+            return {'success': False, 'error': f'File not found: {file_path}'}
+        analyzer = ExcelAnalyzer(file_path, fast=params.get('fast', False))
+        report = io.StringIO()
+        with contextlib.redirect_stdout(report):
+            # Sheets the pipeline methods already parsed are profiled without reading the file again
+            succeeded = analyzer.analyze(session=self.cache.get(file_path))
+        sheets = {
+            name: {key: value for key, value in info.items() if key != 'dtypes'}
+            for name, info in analyzer.analysis.items()
+        }
+        return {'success': bool(succeeded), 'sheets': sheets, 'report': report.getvalue()}
+
+    def shutdown(self, params):
+        self.running = False
+        return {'success': True}
+
+    METHODS = ['ping', 'pipeline', 'consolidate', 'student_ids', 'assign_ids',
+               'migrate_participations', 'analyze', 'shutdown']
+
+    def handle(self, request):
+        """Response dict for one request dict"""
+        request_id = request.get('id')
+        method = request.get('method')
+        if method not in self.METHODS:
+            return {'id': request_id, 'ok': False, 'error': f'Unknown method: {method}'}
+
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                result = getattr(self, method)(request.get('params') or {})
+        except Exception as e:
+            run_log.log.exception(f"❌ {method} failed")
+            self.cache.drop()
+            return {'id': request_id, 'ok': False, 'error': str(e)}
+        finally:
+            self.cache.settle()
+        return {'id': request_id, 'ok': True, 'result': result,
+                'seconds': round(time.perf_counter() - started, 3)}
+
+    def serve(self, stdin, stdout):
+        for line in stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('request must be a JSON object')
+            except ValueError as e:
+                response = {'id': None, 'ok': False, 'error': f'Bad request: {e}'}
+            else:
+                response = self.handle(request)
+            try:
+                line = run_log.json_line(response)
+            except ValueError as e:
+                line = run_log.json_line({'id': response.get('id'), 'ok': False,
+                                          'error': f'Response could not be encoded: {e}'})
+            stdout.write(line + '\n')
+            stdout.flush()
+            if not self.running:
+                break
+            # Idle time: get the cache back in shape before the next request
+            with contextlib.redirect_stdout(sys.stderr):
+                self.cache.warm()
+        self.cache.drop()
+
+
+def main():
+    # Messages go to stderr; stdout carries only protocol lines
+    run_log.configure(json_summary=True)
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        DataWorker().serve(sys.stdin, stdout)
+    finally:
+        sys.stdout = stdout
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
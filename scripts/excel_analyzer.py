@@ -1,14 +1,190 @@
 """
 Excel Database Analyzer
 Analyzes the students.xlsx file and outputs all structure information
+
+With --fast, sheets are profiled in one streaming pass in constant
+memory: distinct counts are HyperLogLog estimates and sample values are
+reservoir-sampled, while row, null and type counts stay exact.
+
+Each sheet's profile is cached in data/students.profile.json, keyed by
+the sheet's content fingerprint, so unchanged sheets are reported from
+the cache without being parsed again. Sheets that do need profiling
+are read from their Parquet mirror when it is fresh (see sheet_mirror).
 """
 
-import pandas as pd
+import hashlib
+import math
 import os
+import random
+import sys
 from datetime import datetime
 
+from profile_cache import load_profiles, profile_path, save_profiles
+from sheet_mirror import SheetMirror, available as mirror_available
+from startup import lazy_import
+from xlsx_package import sheet_fingerprints
+from xlsx_stream import SheetStream, open_workbook
+
+pd = lazy_import('pandas')
+
+
+class ColumnAccumulator:
+    """Running statistics for one column, fed batch by batch"""
+    
+    def __init__(self, name, sample_size=5):
+        self.name = name
+        self.sample_size = sample_size
+        self.count = 0
+        self.non_null = 0
+        self.values = set()
+        self.types = set()
+        self.samples = []
+    
+    def update(self, values):
+        for value in values:
+            self.count += 1
+            if value is None or (isinstance(value, str) and value == ''):
+                continue
+            self.non_null += 1
+            self.types.add(type(value).__name__)
+            self.add(value)
+    
+    def add(self, value):
+        """Track one non-null value"""
+        self.values.add(value)
+        if len(self.samples) < self.sample_size:
+            self.samples.append(value)
+    
+    @property
+    def dtype(self):
+        """Closest pandas dtype name for the values seen"""
+        if not self.types:
+            return 'float64'
+        if self.types == {'int'}:
+            return 'int64' if self.non_null == self.count else 'float64'
+        if self.types <= {'int', 'float'}:
+            return 'float64'
+        if self.types == {'bool'}:
+            return 'bool' if self.non_null == self.count else 'object'
+        if self.types == {'datetime'}:
+            return 'datetime64[ns]'
+        return 'object'
+    
+    def result(self):
+        return {
+            'name': self.name,
+            'dtype': self.dtype,
+            'non_null': self.non_null,
+            'null': self.count - self.non_null,
+            'unique': len(self.values),
+            'samples': self.samples,
+        }
+
+
+def _sketch_key(value):
+    """Bytes identifying a value, so that values equal in a set hash alike (1 == 1.0)"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return f'{type(value).__name__}:{value}'.encode('utf-8')
+
+
+class HyperLogLog:
+    """Distinct-count estimate kept in 2**precision one-byte registers"""
+    
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+    
+    @property
+    def relative_error(self):
+        """Standard error of the estimate (about 1.6% at the default precision)"""
+        return 1.04 / math.sqrt(len(self.registers))
+    
+    def add(self, value):
+        digest = hashlib.blake2b(_sketch_key(value), digest_size=8).digest()
+        x = int.from_bytes(digest, 'big')
+        bits = 64 - self.precision
+        index = x >> bits
+        # Position of the leftmost 1 in the remaining bits
+        rank = bits - (x & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def estimate(self):
+        m = len(self.registers)
+        zeros = self.registers.count(0)
+        if zeros:
+            # Linear counting is more accurate while many registers are empty
+            linear = m * math.log(m / zeros)
+            if linear <= 2.5 * m:
+                return round(linear)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        return round(alpha * m * m / sum(2.0 ** -r for r in self.registers))
+    
+    def __len__(self):
+        return self.estimate()
+
+
+class Reservoir:
+    """Uniform random sample of a stream of unknown length, in `size` slots"""
+    
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.items = []
+        self.seen = 0
+        self._rng = random.Random(seed)
+    
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            slot = self._rng.randrange(self.seen)
+            if slot < self.size:
+                self.items[slot] = item
+
+
+class SketchAccumulator(ColumnAccumulator):
+    """ColumnAccumulator in constant memory: estimated distinct count, random samples"""
+    
+    def __init__(self, name, sample_size=5):
+        super().__init__(name, sample_size)
+        self.values = HyperLogLog()
+        self.samples = Reservoir(sample_size)
+    
+    def add(self, value):
+        self.values.add(value)
+        self.samples.add(value)
+    
+    def result(self):
+        return {
+            **super().result(),
+            'unique_error': self.values.relative_error,
+            'samples': list(self.samples.items),
+        }
+
+
+def _unique_text(col):
+    """Distinct count for the report, with its 95% error bound when estimated"""
+    if 'unique_error' in col:
+        return f"~{col['unique']} (±{2 * col['unique_error']:.1%} at 95%)"
+    return str(col['unique'])
+
+
+def _json_profile(profile):
+    """Profile with plain JSON values (dtype names as text) and each column's null ratio"""
+    total_rows = max(profile['total_rows'], 1)
+    return {
+        **profile,
+        'columns': [
+            {**col, 'dtype': str(col['dtype']), 'null_ratio': round(col['null'] / total_rows, 4)}
+            for col in profile['columns']
+        ],
+    }
+
+
 class ExcelAnalyzer:
-    def __init__(self, file_path=None):
+    def __init__(self, file_path=None, chunk_size=None, fast=False, use_cache=True):
         # If no path provided, construct relative to script location
         if file_path is None:
             script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -16,10 +192,160 @@ class ExcelAnalyzer:
             file_path = os.path.join(project_root, "data", "students.xlsx")
         
         self.file_path = file_path
+        # Stream sheets in batches of this many rows (None = parse whole sheets)
+        self.chunk_size = chunk_size
+        # Approximate distinct counts and samples in one constant-memory pass
+        self.fast = fast
+        # Reuse cached profiles of sheets that have not changed
+        self.use_cache = use_cache
         self.analysis = {}
+        self.cached_sheets = []
+    
+    def print_key_fields(self, columns):
+        """Report which of the expected key fields the master sheet has"""
+        common_fields = {
+            'Name': ['Full_Name', 'Full Name', 'Name', 'Scholar Name', 'Scholar  Name'],
+            'District': ['District'],
+            'College': ['College', 'College Name', ' College Name '],
+            'Program': ['Program'],
+            'Source': ['Source_Sheet', 'Source Sheet', 'Cohort']
+        }
+        
+        print("\n🔍 Key Fields Detection:")
+        for field_type, possible_names in common_fields.items():
+            found = False
+            for possible_name in possible_names:
+                matching = [c for c in columns if str(c).strip().lower() == possible_name.lower()]
+                if matching:
+                    print(f"  {field_type}: '{matching[0]}' ✅")
+                    found = True
+                    break
+            if not found:
+                print(f"  {field_type}: Not found ❌")
+    
+    def profile_sheet_streaming(self, sheet_name, workbook=None):
+        """Profile a sheet in one streaming pass without loading it into pandas"""
+        stream = SheetStream(self.file_path, sheet_name, self.chunk_size, workbook=workbook)
+        accumulator = SketchAccumulator if self.fast else ColumnAccumulator
+        accumulators = None
+        total_rows = 0
+        non_empty_rows = 0
+        
+        for batch in stream:
+            if accumulators is None:
+                accumulators = [accumulator(name) for name in stream.header]
+            total_rows += len(batch)
+            non_empty_rows += sum(1 for row in batch if any(v is not None and v != '' for v in row))
+            for i, column_values in enumerate(zip(*batch)):
+                accumulators[i].update(column_values)
+        
+        if accumulators is None:
+            accumulators = [accumulator(name) for name in getattr(stream, 'header', [])]
         
-    def analyze(self):
-        """Analyze the Excel file and generate comprehensive report"""
+        return {
+            'total_rows': total_rows,
+            'non_empty_rows': non_empty_rows,
+            'columns': [acc.result() for acc in accumulators],
+        }
+    
+    def profile_frame(self, df, sample_size=5):
+        """
+        Profile a parsed sheet with whole-frame operations.
+
+        Null counts, unique counts and non-empty rows each come from one
+        call over the frame instead of one call per column. Returns the
+        same shape as profile_sheet_streaming(), plus each column's first
+        values ('head').
+        """
+        present = df.notna()
+        non_null = present.sum()
+        unique = df.nunique()
+        # Positions of each column's first `sample_size` non-null values
+        sampled = present & (present.cumsum() <= sample_size)
+        head = df.head(sample_size)
+        
+        columns = []
+        for i, name in enumerate(df.columns):
+            columns.append({
+                'name': name,
+                'dtype': df.dtypes.iloc[i],
+                'non_null': int(non_null.iloc[i]),
+                'null': len(df) - int(non_null.iloc[i]),
+                'unique': int(unique.iloc[i]),
+                'samples': df.iloc[:, i][sampled.iloc[:, i]].tolist(),
+                'head': head.iloc[:, i].tolist(),
+            })
+        
+        return {
+            'total_rows': len(df),
+            'non_empty_rows': int(present.any(axis=1).sum()),
+            'columns': columns,
+        }
+    
+    def report_sheet(self, sheet_name, profile, cached=False):
+        """Print one sheet's section of the report and store it in self.analysis"""
+        print("\n" + "─" * 80)
+        print(f"📄 SHEET: {sheet_name}")
+        if cached:
+            print("♻️  Unchanged since the last analysis (cached profile)")
+        print("─" * 80)
+        
+        total_rows = profile['total_rows']
+        columns = profile['columns']
+        
+        print(f"Total Rows: {total_rows}")
+        print(f"Total Columns: {len(columns)}")
+        print(f"Non-empty Rows: {profile['non_empty_rows']}")
+        
+        print(f"\n📝 COLUMNS ({len(columns)} total):")
+        print("-" * 80)
+        for i, col in enumerate(columns, 1):
+            sample_str = ", ".join([str(v)[:30] for v in col['samples'][:3]])
+            print(f"{i:3d}. {str(col['name']).strip()}")
+            print(f"     Type: {col['dtype']}")
+            print(f"     Non-null: {col['non_null']}/{total_rows} ({(col['non_null']/max(total_rows, 1)*100):.1f}%)")
+            print(f"     Unique values: {_unique_text(col)}")
+            if col['samples']:
+                print(f"     Sample: {sample_str}")
+            print()
+        
+        self.analysis[sheet_name] = {
+            'total_rows': total_rows,
+            'non_empty_rows': profile['non_empty_rows'],
+            'total_columns': len(columns),
+            'columns': [col['name'] for col in columns],
+            'dtypes': {col['name']: col['dtype'] for col in columns},
+            'column_stats': [
+                {key: value for key, value in col.items() if key not in ('dtype', 'head', 'null_ratio')}
+                for col in columns
+            ],
+        }
+        
+        has_id = 'id' in [str(col['name']).strip().lower() for col in columns]
+        print(f"{'✅' if has_id else '❌'} Has 'id' column: {has_id}")
+        
+        if sheet_name == 'Master_Database':
+            print("\n📊 MASTER DATABASE SPECIAL ANALYSIS:")
+            print("-" * 80)
+            
+            # Look for key identifier columns
+            for id_col in ['id', 'Student_ID', 'Student ID', 'student_id']:
+                matching = [col for col in columns if str(col['name']).strip().lower() == id_col.lower()]
+                if matching:
+                    col = matching[0]
+                    print(f"Found identifier: '{col['name']}'")
+                    print(f"  Unique values: {_unique_text(col)}")
+                    print(f"  Sample values: {col.get('head', col['samples'])}")
+            self.print_key_fields([col['name'] for col in columns])
+    
+    def analyze(self, session=None):
+        """
+        Analyze the Excel file and generate comprehensive report
+        
+        Args:
+            session: Open WorkbookSession of self.file_path to take the sheets
+                from, instead of parsing the file (ignored when streaming)
+        """
         print("=" * 80)
         print("📊 EXCEL DATABASE ANALYSIS REPORT")
         print("=" * 80)
@@ -32,102 +358,68 @@ class ExcelAnalyzer:
             return False
         
         try:
-            # Load Excel file
-            excel_file = pd.ExcelFile(self.file_path)
-            sheet_names = excel_file.sheet_names
+            streaming = bool(self.chunk_size or self.fast)
+            if streaming:
+                session = None
+            fingerprints = session.sheet_fingerprints() if session is not None else sheet_fingerprints(self.file_path)
+            sheet_names = list(fingerprints)
+            mode = 'fast' if self.fast else 'exact'
+            previous = load_profiles(self.file_path)
+            profiles = {}
             
             print(f"\n📋 Total Sheets Found: {len(sheet_names)}")
             print(f"Sheet Names: {', '.join(sheet_names)}\n")
+            if self.fast:
+                print("⚡ Fast mode: unique counts are HyperLogLog estimates and samples are random;")
+                print("   row, null and type counts are exact.\n")
             
-            # Analyze each sheet
-            for sheet_name in sheet_names:
-                print("\n" + "─" * 80)
-                print(f"📄 SHEET: {sheet_name}")
-                print("─" * 80)
-                
-                df = pd.read_excel(self.file_path, sheet_name=sheet_name)
-                
-                # Basic info
-                print(f"Total Rows: {len(df)}")
-                print(f"Total Columns: {len(df.columns)}")
-                print(f"Non-empty Rows: {df.dropna(how='all').shape[0]}")
-                
-                # Column details
-                print(f"\n📝 COLUMNS ({len(df.columns)} total):")
-                print("-" * 80)
-                
-                for i, col in enumerate(df.columns, 1):
-                    # Clean column name
-                    col_clean = str(col).strip()
-                    
-                    # Get column statistics
-                    non_null = df[col].notna().sum()
-                    null_count = df[col].isna().sum()
-                    unique_values = df[col].nunique()
-                    
-                    # Get data type
-                    dtype = df[col].dtype
-                    
-                    # Sample values (first 3 non-null)
-                    sample_values = df[col].dropna().head(3).tolist()
-                    sample_str = ", ".join([str(v)[:30] for v in sample_values])
+            # The workbook is only loaded if some sheet has to be parsed, and then only once
+            mirror = None
+            if not streaming and session is None and mirror_available():
+                mirror = SheetMirror(self.file_path, fingerprints=fingerprints)
+            workbook = None
+            try:
+                for sheet_name in sheet_names:
+                    entry = previous.get(sheet_name, {})
+                    # An exact profile also serves fast mode, not the other way round
+                    cached = (self.use_cache and entry.get('fingerprint') == fingerprints[sheet_name]
+                              and entry.get('mode') in (mode, 'exact'))
+                    if cached:
+                        profiles[sheet_name] = entry
+                        self.cached_sheets.append(sheet_name)
+                        self.report_sheet(sheet_name, entry['profile'], cached=True)
+                        continue
                     
-                    print(f"{i:3d}. {col_clean}")
-                    print(f"     Type: {dtype}")
-                    print(f"     Non-null: {non_null}/{len(df)} ({(non_null/len(df)*100):.1f}%)")
-                    print(f"     Unique values: {unique_values}")
-                    if sample_values:
-                        print(f"     Sample: {sample_str}")
-                    print()
-                
-                # Store analysis
-                self.analysis[sheet_name] = {
-                    'total_rows': len(df),
-                    'non_empty_rows': df.dropna(how='all').shape[0],
-                    'total_columns': len(df.columns),
-                    'columns': df.columns.tolist(),
-                    'dtypes': df.dtypes.to_dict()
-                }
-                
-                # Check for 'id' column
-                has_id = 'id' in [str(c).strip().lower() for c in df.columns]
-                print(f"{'✅' if has_id else '❌'} Has 'id' column: {has_id}")
-                
-                # If Master_Database, show more stats
-                if sheet_name == 'Master_Database':
-                    print("\n📊 MASTER DATABASE SPECIAL ANALYSIS:")
-                    print("-" * 80)
-                    
-                    # Look for key identifier columns
-                    potential_ids = ['id', 'Student_ID', 'Student ID', 'student_id']
-                    for id_col in potential_ids:
-                        matching_cols = [c for c in df.columns if str(c).strip().lower() == id_col.lower()]
-                        if matching_cols:
-                            col = matching_cols[0]
-                            print(f"Found identifier: '{col}'")
-                            print(f"  Unique values: {df[col].nunique()}")
-                            print(f"  Sample values: {df[col].head(5).tolist()}")
-                    
-                    # Check for common fields
-                    common_fields = {
-                        'Name': ['Full_Name', 'Full Name', 'Name', 'Scholar Name', 'Scholar  Name'],
-                        'District': ['District'],
-                        'College': ['College', 'College Name', ' College Name '],
-                        'Program': ['Program'],
-                        'Source': ['Source_Sheet', 'Source Sheet', 'Cohort']
+                    if streaming:
+                        if workbook is None:
+                            workbook = open_workbook(self.file_path)
+                        profile = self.profile_sheet_streaming(sheet_name, workbook)
+                    elif session is not None:
+                        profile = self.profile_frame(session.sheet(sheet_name))
+                    else:
+                        df = mirror.read(sheet_name) if mirror is not None else None
+                        if df is None:
+                            if workbook is None:
+                                workbook = pd.ExcelFile(self.file_path)
+                            df = workbook.parse(sheet_name)
+                            if mirror is not None:
+                                mirror.store(sheet_name, df)
+                        profile = self.profile_frame(df)
+                    profiles[sheet_name] = {
+                        'fingerprint': fingerprints[sheet_name],
+                        'mode': mode,
+                        'profile': _json_profile(profile),
                     }
-                    
-                    print("\n🔍 Key Fields Detection:")
-                    for field_type, possible_names in common_fields.items():
-                        found = False
-                        for possible_name in possible_names:
-                            matching = [c for c in df.columns if str(c).strip().lower() == possible_name.lower()]
-                            if matching:
-                                print(f"  {field_type}: '{matching[0]}' ✅")
-                                found = True
-                                break
-                        if not found:
-                            print(f"  {field_type}: Not found ❌")
+                    self.report_sheet(sheet_name, profile)
+            finally:
+                if workbook is not None:
+                    workbook.close()
+            
+            if profiles != previous:
+                try:
+                    save_profiles(self.file_path, profiles)
+                except OSError as e:
+                    print(f"\n⚠️  Could not save the profile cache: {e}")
             
             # Summary
             print("\n" + "=" * 80)
@@ -142,6 +434,9 @@ class ExcelAnalyzer:
                 print(f"  - Columns: {master['total_columns']}")
                 print(f"  - Has 'id' column: {'Yes' if 'id' in [str(c).lower() for c in master['columns']] else 'No'}")
             
+            print(f"\n🗂️  Profiles: {profile_path(self.file_path)} "
+                  f"({len(self.cached_sheets)} of {len(sheet_names)} sheets unchanged)")
+            
             print("\n✅ Analysis complete!")
             print("\n" + "=" * 80)
             print("📤 COPY THE OUTPUT ABOVE AND SEND TO CLAUDE")
@@ -151,9 +446,8 @@ class ExcelAnalyzer:
             print("\n📝 QUICK COLUMN REFERENCE:")
             print("-" * 80)
             for sheet_name in sheet_names:
-                df = pd.read_excel(self.file_path, sheet_name=sheet_name)
                 print(f"\n{sheet_name}:")
-                print(df.columns.tolist())
+                print(self.analysis[sheet_name]['columns'])
             
             return True
             
@@ -164,5 +458,23 @@ class ExcelAnalyzer:
             return False
 
 if __name__ == "__main__":
-    analyzer = ExcelAnalyzer()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Analyze the structure of students.xlsx')
+    parser.add_argument('--file', '-f', default=None, help='Path to Excel file (default: data/students.xlsx)')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Stream sheets in batches of this many rows to bound memory')
+    parser.add_argument('--fast', action='store_true',
+                        help='Estimate unique counts and sample values in one constant-memory pass')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Profile every sheet again instead of reusing cached profiles')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Run as usual, then report import time by module on stderr')
+    args = parser.parse_args()
+    if args.profile_startup:
+        from startup import profile_startup
+        sys.exit(profile_startup())
+    
+    analyzer = ExcelAnalyzer(args.file, chunk_size=args.chunk_size, fast=args.fast,
+                             use_cache=not args.no_cache)
     analyzer.analyze()
\ No newline at end of file
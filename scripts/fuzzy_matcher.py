@@ -0,0 +1,225 @@
+"""
+Fuzzy Name Matcher
+Finds likely duplicate students such as "Ram  Bahadur Thapa" and
+"Ram B. Thapa". Names are grouped into blocks by phonetic keys and
+contact number, so each name is only scored against a few candidates
+instead of every other name.
+"""
+
+import re
+from collections import defaultdict
+
+# Merge at or above this score
+MATCH_THRESHOLD = 0.90
+# Merges scoring below this are listed in the review report
+REVIEW_THRESHOLD = 0.96
+# Blocks bigger than this are too generic to be useful and are ignored
+MAX_BLOCK_SIZE = 1000
+
+_NON_LETTERS = re.compile(r'[^a-z]+')
+_NON_DIGITS = re.compile(r'\D+')
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+def name_tokens(name):
+    """'Ram  B. Thapa' -> ['ram', 'b', 'thapa']"""
+    if name is None:
+        return []
+    return _NON_LETTERS.sub(' ', str(name).lower()).split()
+
+
+def contact_key(contact):
+    """Last 10 digits of a phone number, or '' if it is too short to trust"""
+    if contact is None:
+        return ''
+    text = str(contact)
+    if text.endswith('.0'):
+        text = text[:-2]
+    digits = _NON_DIGITS.sub('', text)
+    return digits[-10:] if len(digits) >= 7 else ''
+
+
+def district_key(district):
+    if district is None:
+        return ''
+    text = ' '.join(str(district).lower().split())
+    return '' if text in ('nan', 'none') else text
+
+
+def soundex(token):
+    """Classic 4-character Soundex code"""
+    if not token:
+        return ''
+    code = token[0].upper()
+    last = _SOUNDEX_CODES.get(token[0], '')
+    for char in token[1:]:
+        digit = _SOUNDEX_CODES.get(char, '')
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in 'hw':
+            last = digit
+    return code.ljust(4, '0')
+
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def token_similarity(a, b):
+    """1.0 for equal tokens, 0.75 for an initial, trigram overlap for spelling variants"""
+    if a == b:
+        return 1.0
+    if len(a) == 1 or len(b) == 1:
+        return 0.75 if a[0] == b[0] else 0.0
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    score = len(grams_a & grams_b) / len(grams_a | grams_b)
+    return score if score >= 0.5 else 0.0
+
+
+def name_similarity(tokens_a, tokens_b):
+    """
+    Score two tokenized names between 0 and 1.
+
+    First and last names must agree; middle names may be abbreviated
+    or missing on one side at a small cost, but two different middle
+    names ("Ram Bahadur Thapa", "Ram Kumar Thapa") mean different people.
+    """
+    if not tokens_a or not tokens_b:
+        return 0.0
+    first = token_similarity(tokens_a[0], tokens_b[0])
+    last = token_similarity(tokens_a[-1], tokens_b[-1])
+    if first == 0.0 or last == 0.0:
+        return 0.0
+
+    middle_a, middle_b = tokens_a[1:-1], tokens_b[1:-1]
+    if not middle_a and not middle_b:
+        middle = 1.0
+    elif not middle_a or not middle_b:
+        middle = 0.6
+    else:
+        scores = [token_similarity(a, b) for a, b in zip(middle_a, middle_b)]
+        if 0.0 in scores:
+            return 0.0
+        middle = sum(scores) / max(len(middle_a), len(middle_b))
+
+    return (first + last + 0.5 * middle) / 2.5
+
+
+class _NameGroup:
+    """All indexed students sharing one tokenized name"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.entries = []
+        self.by_contact = defaultdict(list)
+        # (district, has contact) -> first entry, for picking the best-placed entry quickly
+        self.first_by_place = {}
+        self.first_without_contact = None
+
+    def add(self, entry):
+        _, _, district, contact = entry
+        self.entries.append(entry)
+        if contact:
+            self.by_contact[contact].append(entry)
+        else:
+            self.first_without_contact = self.first_without_contact or entry
+        self.first_by_place.setdefault((district, bool(contact)), entry)
+
+    def representatives(self, district, contact):
+        """The few entries that can score best for this district and contact"""
+        picks = list(self.by_contact.get(contact, ())) if contact else []
+        for place in ((district, False), (district, True), ('', False), ('', True)):
+            if place in self.first_by_place:
+                picks.append(self.first_by_place[place])
+        if self.first_without_contact is not None:
+            picks.append(self.first_without_contact)
+        picks.append(self.entries[0])
+        return picks
+
+
+class FuzzyNameIndex:
+    """Blocking index of known students that new names are matched against"""
+
+    def __init__(self, match_threshold=MATCH_THRESHOLD):
+        self.match_threshold = match_threshold
+        self.groups = {}
+        self.blocks = defaultdict(set)
+
+    def blocking_keys(self, tokens, contact):
+        """Blocks a name is stored in"""
+        keys = [f'p:{soundex(tokens[0])}:{soundex(tokens[-1])}', f'f:{tokens[0][0]}:{tokens[-1]}']
+        if len(tokens[0]) == 1:
+            keys.append(f'i:{tokens[0]}:{tokens[-1]}')
+        if contact:
+            keys.append(f'c:{contact}')
+        return keys
+
+    def probe_keys(self, tokens, contact):
+        """Blocks searched for a name; initials also search every first name with that letter"""
+        keys = [f'p:{soundex(tokens[0])}:{soundex(tokens[-1])}', f'i:{tokens[0][0]}:{tokens[-1]}']
+        if len(tokens[0]) == 1:
+            keys.append(f'f:{tokens[0]}:{tokens[-1]}')
+        if contact:
+            keys.append(f'c:{contact}')
+        return keys
+
+    def add(self, ref, name, district=None, contact=None):
+        tokens = tuple(name_tokens(name))
+        if not tokens:
+            return
+        district, contact = district_key(district), contact_key(contact)
+        group = self.groups.get(tokens)
+        if group is None:
+            group = self.groups[tokens] = _NameGroup(tokens)
+        group.add((ref, name, district, contact))
+        for key in self.blocking_keys(tokens, contact):
+            self.blocks[key].add(tokens)
+
+    def adjust(self, score, district, contact, entry):
+        """
+        Raise or lower a name score by how well district and contact agree.
+
+        Only called for names that already pass on their own: a shared
+        household phone must not turn siblings into one student.
+        """
+        _, _, entry_district, entry_contact = entry
+        if contact and entry_contact:
+            score += 0.2 if contact == entry_contact else -0.1
+        if district and entry_district:
+            score += 0.05 if district == entry_district else -0.15
+        return min(score, 1.0)
+
+    def match(self, name, district=None, contact=None):
+        """Best (ref, matched name, score) at or above the threshold, else None"""
+        tokens = tuple(name_tokens(name))
+        if not tokens:
+            return None
+        district, contact = district_key(district), contact_key(contact)
+
+        candidates = set()
+        for key in self.probe_keys(tokens, contact):
+            block = self.blocks.get(key, ())
+            if len(block) <= MAX_BLOCK_SIZE:
+                candidates.update(block)
+
+        best = None
+        for candidate in sorted(candidates):
+            name_score = name_similarity(tokens, candidate)
+            if name_score < self.match_threshold:
+                continue
+            for entry in self.groups[candidate].representatives(district, contact):
+                score = self.adjust(name_score, district, contact, entry)
+                if score >= self.match_threshold and (best is None or score > best[2]):
+                    best = (entry[0], entry[1], score)
+        return best
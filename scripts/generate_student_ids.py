@@ -1,257 +1,304 @@
-import pandas as pd
+import logging
 import sys
 from pathlib import Path
 
-def normalize_cohort(source_sheet):
+from startup import lazy_import
+from run_log import log, add_output_arguments, configure_from_args, emit_summary, redirected_prints
+from workbook_session import WorkbookSession
+
+pd = lazy_import('pandas')
+
+# Cohort number anywhere in a sheet name: 'ACC C2' -> 2, 'C1, Database' -> 1
+COHORT_NUMBER = r'C(\d+)'
+# Trailing sequence number of a Student_ID: UGO_C2_185 -> 185
+SEQUENCE_NUMBER = r'_\s*(\d+)\s*$'
+DEFAULT_COHORT = 'C1'
+
+
+def normalize_cohorts(source_sheets):
     """
-    Normalize cohort names to C1, C2, C3 format
+    Normalize Source_Sheet values to C1, C2, C3... format
     Examples:
       'ACC C1' -> 'C1'
       'C1' -> 'C1'
       'ACC C2' -> 'C2'
+      'C2, C1' -> 'C1' (lowest cohort wins)
       'Database' -> 'C1' (default)
     """
-    if not source_sheet or pd.isna(source_sheet):
-        return 'C1'
-    
-    source_sheet = str(source_sheet).upper().strip()
-    
-    # Extract C number (C1, C2, C3, etc.)
-    if 'C1' in source_sheet:
-        return 'C1'
-    elif 'C2' in source_sheet:
-        return 'C2'
-    elif 'C3' in source_sheet:
-        return 'C3'
-    elif 'C4' in source_sheet:
-        return 'C4'
-    elif 'C5' in source_sheet:
-        return 'C5'
-    else:
-        # Default to C1 for unknown cohorts
-        return 'C1'
+    numbers = (source_sheets.astype(object).where(source_sheets.notna(), '')
+               .astype(str).str.upper()
+               .str.extractall(COHORT_NUMBER)[0].astype(int)
+               .groupby(level=0).min())
+    cohorts = pd.Series(DEFAULT_COHORT, index=source_sheets.index, dtype=object)
+    cohorts.loc[numbers.index] = 'C' + numbers.astype(str)
+    return cohorts
 
 
-def get_max_sequence(existing_ids):
+def sequence_numbers(student_ids):
     """
-    Get the highest sequence number from existing IDs
-    Example: UGO_C2_185 -> returns 185
+    Sequence number of each Student_ID as a float Series (NaN where there is none)
+    Example: UGO_C2_185 -> 185
     """
-    max_seq = 0
-    for student_id in existing_ids:
-        if not student_id or pd.isna(student_id):
-            continue
-        try:
-            # Extract number at the end (e.g., UGO_C1_045 -> 045)
-            parts = str(student_id).split('_')
-            if len(parts) >= 3 and parts[0] == 'UGO':
-                seq_num = int(parts[-1])
-                if seq_num > max_seq:
-                    max_seq = seq_num
-        except (ValueError, IndexError):
-            continue
-    return max_seq
+    return pd.to_numeric(student_ids.astype(object).astype(str).str.extract(SEQUENCE_NUMBER, expand=False),
+                         errors='coerce')
+
+
+def get_max_sequence(student_ids):
+    """Highest sequence number among well-formed UGO_<cohort>_<n> IDs (0 if none)"""
+    ids = student_ids.dropna().astype(str)
+    sequences = sequence_numbers(ids)[ids.str.match(r'UGO_.*_')]
+    return int(sequences.max()) if sequences.notna().any() else 0
 
 
-def generate_student_id(sequence_number, cohort):
+def format_student_ids(sequences, cohorts):
     """
-    Generate Student ID in format: UGO_C1_001, UGO_C2_182, etc.
+    Generate Student IDs in format: UGO_C1_001, UGO_C2_182, etc.
     Global sequential numbering across all cohorts.
     """
     # Pad to 3 digits
-    sequence_str = str(sequence_number).zfill(3)
-    return f"UGO_{cohort}_{sequence_str}"
+    return 'UGO_' + cohorts.astype(str) + '_' + sequences.astype(int).astype(str).str.zfill(3)
 
 
-def update_student_ids(excel_path, reset=False):
+def assign_student_ids(df, reset=False):
     """
-    Update Master_Database sheet with unique Student_IDs
+    Fill in Student_IDs on a Master_Database frame (no file access)
     Global sequential numbering: Student 1 gets 001, Student 180 gets 180,
     Student 181 (could be C2) gets 181, new C1 student gets 182, etc.
     
     Args:
-        excel_path: Path to Excel file
+        df: Master_Database DataFrame; updated in place
         reset: If True, regenerate all IDs from 001. If False, continue from existing.
+    
+    Returns:
+        Summary dict with the number of IDs generated and per-cohort counts
     """
-    print(f"📖 Reading Excel file: {excel_path}")
+    log.info(f"📊 Found {len(df)} students in Master_Database")
     
-    try:
-        # Read all sheets
-        excel_file = pd.ExcelFile(excel_path)
-        
-        # Check if Master_Database exists
-        if 'Master_Database' not in excel_file.sheet_names:
-            print("❌ Master_Database sheet not found!")
-            return False
-        
-        # Read Master_Database
-        df = pd.read_excel(excel_path, sheet_name='Master_Database')
-        
-        print(f"📊 Found {len(df)} students in Master_Database")
-        
-        # ✅ Get current max sequence number
-        if reset:
-            print("🔄 RESET MODE: Regenerating all Student_IDs with global sequential numbering")
-            print("   All students get sequential numbers regardless of cohort\n")
-            current_sequence = 0
-            # Clear existing Student_IDs
+    if 'Source_Sheet' in df.columns:
+        cohorts = normalize_cohorts(df['Source_Sheet'])
+    else:
+        cohorts = pd.Series(DEFAULT_COHORT, index=df.index, dtype=object)
+    
+    # ✅ Get current max sequence number
+    if reset:
+        log.info("🔄 RESET MODE: Regenerating all Student_IDs with global sequential numbering")
+        log.info("   All students get sequential numbers regardless of cohort\n")
+        current_sequence = 0
+        # Clear existing Student_IDs
+        df['Student_ID'] = None
+    else:
+        if 'Student_ID' not in df.columns:
             df['Student_ID'] = None
+        existing_ids = df['Student_ID'].dropna()
+        current_sequence = get_max_sequence(existing_ids)
+        log.info(f"📝 Found {len(existing_ids)} existing Student_IDs")
+        log.info(f"🔢 Continuing from sequence number: {current_sequence + 1}\n")
+    
+    # ✅ Students with a valid ID keep it; the rest get the next numbers in row order
+    ids = df['Student_ID'].astype(object)
+    has_id = ids.notna() & ids.astype(str).str.startswith('UGO_')
+    missing = ~has_id
+    updates_count = int(missing.sum())
+    
+    sequences = sequence_numbers(ids.where(has_id))
+    new_sequences = pd.Series(range(current_sequence + 1, current_sequence + updates_count + 1),
+                              index=df.index[missing], dtype=float)
+    sequences.loc[missing] = new_sequences
+    current_sequence += updates_count
+    
+    if updates_count:
+        new_ids = format_student_ids(new_sequences, cohorts[missing])
+        df['Student_ID'] = ids
+        df.loc[missing, 'Student_ID'] = new_ids
+        df['Cohort'] = df['Cohort'].astype(object) if 'Cohort' in df.columns else None
+        df.loc[missing, 'Cohort'] = cohorts[missing]  # ✅ Also update Cohort column
+        
+        if log.isEnabledFor(logging.DEBUG):
+            sources = df['Source_Sheet'] if 'Source_Sheet' in df.columns else pd.Series('C1', index=df.index)
+            names = df['Full_Name'] if 'Full_Name' in df.columns else pd.Series('Unknown', index=df.index)
+            for idx, new_id in new_ids.items():
+                log.debug(f"  ✅ {str(sources[idx]):15} -> {cohorts[idx]}: {new_id} ({names[idx]})")
+    
+    # ✅ Per-cohort counts and sequence ranges
+    cohort_stats = sequences.groupby(cohorts).agg(['size', 'min', 'max'])
+    cohort_counts = df['Cohort'].value_counts() if 'Cohort' in df.columns else cohort_stats['size']
+    
+    return {
+        'students': len(df),
+        'generated': updates_count,
+        'last_sequence': current_sequence,
+        'cohorts': {
+            cohort: {
+                'students': int(cohort_counts.get(cohort, 0)),
+                'sequences': [int(stats['min']), int(stats['max'])] if pd.notna(stats['min']) else None,
+            }
+            for cohort, stats in cohort_stats.iterrows()
+        },
+    }
+
+
+def log_cohort_summary(df, result):
+    """Print the per-cohort counts, sequence ranges and sample IDs"""
+    log.info(f"\n📝 Total students: {len(df)}")
+    log.info(f"🔢 Sequence range: 001 - {result['last_sequence']:03d}")
+    
+    log.info(f"\n📊 Students per cohort:")
+    for cohort, stats in result['cohorts'].items():
+        if stats['sequences']:
+            range_info = f" (sequences {stats['sequences'][0]:03d} - {stats['sequences'][1]:03d})"
         else:
-            # Get existing IDs
-            existing_ids = df['Student_ID'].dropna().tolist() if 'Student_ID' in df.columns else []
-            current_sequence = get_max_sequence(existing_ids)
-            print(f"📝 Found {len(existing_ids)} existing Student_IDs")
-            print(f"🔢 Continuing from sequence number: {current_sequence + 1}\n")
+            range_info = ""
+        log.info(f"  {cohort}: {stats['students']} students{range_info}")
+    
+    # Show sample IDs per cohort
+    log.info("\n📋 Sample Student_IDs:")
+    for cohort in result['cohorts']:
+        cohort_students = df[df['Cohort'] == cohort] if 'Cohort' in df.columns else df[df['Student_ID'].str.contains(f'UGO_{cohort}_', na=False)]
+        if len(cohort_students) > 0:
+            sample_ids = cohort_students['Student_ID'].head(3).tolist()
+            log.info(f"  {cohort}: {', '.join(map(str, sample_ids))}")
+    
+    log.info("\n💡 Note: Student IDs use global sequential numbering.")
+    log.info("   New students (any cohort) will continue from the next sequence number.")
+
+
+def update_student_ids(source, reset=False, save=True):
+    """
+    Update Master_Database sheet with unique Student_IDs
+    
+    Args:
+        source: Path to Excel file, or an open WorkbookSession to work on
+        reset: If True, regenerate all IDs from 001. If False, continue from existing.
+        save: If False, only update the session's Master_Database frame and
+              leave writing the file to the caller
+    
+    Returns:
+        Summary dict; 'success' is False if the sheet is missing or an error occurred
+    """
+    owns_session = not isinstance(source, WorkbookSession)
+    session = WorkbookSession(source) if owns_session else source
+    log.info(f"📖 Reading Excel file: {session.file_path}")
+    
+    try:
+        # Check if Master_Database exists
+        if not session.has_sheet('Master_Database'):
+            log.error("❌ Master_Database sheet not found!")
+            return {'success': False, 'error': 'Master_Database sheet not found'}
         
-        # Generate Student_IDs
-        updates_count = 0
-        cohort_counts = {}
-        cohort_ranges = {}  # Track sequence ranges per cohort
+        df = session.sheet('Master_Database').copy()
+        result = assign_student_ids(df, reset=reset)
+        summary = dict(result, success=True, mode='reset' if reset else 'continue', saved=False)
         
-        for idx, row in df.iterrows():
-            # Get source sheet
-            source_sheet = row.get('Source_Sheet', 'C1')
-            normalized_cohort = normalize_cohort(source_sheet)
-            
-            # ✅ Check if already has valid ID (skip in non-reset mode)
-            if not reset:
-                current_id = row.get('Student_ID')
-                if pd.notna(current_id) and str(current_id).startswith('UGO_'):
-                    # Track cohort ranges
-                    try:
-                        seq = int(str(current_id).split('_')[-1])
-                        if normalized_cohort not in cohort_ranges:
-                            cohort_ranges[normalized_cohort] = {'min': seq, 'max': seq}
-                        else:
-                            cohort_ranges[normalized_cohort]['min'] = min(cohort_ranges[normalized_cohort]['min'], seq)
-                            cohort_ranges[normalized_cohort]['max'] = max(cohort_ranges[normalized_cohort]['max'], seq)
-                    except:
-                        pass
-                    
-                    cohort_counts[normalized_cohort] = cohort_counts.get(normalized_cohort, 0) + 1
-                    continue
-            
-            # Generate new ID with next sequence number
-            current_sequence += 1
-            new_id = generate_student_id(current_sequence, normalized_cohort)
-            
-            # Update dataframe
-            df.at[idx, 'Student_ID'] = new_id
-            df.at[idx, 'Cohort'] = normalized_cohort  # ✅ Also update Cohort column
+        if result['generated'] == 0:
+            log.info("ℹ️  All students already have Student_IDs")
+        elif save:
+            log.info(f"\n💾 Saving changes to Excel...")
             
-            # Track cohort ranges
-            if normalized_cohort not in cohort_ranges:
-                cohort_ranges[normalized_cohort] = {'min': current_sequence, 'max': current_sequence}
-            else:
-                cohort_ranges[normalized_cohort]['min'] = min(cohort_ranges[normalized_cohort]['min'], current_sequence)
-                cohort_ranges[normalized_cohort]['max'] = max(cohort_ranges[normalized_cohort]['max'], current_sequence)
-            
-            updates_count += 1
-            cohort_counts[normalized_cohort] = cohort_counts.get(normalized_cohort, 0) + 1
+            # Replace only Master_Database, other sheets are copied as-is
+            session.save_sheet('Master_Database', df)
+            summary['saved'] = True
             
-            original_cohort = row.get('Source_Sheet', 'Unknown')
-            if updates_count <= 10:  # Show first 10
-                print(f"  ✅ {original_cohort:15} -> {normalized_cohort}: {new_id} ({row.get('Full_Name', 'Unknown')})")
-        
-        if updates_count > 10:
-            print(f"  ... and {updates_count - 10} more")
-        
-        if updates_count == 0:
-            print("ℹ️  All students already have Student_IDs")
+            log.info(f"✅ Successfully generated {result['generated']} Student_IDs!")
         else:
-            print(f"\n💾 Saving changes to Excel...")
-            
-            # Save back to Excel (preserve other sheets)
-            with pd.ExcelWriter(excel_path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                df.to_excel(writer, sheet_name='Master_Database', index=False)
-            
-            print(f"✅ Successfully generated {updates_count} Student_IDs!")
-        
-        print(f"\n📝 Total students: {len(df)}")
-        print(f"🔢 Sequence range: 001 - {current_sequence:03d}")
-        
-        print(f"\n📊 Students per cohort:")
-        for cohort in sorted(cohort_counts.keys()):
-            count = len(df[df['Cohort'] == cohort]) if 'Cohort' in df.columns else cohort_counts.get(cohort, 0)
-            if cohort in cohort_ranges:
-                range_info = f" (sequences {cohort_ranges[cohort]['min']:03d} - {cohort_ranges[cohort]['max']:03d})"
-            else:
-                range_info = ""
-            print(f"  {cohort}: {count} students{range_info}")
-        
-        # Show sample IDs per cohort
-        print("\n📋 Sample Student_IDs:")
-        for cohort in sorted(cohort_counts.keys()):
-            cohort_students = df[df['Cohort'] == cohort] if 'Cohort' in df.columns else df[df['Student_ID'].str.contains(f'UGO_{cohort}_', na=False)]
-            if len(cohort_students) > 0:
-                sample_ids = cohort_students['Student_ID'].head(3).tolist()
-                print(f"  {cohort}: {', '.join(map(str, sample_ids))}")
+            session.set_sheet('Master_Database', df)
+            log.info(f"✅ Generated {result['generated']} Student_IDs (not saved yet)")
         
-        print("\n💡 Note: Student IDs use global sequential numbering.")
-        print("   New students (any cohort) will continue from the next sequence number.")
-        
-        return True
+        log_cohort_summary(df, result)
+        return summary
         
     except Exception as e:
-        print(f"❌ Error: {str(e)}")
+        log.error(f"❌ Error: {str(e)}")
         import traceback
         traceback.print_exc()
-        return False
+        return {'success': False, 'error': str(e)}
+    finally:
+        if owns_session:
+            session.close()
+
+
+def _confirm(question):
+    return input(question).strip().lower() in ['yes', 'y']
 
 
 def main():
-    print("=" * 80)
-    print("🎓 U-Go Student ID Generator (Global Sequential Numbering)")
-    print("=" * 80)
-    print()
-    
-    # Get Excel file path
-    if len(sys.argv) > 1:
-        excel_path = sys.argv[1]
-    else:
-        # Default path (adjust as needed)
-        excel_path = input("Enter path to students.xlsx: ").strip('"')
+    import argparse
     
-    # Verify file exists
-    if not Path(excel_path).exists():
-        print(f"❌ File not found: {excel_path}")
-        return
+    parser = argparse.ArgumentParser(description='Generate UGO_<cohort>_<n> Student_IDs in Master_Database')
+    parser.add_argument('path', nargs='?', help=argparse.SUPPRESS)
+    parser.add_argument('--file', '-f', help='Path to students.xlsx (asked for if omitted)')
+    parser.add_argument('--mode', choices=['reset', 'continue'],
+                        help='reset: regenerate ALL IDs from 001; continue: only number students without one')
+    parser.add_argument('--yes', '-y', action='store_true', help='Do not ask for confirmation')
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    interactive = sys.stdin.isatty() and not args.json_summary
     
-    # ✅ Ask for reset mode
-    print(f"\n📁 File: {excel_path}")
-    print("   Format: UGO_C1_001, UGO_C2_182, UGO_C1_183, etc.")
-    print("   (Sequential numbering across all cohorts)\n")
-    
-    print("Choose mode:")
-    print("  1. RESET - Regenerate ALL IDs starting from 001")
-    print("  2. CONTINUE - Keep existing IDs and generate sequential IDs for new students")
-    
-    mode = input("\nEnter choice (1 or 2): ").strip()
-    
-    reset_mode = (mode == '1')
-    
-    if reset_mode:
-        print("\n⚠️  RESET MODE: This will regenerate ALL Student_IDs from 001")
-        confirm = input("Are you sure? (yes/no): ").strip().lower()
-        if confirm not in ['yes', 'y']:
-            print("❌ Cancelled")
-            return
-    else:
-        confirm = input("\nContinue? (yes/no): ").strip().lower()
-        if confirm not in ['yes', 'y']:
-            print("❌ Cancelled")
-            return
-    
-    # Update Student IDs
-    success = update_student_ids(excel_path, reset=reset_mode)
-    
-    if success:
-        print("\n" + "=" * 80)
-        print("🎉 Done! Student_IDs have been generated and saved.")
+    with redirected_prints(args):
         print("=" * 80)
-    else:
-        print("\n❌ Failed to update Student_IDs")
+        print("🎓 U-Go Student ID Generator (Global Sequential Numbering)")
+        print("=" * 80)
+        print()
+        
+        # Get Excel file path
+        excel_path = args.file or args.path
+        if excel_path is None and interactive:
+            excel_path = input("Enter path to students.xlsx: ").strip('"')
+        elif excel_path is None:
+            excel_path = str(Path(__file__).resolve().parent.parent / 'data' / 'students.xlsx')
+        
+        # Verify file exists
+        if not Path(excel_path).exists():
+            print(f"❌ File not found: {excel_path}")
+            emit_summary({'success': False, 'error': f'File not found: {excel_path}'})
+            return 1
+        
+        print(f"\n📁 File: {excel_path}")
+        print("   Format: UGO_C1_001, UGO_C2_182, UGO_C1_183, etc.")
+        print("   (Sequential numbering across all cohorts)\n")
+        
+        mode = args.mode
+        if mode is None:
+            if not interactive:
+                print("❌ --mode reset|continue is required when not running interactively")
+                emit_summary({'success': False, 'error': '--mode is required'})
+                return 2
+            # ✅ Ask for reset mode
+            print("Choose mode:")
+            print("  1. RESET - Regenerate ALL IDs starting from 001")
+            print("  2. CONTINUE - Keep existing IDs and generate sequential IDs for new students")
+            mode = 'reset' if input("\nEnter choice (1 or 2): ").strip() == '1' else 'continue'
+        
+        reset_mode = mode == 'reset'
+        
+        if not args.yes:
+            if not interactive:
+                print("❌ --yes is required to modify the file when not running interactively")
+                emit_summary({'success': False, 'error': '--yes is required'})
+                return 2
+            if reset_mode:
+                print("\n⚠️  RESET MODE: This will regenerate ALL Student_IDs from 001")
+                confirmed = _confirm("Are you sure? (yes/no): ")
+            else:
+                confirmed = _confirm("\nContinue? (yes/no): ")
+            if not confirmed:
+                print("❌ Cancelled")
+                emit_summary({'success': False, 'error': 'Cancelled'})
+                return 1
+        
+        # Update Student IDs
+        summary = update_student_ids(excel_path, reset=reset_mode)
+        
+        if summary['success']:
+            print("\n" + "=" * 80)
+            print("🎉 Done! Student_IDs have been generated and saved.")
+            print("=" * 80)
+        else:
+            print("\n❌ Failed to update Student_IDs")
+    
+    emit_summary(summary)
+    return 0 if summary['success'] else 1
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
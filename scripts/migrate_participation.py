@@ -6,17 +6,32 @@ This script reads the 'Participation' column from Master_Database and creates
 individual participation records in the Participations sheet.
 """
 
-import pandas as pd
-import openpyxl
-from openpyxl import load_workbook
-from datetime import datetime
-import re
+from datetime import date, datetime
+import logging
 import os
+import sys
+
+from startup import lazy_import
+from run_log import log, ProgressBar, add_output_arguments, configure_from_args, emit_summary
+from run_manifest import manifest_path, load_manifest, save_manifest
+from participation_parser import extract_series, parse_text
+from sheet_mirror import read_sheet, sync_mirror
+from xlsx_package import append_rows, sheet_fingerprints, sheet_names as list_sheets, sheet_row_count, write_sheet
+from xlsx_stream import iter_frames, read_header
+from workbook_session import WorkbookSession
+
+pd = lazy_import('pandas')
 
 # Configuration
 EXCEL_FILE = 'data/students.xlsx'
 MASTER_SHEET = 'Master_Database'
 PARTICIPATIONS_SHEET = 'Participations'
+# Master_Database columns the migration needs when streaming
+MASTER_COLUMNS = ['id', 'Full_Name', 'Participation']
+PARTICIPATION_COLUMNS = [
+    'participation_id', 'student_id', 'event_name', 'event_date',
+    'event_type', 'role', 'hours', 'notes', 'created_at', 'updated_at'
+]
 
 def parse_participation_text(participation_text):
     """
@@ -27,220 +42,327 @@ def parse_participation_text(participation_text):
     - "Tech Conference 2023 | Participant | 8 hours"
     - "Volunteer Work, Community Service, 10 hours, 2023-06-20"
     
-    Returns list of participation dicts
+    Returns list of participation dicts (see participation_parser for
+    the compiled single-pass parser and the batch extract_series API)
     """
-    if not participation_text or pd.isna(participation_text):
-        return []
-    
-    # Convert to string and clean
-    text = str(participation_text).strip()
-    if not text or text.lower() in ['none', 'n/a', 'nil', '-']:
-        return []
-    
-    participations = []
-    
-    # Split by common delimiters (semicolon, newline, double space)
-    entries = re.split(r'[;\n]|(?:\s{2,})', text)
-    
-    for entry in entries:
-        entry = entry.strip()
-        if not entry or len(entry) < 3:
-            continue
-        
-        participation = {
-            'event_name': '',
-            'event_date': '',
-            'event_type': 'Other',
-            'role': 'Participant',
-            'hours': 0,
-            'notes': entry  # Store original text as notes
-        }
-        
-        # Try to extract event name (everything before date or special chars)
-        event_name_match = re.match(r'^([^|,\-:]+)', entry)
-        if event_name_match:
-            participation['event_name'] = event_name_match.group(1).strip()
-        else:
-            participation['event_name'] = entry[:50]  # First 50 chars
-        
-        # Try to extract date (YYYY-MM-DD, DD/MM/YYYY, DD-MM-YYYY)
-        date_patterns = [
-            r'\b(\d{4}-\d{2}-\d{2})\b',  # 2023-05-15
-            r'\b(\d{2}/\d{2}/\d{4})\b',  # 15/05/2023
-            r'\b(\d{2}-\d{2}-\d{4})\b',  # 15-05-2023
-        ]
-        
-        for pattern in date_patterns:
-            date_match = re.search(pattern, entry)
-            if date_match:
-                participation['event_date'] = date_match.group(1)
-                break
-        
-        # Try to extract event type
-        event_types = ['workshop', 'seminar', 'conference', 'volunteer', 
-                      'competition', 'training', 'webinar', 'hackathon']
-        entry_lower = entry.lower()
-        for event_type in event_types:
-            if event_type in entry_lower:
-                participation['event_type'] = event_type.capitalize()
-                break
-        
-        # Try to extract role
-        roles = ['participant', 'organizer', 'volunteer', 'speaker', 
-                'facilitator', 'coordinator', 'member']
-        for role in roles:
-            if role in entry_lower:
-                participation['role'] = role.capitalize()
-                break
-        
-        # Try to extract hours
-        hours_match = re.search(r'(\d+)\s*(?:hours?|hrs?|h)\b', entry_lower)
-        if hours_match:
-            participation['hours'] = int(hours_match.group(1))
-        
-        participations.append(participation)
-    
-    return participations
+    return parse_text(participation_text)
+
+
+def _normalized_dates(dates):
+    """event_date as comparable text: '' for blanks, YYYY-MM-DD for real dates"""
+    def normalize(value):
+        if value is None or (isinstance(value, float) and value != value):
+            return ''
+        if isinstance(value, (datetime, date)):
+            return value.strftime('%Y-%m-%d')
+        return str(value).strip()
+    return dates.map(normalize)
 
 
-def migrate_participations(excel_file, dry_run=False):
+def dedup_keys(records):
+    """
+    64-bit hash of (student_id, event_name, event_date, role) per record.
+
+    Names and roles are compared case- and whitespace-insensitively, so a
+    record re-typed in the sheet still counts as already migrated.
+    """
+    if records.empty:
+        return pd.Series([], dtype='uint64', index=records.index)
+    student_ids = pd.to_numeric(records['student_id'], errors='coerce').astype('Int64')
+    normalized = pd.DataFrame({
+        'student_id': student_ids.astype(str),
+        'event_name': records['event_name'].fillna('').astype(str).str.lower().str.split().str.join(' '),
+        'event_date': _normalized_dates(records['event_date']),
+        'role': records['role'].fillna('').astype(str).str.strip().str.lower(),
+    }, index=records.index)
+    return pd.util.hash_pandas_object(normalized, index=False)
+
+
+def text_hashes(students):
+    """{student id: hash of their Participation text} for change detection"""
+    texts = students['Participation'].fillna('').astype(str)
+    hashes = pd.util.hash_pandas_object(texts, index=False)
+    ids = students['id'].astype(int).astype(str)
+    return dict(zip(ids, hashes.map('{:016x}'.format)))
+
+
+def participations_fingerprint(excel_file, session=None):
+    """Content fingerprint of the saved Participations sheet, or None if there is none"""
+    if session is not None:
+        fingerprints = session.sheet_fingerprints([PARTICIPATIONS_SHEET])
+    else:
+        fingerprints = sheet_fingerprints(excel_file, [PARTICIPATIONS_SHEET])
+    return fingerprints.get(PARTICIPATIONS_SHEET)
+
+
+def print_batch(students, records):
+    """List each student's parsed participations (only shown with --verbose)"""
+    if not log.isEnabledFor(logging.DEBUG):
+        return
+    for label in records.index.unique():
+        student = students.loc[label]
+        participation_text = str(student['Participation'])
+        student_records = records.loc[[label]]
+        log.debug(f"👤 Student #{student['id']}: {student.get('Full_Name', 'Unknown')}")
+        log.debug(f"   📝 Original text: {participation_text[:80]}...")
+        log.debug(f"   ✅ Found {len(student_records)} participation(s)")
+        for record in student_records.itertuples(index=False):
+            log.debug(f"      ➜ [{record.participation_id}] {record.event_name[:40]} | "
+                  f"{record.event_type} | {record.hours}h")
+        log.debug('')
+
+
+def migrate_participations(excel_file, dry_run=False, chunk_size=None, full=False, save=True):
     """
     Main migration function
     
+    Safe to run repeatedly: records already in the Participations sheet are
+    not added again, and students whose Participation text has not changed
+    since the last run are skipped.
+    
     Args:
-        excel_file: Path to Excel file
+        excel_file: Path to Excel file, or an open WorkbookSession to work on
+            (its Master_Database frame is used, including unsaved changes)
         dry_run: If True, only print what would be done without modifying the file
+        chunk_size: If set, stream Master_Database in batches of this many rows
+            (ignored for a session, which already holds the sheet)
+        full: If True, reprocess every student instead of only changed ones
+        save: If False (session only), queue the new rows on the session and
+            leave writing the file to the caller's session.save()
     """
-    print("=" * 70)
-    print("📋 PARTICIPATION MIGRATION SCRIPT")
-    print("=" * 70)
-    print(f"📁 Excel file: {excel_file}")
-    print(f"🔍 Mode: {'DRY RUN (no changes)' if dry_run else 'LIVE (will modify file)'}")
-    print()
+    session = excel_file if isinstance(excel_file, WorkbookSession) else None
+    if session is not None:
+        excel_file = session.file_path
+    log.info("=" * 70)
+    log.info("📋 PARTICIPATION MIGRATION SCRIPT")
+    log.info("=" * 70)
+    log.info(f"📁 Excel file: {excel_file}")
+    log.info(f"🔍 Mode: {'DRY RUN (no changes)' if dry_run else 'LIVE (will modify file)'}")
+    log.info('')
     
     # Check if file exists
     if not os.path.exists(excel_file):
-        print(f"❌ Error: File not found: {excel_file}")
-        return
+        log.error(f"❌ Error: File not found: {excel_file}")
+        return {'success': False, 'error': f'File not found: {excel_file}'}
     
     # Read the Excel file
-    print("📖 Reading Excel file...")
+    log.info("📖 Reading Excel file...")
     try:
-        df_master = pd.read_excel(excel_file, sheet_name=MASTER_SHEET)
-        print(f"✅ Loaded {len(df_master)} students from {MASTER_SHEET}")
+        if session is not None:
+            df_master = session.sheet(MASTER_SHEET)
+            master_chunks = [df_master]
+            log.info(f"✅ Using {len(df_master)} students from {MASTER_SHEET}")
+        elif chunk_size:
+            read_header(excel_file, MASTER_SHEET)
+            master_chunks = iter_frames(excel_file, MASTER_SHEET, chunk_size, columns=MASTER_COLUMNS)
+            log.info(f"✅ Streaming {MASTER_SHEET} in batches of {chunk_size} rows")
+        else:
+            df_master = read_sheet(excel_file, MASTER_SHEET)
+            master_chunks = [df_master]
+            log.info(f"✅ Loaded {len(df_master)} students from {MASTER_SHEET}")
     except Exception as e:
-        print(f"❌ Error reading {MASTER_SHEET}: {e}")
-        return
+        log.error(f"❌ Error reading {MASTER_SHEET}: {e}")
+        return {'success': False, 'error': f'Error reading {MASTER_SHEET}: {e}'}
     
-    # Check if Participations sheet exists
-    workbook = load_workbook(excel_file)
+    # Check if Participations sheet exists (reads only the workbook manifest)
+    if session is not None:
+        sheet_names = session.sheet_names
+        master_rows = len(df_master)
+    else:
+        sheet_names = list_sheets(excel_file)
+        master_rows = max((sheet_row_count(excel_file, MASTER_SHEET) or 1) - 1, 0) if MASTER_SHEET in sheet_names else 0
     
-    if PARTICIPATIONS_SHEET in workbook.sheetnames:
-        df_participations = pd.read_excel(excel_file, sheet_name=PARTICIPATIONS_SHEET)
-        print(f"📋 Found existing {PARTICIPATIONS_SHEET} sheet with {len(df_participations)} records")
+    if PARTICIPATIONS_SHEET in sheet_names:
+        if session is not None:
+            df_participations = session.sheet(PARTICIPATIONS_SHEET)
+        else:
+            df_participations = read_sheet(excel_file, PARTICIPATIONS_SHEET)
+        log.info(f"📋 Found existing {PARTICIPATIONS_SHEET} sheet with {len(df_participations)} records")
         next_id = df_participations['participation_id'].max() + 1 if len(df_participations) > 0 else 1
     else:
-        print(f"📋 Creating new {PARTICIPATIONS_SHEET} sheet")
-        df_participations = pd.DataFrame(columns=[
-            'participation_id', 'student_id', 'event_name', 'event_date',
-            'event_type', 'role', 'hours', 'notes', 'created_at', 'updated_at'
-        ])
+        log.info(f"📋 Creating new {PARTICIPATIONS_SHEET} sheet")
+        df_participations = pd.DataFrame(columns=PARTICIPATION_COLUMNS)
         next_id = 1
     
-    print(f"🔢 Next participation ID will be: {next_id}")
-    print()
+    # Dedup index of what is already migrated
+    existing_keys = set(dedup_keys(df_participations).tolist())
+    
+    # Participation text hashes from the last run; only meaningful while the sheet
+    # is exactly as that run left it (not edited, restored or replaced since)
+    manifest_file = manifest_path(excel_file, 'participations')
+    manifest = load_manifest(manifest_file)
+    previous_hashes = {}
+    if not full and PARTICIPATIONS_SHEET in sheet_names:
+        pending = session is not None and (PARTICIPATIONS_SHEET in session.dirty
+                                           or PARTICIPATIONS_SHEET in session.appended)
+        if not pending and manifest.get('sheet') == participations_fingerprint(excel_file, session):
+            previous_hashes = manifest.get('students', {})
+        elif manifest.get('students'):
+            log.info(f"♻️  {PARTICIPATIONS_SHEET} changed since the last run, reprocessing every student")
+    current_hashes = {}
+    if previous_hashes:
+        log.info(f"♻️  Reprocessing only students whose Participation text changed (use --full for all)")
     
-    # Process each student
-    new_participations = []
+    log.info(f"🔢 Next participation ID will be: {next_id}")
+    log.info('')
+    
+    # Process students a batch at a time
+    new_frames = []
     students_with_data = 0
     total_participations_created = 0
+    total_students = 0
+    unchanged_students = 0
+    duplicate_records = 0
     
-    print("🔄 Processing students...")
-    print("-" * 70)
+    log.info("🔄 Processing students...")
+    log.info("-" * 70)
+    progress = ProgressBar(master_rows, 'Students')
     
-    for idx, student in df_master.iterrows():
-        student_id = student.get('id')
-        student_name = student.get('Full_Name', 'Unknown')
-        participation_text = student.get('Participation')
+    for df_master in master_chunks:
+        total_students += len(df_master)
+        progress.update(len(df_master))
         
-        # Skip if no student ID
-        if pd.isna(student_id):
+        # Skip students without an ID, or a batch without the columns we need
+        if 'id' not in df_master.columns or 'Participation' not in df_master.columns:
             continue
+        students = df_master[pd.to_numeric(df_master['id'], errors='coerce').notna()]
         
-        # Parse participation text
-        participations = parse_participation_text(participation_text)
+        # Skip students whose text is the same as last run
+        hashes = text_hashes(students)
+        current_hashes.update(hashes)
+        if previous_hashes:
+            changed = [previous_hashes.get(key) != value for key, value in hashes.items()]
+            unchanged_students += len(changed) - sum(changed)
+            students = students[changed]
         
-        if participations:
-            students_with_data += 1
-            print(f"👤 Student #{student_id}: {student_name}")
-            print(f"   📝 Original text: {participation_text[:80]}...")
-            print(f"   ✅ Found {len(participations)} participation(s)")
-            
-            for participation in participations:
-                new_participation = {
-                    'participation_id': next_id,
-                    'student_id': int(student_id),
-                    'event_name': participation['event_name'],
-                    'event_date': participation['event_date'],
-                    'event_type': participation['event_type'],
-                    'role': participation['role'],
-                    'hours': participation['hours'],
-                    'notes': participation['notes'],
-                    'created_at': datetime.now().isoformat(),
-                    'updated_at': datetime.now().isoformat()
-                }
-                
-                print(f"      ➜ [{next_id}] {participation['event_name'][:40]} | "
-                      f"{participation['event_type']} | {participation['hours']}h")
-                
-                new_participations.append(new_participation)
-                next_id += 1
-                total_participations_created += 1
-            
-            print()
+        # Explode and parse the whole Participation column at once
+        records = extract_series(students['Participation'])
+        if records.empty:
+            continue
+        records.insert(0, 'student_id', students.loc[records.index, 'id'].astype(int).to_numpy())
+        
+        # Keep only records not migrated before (or repeated within this run)
+        keys = dedup_keys(records)
+        fresh = ~keys.isin(existing_keys).to_numpy() & ~keys.duplicated().to_numpy()
+        duplicate_records += int((~fresh).sum())
+        records = records[fresh]
+        existing_keys.update(keys[fresh].tolist())
+        if records.empty:
+            continue
+        
+        count = len(records)
+        stamp = datetime.now().isoformat()
+        records.insert(0, 'participation_id', range(next_id, next_id + count))
+        records['created_at'] = stamp
+        records['updated_at'] = stamp
+        
+        students_with_data += records.index.nunique()
+        print_batch(students, records)
+        
+        new_frames.append(records.reset_index(drop=True))
+        next_id += count
+        total_participations_created += count
+    
+    progress.close()
+    
+    df_new = pd.concat(new_frames, ignore_index=True) if new_frames else pd.DataFrame(columns=PARTICIPATION_COLUMNS)
     
     # Summary
-    print("=" * 70)
-    print("📊 MIGRATION SUMMARY")
-    print("=" * 70)
-    print(f"👥 Total students processed: {len(df_master)}")
-    print(f"✅ Students with participation data: {students_with_data}")
-    print(f"📋 New participation records created: {total_participations_created}")
-    print(f"📝 Existing participation records: {len(df_participations)}")
-    print(f"📊 Total after migration: {len(df_participations) + total_participations_created}")
-    print()
+    log.info("=" * 70)
+    log.info("📊 MIGRATION SUMMARY")
+    log.info("=" * 70)
+    log.info(f"👥 Total students processed: {total_students}")
+    if unchanged_students:
+        log.info(f"♻️  Students skipped (text unchanged): {unchanged_students}")
+    if duplicate_records:
+        log.info(f"🔁 Records already migrated (skipped): {duplicate_records}")
+    log.info(f"✅ Students with participation data: {students_with_data}")
+    log.info(f"📋 New participation records created: {total_participations_created}")
+    log.info(f"📝 Existing participation records: {len(df_participations)}")
+    log.info(f"📊 Total after migration: {len(df_participations) + total_participations_created}")
+    log.info('')
+    
+    summary = {
+        'success': True,
+        'dry_run': dry_run,
+        'students': total_students,
+        'students_with_data': students_with_data,
+        'students_unchanged': unchanged_students,
+        'records_created': total_participations_created,
+        'records_skipped_as_duplicates': duplicate_records,
+        'records_existing': len(df_participations),
+        'records_total': len(df_participations) + total_participations_created,
+        'saved': False,
+    }
+    
+    def record_hashes():
+        save_manifest(manifest_file, {'students': current_hashes,
+                                      'sheet': participations_fingerprint(excel_file, session)})
     
     # Save to Excel if not dry run
-    if not dry_run and new_participations:
-        print("💾 Saving to Excel...")
+    if not dry_run and not df_new.empty:
+        total_records = len(df_participations) + len(df_new)
+        # New rows can go after the existing ones if the sheet has all their columns
+        can_append = len(df_participations.columns) > 0 and set(df_new.columns) <= set(df_participations.columns)
+        
+        if session is not None:
+            # Queue the rows on the session; they are written by session.save()
+            if PARTICIPATIONS_SHEET in sheet_names and can_append:
+                session.append_rows(PARTICIPATIONS_SHEET, df_new.reindex(columns=df_participations.columns))
+            else:
+                session.set_sheet(PARTICIPATIONS_SHEET, pd.concat([df_participations, df_new], ignore_index=True))
+            session.after_save(record_hashes)
+            if not save:
+                log.info(f"✅ {len(df_new)} records queued for {PARTICIPATIONS_SHEET} (not saved yet)")
+                log.info('')
+                log.info("✅ Migration complete!")
+                return summary
         
-        # Combine existing and new participations
-        df_new = pd.DataFrame(new_participations)
-        df_combined = pd.concat([df_participations, df_new], ignore_index=True)
+        log.info("💾 Saving to Excel...")
         
         try:
-            # Write back to Excel
-            with pd.ExcelWriter(excel_file, engine='openpyxl', mode='a', 
-                               if_sheet_exists='replace') as writer:
-                df_combined.to_excel(writer, sheet_name=PARTICIPATIONS_SHEET, index=False)
+            if session is not None:
+                session.save()
+            elif PARTICIPATIONS_SHEET in sheet_names and can_append:
+                # Append after the last used row; existing rows are not rewritten
+                append_rows(excel_file, PARTICIPATIONS_SHEET, df_new.reindex(columns=df_participations.columns))
+                record_hashes()
+            elif PARTICIPATIONS_SHEET in sheet_names:
+                write_sheet(excel_file, PARTICIPATIONS_SHEET, pd.concat([df_participations, df_new], ignore_index=True))
+                record_hashes()
+            else:
+                with pd.ExcelWriter(excel_file, engine='openpyxl', mode='a') as writer:
+                    df_new.to_excel(writer, sheet_name=PARTICIPATIONS_SHEET, index=False)
+                record_hashes()
+            if session is None:
+                # Keep the Parquet copy of the sheet in step with the file
+                sync_mirror(excel_file, [PARTICIPATIONS_SHEET])
             
-            print(f"✅ Successfully saved {len(df_combined)} records to {PARTICIPATIONS_SHEET}")
-            print(f"📁 File updated: {excel_file}")
+            log.info(f"✅ Successfully saved {total_records} records to {PARTICIPATIONS_SHEET} "
+                     f"({len(df_new)} appended)")
+            log.info(f"📁 File updated: {excel_file}")
+            summary['saved'] = True
         except Exception as e:
-            print(f"❌ Error saving to Excel: {e}")
-            print("\n📋 Here's the data that would have been saved:")
-            print(df_new.to_string())
+            log.error(f"❌ Error saving to Excel: {e}")
+            log.info("\n📋 Here's the data that would have been saved:")
+            log.info(df_new.to_string())
+            summary.update(success=False, error=f'Error saving to Excel: {e}')
     elif dry_run:
-        print("ℹ️  DRY RUN - No changes made to the file")
-        if new_participations:
-            print("\n📋 Preview of data that would be created:")
-            df_preview = pd.DataFrame(new_participations)
-            print(df_preview.to_string(max_rows=10))
+        log.info("ℹ️  DRY RUN - No changes made to the file")
+        if not df_new.empty:
+            log.info("\n📋 Preview of data that would be created:")
+            log.info(df_new.to_string(max_rows=10))
     else:
-        print("ℹ️  No new participations to add")
+        log.info("ℹ️  No new participations to add")
+        if PARTICIPATIONS_SHEET in sheet_names:
+            if session is not None and not save:
+                session.after_save(record_hashes)
+            else:
+                record_hashes()
     
-    print()
-    print("✅ Migration complete!")
+    log.info('')
+    log.info("✅ Migration complete!")
+    return summary
 
 
 def main():
@@ -260,13 +382,27 @@ def main():
         action='store_true',
         help='Perform a dry run without modifying the file'
     )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=None,
+        help='Stream Master_Database in batches of this many rows to bound memory'
+    )
+    parser.add_argument(
+        '--full',
+        action='store_true',
+        help='Reprocess every student, not only those whose Participation text changed'
+    )
     parser.add_argument(
         '--test',
         action='store_true',
         help='Test participation text parsing with sample data'
     )
     
+    add_output_arguments(parser)
+    
     args = parser.parse_args()
+    configure_from_args(args)
     
     if args.test:
         # Test the parser with sample data
@@ -303,7 +439,10 @@ def main():
         return
     
     # Run migration
-    migrate_participations(args.file, dry_run=args.dry_run)
+    summary = migrate_participations(args.file, dry_run=args.dry_run, chunk_size=args.chunk_size, full=args.full)
+    emit_summary(summary)
+    if not summary['success']:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,137 @@
+"""
+Participation Text Parser
+Turns free-text "Participation" cells into participation records.
+
+All patterns are compiled once. Each entry is scanned in a single pass
+by one regex that finds every keyword, hour count and date it contains;
+the fields are then chosen by the same precedence rules the original
+per-field searches used. Parsed cells are cached by text, since most
+students share a handful of event descriptions.
+
+extract_series() parses a whole column: cells are exploded into entries
+with pandas string methods and each distinct entry goes through the same
+parse_entry() as single cells do.
+"""
+
+import re
+from functools import lru_cache
+
+from startup import lazy_import
+
+pd = lazy_import('pandas')
+
+EVENT_TYPES = ['workshop', 'seminar', 'conference', 'volunteer',
+               'competition', 'training', 'webinar', 'hackathon']
+ROLES = ['participant', 'organizer', 'volunteer', 'speaker',
+         'facilitator', 'coordinator', 'member']
+# Cell values that mean "no participation"
+EMPTY_VALUES = {'none', 'n/a', 'nil', '-'}
+
+RECORD_COLUMNS = ['event_name', 'event_date', 'event_type', 'role', 'hours', 'notes']
+
+# Split by common delimiters (semicolon, newline, double space)
+ENTRY_SPLIT = re.compile(r'[;\n]|(?:\s{2,})')
+# Event name is everything before the first | , - or :
+EVENT_NAME = re.compile(r'^([^|,\-:]+)')
+
+_KEYWORDS = sorted(set(EVENT_TYPES) | set(ROLES), key=len, reverse=True)
+# Zero-width so overlapping hits are all seen, like separate searches would
+ENTRY_SCAN = re.compile(
+    r'(?=(?P<keyword>' + '|'.join(map(re.escape, _KEYWORDS)) + r')'
+    r'|(?P<hours>\d+)\s*(?:hours?|hrs?|h)\b'
+    r'|\b(?P<iso_date>\d{4}-\d{2}-\d{2})\b'
+    r'|\b(?P<slash_date>\d{2}/\d{2}/\d{4})\b'
+    r'|\b(?P<dash_date>\d{2}-\d{2}-\d{4})\b)'
+)
+# Date formats in order of preference, whatever their position in the text
+DATE_GROUPS = ('iso_date', 'slash_date', 'dash_date')
+
+
+def parse_entry(entry):
+    """One participation record from a single stripped entry"""
+    lower = entry.lower()
+    keywords = set()
+    hours = None
+    dates = {}
+    for match in ENTRY_SCAN.finditer(lower):
+        group = match.lastgroup
+        if group == 'keyword':
+            keywords.add(match.group('keyword'))
+        elif group == 'hours':
+            if hours is None:
+                hours = int(match.group('hours'))
+        elif group not in dates:
+            dates[group] = match.group(group)
+
+    name_match = EVENT_NAME.match(entry)
+    return {
+        'event_name': name_match.group(1).strip() if name_match else entry[:50],
+        'event_date': next((dates[group] for group in DATE_GROUPS if group in dates), ''),
+        'event_type': next((t.capitalize() for t in EVENT_TYPES if t in keywords), 'Other'),
+        'role': next((r.capitalize() for r in ROLES if r in keywords), 'Participant'),
+        'hours': hours or 0,
+        'notes': entry,  # Store original text as notes
+    }
+
+
+@lru_cache(maxsize=65536)
+def _parse_cached(text):
+    text = text.strip()
+    if not text or text.lower() in EMPTY_VALUES:
+        return ()
+    records = []
+    for entry in ENTRY_SPLIT.split(text):
+        entry = entry.strip()
+        if len(entry) < 3:
+            continue
+        records.append(parse_entry(entry))
+    return tuple(records)
+
+
+def _is_missing(value):
+    """pd.isna for one value, without importing pandas for plain strings"""
+    if isinstance(value, str):
+        return False
+    if isinstance(value, float):
+        return value != value
+    return bool(pd.isna(value))
+
+
+def parse_text(participation_text):
+    """List of participation dicts for one cell (empty for blank cells)"""
+    if not participation_text or _is_missing(participation_text):
+        return []
+    return [dict(record) for record in _parse_cached(str(participation_text))]
+
+
+def extract_entries(entries):
+    """
+    parse_entry over a Series of stripped entries.
+
+    Each distinct entry is parsed once and its record is mapped back onto
+    every row it appears in; the index is kept.
+    """
+    codes, unique = pd.factorize(entries, sort=False)
+    parsed = pd.DataFrame.from_records([parse_entry(entry) for entry in unique], columns=RECORD_COLUMNS)
+    result = parsed.iloc[codes]
+    result.index = entries.index
+    return result
+
+
+def extract_series(texts):
+    """
+    Parse a whole column at once.
+
+    Returns a flat DataFrame with one row per participation and the
+    RECORD_COLUMNS; its index repeats the index label of the cell each
+    row came from, so callers can join back to the source rows.
+    """
+    texts = texts[texts.notna()]
+    texts = texts[texts.astype(bool)].astype(str).str.strip()
+    texts = texts[(texts != '') & ~texts.str.lower().isin(EMPTY_VALUES)]
+
+    entries = texts.str.split(ENTRY_SPLIT.pattern, regex=True).explode().str.strip()
+    entries = entries[entries.str.len() >= 3]
+    if entries.empty:
+        return pd.DataFrame(columns=RECORD_COLUMNS, index=pd.Index([], name=texts.index.name))
+    return extract_entries(entries)
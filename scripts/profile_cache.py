@@ -0,0 +1,53 @@
+"""
+Sheet Profile Cache
+The analyzer's per-sheet profiles (columns, dtypes, null ratios, distinct
+counts, row counts) kept in a JSON file next to the workbook, keyed by
+each sheet's content fingerprint. Unchanged sheets are not profiled
+again, and other scripts can read a sheet's last known columns without
+parsing the workbook.
+
+    data/students.xlsx -> data/students.profile.json
+"""
+
+import os
+from datetime import datetime
+
+from run_manifest import manifest_path, load_manifest, save_manifest
+
+# Bump when the profile layout changes so old caches are ignored
+CACHE_VERSION = 1
+
+
+def profile_path(file_path):
+    return manifest_path(file_path, 'profile')
+
+
+def load_profiles(file_path):
+    """
+    {sheet name: entry} from the cache, or {} if there is none.
+
+    Each entry has the sheet's 'fingerprint' when it was profiled, the
+    'mode' ('exact' or 'fast') and the 'profile' itself.
+    """
+    data = load_manifest(profile_path(file_path))
+    if data.get('version') != CACHE_VERSION:
+        return {}
+    sheets = data.get('sheets')
+    return sheets if isinstance(sheets, dict) else {}
+
+
+def save_profiles(file_path, entries):
+    save_manifest(profile_path(file_path), {
+        'version': CACHE_VERSION,
+        'workbook': os.path.basename(file_path),
+        'updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'sheets': entries,
+    })
+
+
+def cached_columns(file_path):
+    """{sheet name: column names} as of the last analysis, whether or not the sheet changed since"""
+    return {
+        name: [col['name'] for col in entry['profile']['columns']]
+        for name, entry in load_profiles(file_path).items()
+    }
@@ -0,0 +1,162 @@
+"""
+Script Output
+Leveled logging, a throttled progress bar and a one-line JSON summary
+for the data scripts.
+
+Human-readable messages go through `log`; per-row detail is logged at
+DEBUG so it only appears with --verbose. With --json-summary the only
+thing written to stdout is a single JSON object at the end of the run,
+which is what the Electron app parses; messages go to stderr instead
+(or nowhere with --quiet).
+"""
+
+import contextlib
+import json
+import logging
+import math
+import os
+import sys
+import time
+
+log = logging.getLogger('ugo')
+
+_json_summary = False
+
+
+class _ConsoleHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout/sys.stderr currently are, so redirection still works"""
+
+    @property
+    def stream(self):
+        return sys.stderr if _json_summary else sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+_handler = _ConsoleHandler()
+_handler.setFormatter(logging.Formatter('%(message)s'))
+log.addHandler(_handler)
+log.setLevel(logging.INFO)
+log.propagate = False
+
+
+def add_output_arguments(parser):
+    """Add --verbose, --quiet and --json-summary to an argparse parser"""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--verbose', '-v', action='store_true', help='Also show per-row details')
+    group.add_argument('--quiet', '-q', action='store_true', help='Only show warnings and errors')
+    parser.add_argument('--json-summary', action='store_true',
+                        help='Print one JSON result on stdout; messages go to stderr')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Run as usual, then report import time by module on stderr')
+
+
+def configure(verbose=False, quiet=False, json_summary=False):
+    """Set up `log` for a script run"""
+    global _json_summary
+    _json_summary = json_summary
+
+    log.setLevel(logging.DEBUG if verbose else logging.WARNING if quiet else logging.INFO)
+
+
+def configure_from_args(args):
+    if getattr(args, 'profile_startup', False):
+        # Re-runs this command under -X importtime and exits with its status
+        from startup import profile_startup
+        sys.exit(profile_startup())
+    configure(verbose=args.verbose, quiet=args.quiet, json_summary=args.json_summary)
+
+
+@contextlib.contextmanager
+def redirected_prints(args):
+    """
+    Keep stdout clean for the JSON summary in scripts that still use print().
+
+    Their output goes to stderr with --json-summary, and is dropped with
+    --quiet.
+    """
+    if args.quiet:
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    elif args.json_summary:
+        with contextlib.redirect_stdout(sys.stderr):
+            yield
+    else:
+        yield
+
+
+def json_safe(value):
+    """value with NaN and infinite floats replaced by None (JSON.parse rejects them)"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+
+def json_line(value):
+    """One line of strict JSON; raises ValueError if it cannot be encoded"""
+    return json.dumps(json_safe(value), default=str, allow_nan=False)
+
+
+def emit_summary(summary):
+    """Print the machine-readable result (only in --json-summary mode)"""
+    if _json_summary:
+        sys.stdout.write(json_line(summary) + '\n')
+        sys.stdout.flush()
+
+
+class ProgressBar:
+    """
+    Progress shown at most every `interval` seconds.
+
+    Draws an in-place bar on an interactive terminal, and logs plain
+    percentage lines when output is piped (e.g. to the Electron app).
+    """
+
+    def __init__(self, total, label='Progress', interval=0.5, width=30):
+        self.total = max(int(total), 0)
+        self.label = label
+        self.interval = interval
+        self.width = width
+        self.done = 0
+        self._drawn = None
+        self._last = 0.0
+        self._stream = sys.stderr
+        self._interactive = self._stream.isatty() and log.isEnabledFor(logging.INFO)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def update(self, count=1):
+        self.done += count
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            self._draw()
+
+    def _draw(self):
+        if not self.total or self._drawn == self.done:
+            return
+        self._drawn = self.done
+        fraction = min(self.done / self.total, 1.0)
+        if self._interactive:
+            filled = int(self.width * fraction)
+            bar = '█' * filled + '░' * (self.width - filled)
+            self._stream.write(f"\r   {self.label} [{bar}] {self.done}/{self.total} ({fraction:.0%})")
+            self._stream.flush()
+        else:
+            log.info(f"   {self.label}: {self.done}/{self.total} ({fraction:.0%})")
+
+    def close(self):
+        self._draw()
+        if self._interactive and self.total:
+            self._stream.write('\n')
+            self._stream.flush()
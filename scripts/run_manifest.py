@@ -0,0 +1,39 @@
+"""
+Run Manifests
+Small JSON sidecar files kept next to the workbook so scripts can tell
+what changed since their last successful run.
+"""
+
+import json
+import os
+
+
+def manifest_path(file_path, tag):
+    """
+    data/students.xlsx + 'consolidator' -> data/students.consolidator.json
+
+    Other stores keep their extension, so their manifests never mix with
+    the workbook's: data/students.db -> data/students.db.consolidator.json
+    """
+    base, extension = os.path.splitext(file_path)
+    if extension.lower() != '.xlsx':
+        base = file_path
+    return f"{base}.{tag}.json"
+
+
+def load_manifest(path):
+    """Load a manifest, or an empty one if it is missing or unreadable"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, data):
+    """Write a manifest atomically so a crash never leaves half a file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True, default=str)
+    os.replace(tmp_path, path)
@@ -0,0 +1,298 @@
+"""
+Columnar Sheet Mirror
+A Parquet copy of each sheet of students.xlsx, so reads can skip the
+xlsx XML parse and memory-map a file instead:
+
+    data/students.xlsx -> data/mirror/students/Master_Database-1a2b3c4d.parquet
+
+Each file carries the fingerprint of the sheet it was made from and is
+only read while the sheet still has that fingerprint. A sheet is only
+mirrored if its Parquet copy reads back equal to the frame pandas
+parsed, so reading the mirror always gives the same frame as parsing
+the workbook. Columns mixing numbers, text and dates (common in the
+cohort sheets) are stored as text tagged with each value's type and
+decoded on read; sheets that still cannot be stored unchanged are
+simply read from the workbook.
+
+Sessions mirror the sheets they parse and refresh the ones they write
+on save. pyarrow is optional: without it nothing is mirrored and every
+read goes to the workbook as before.
+
+Usage:
+    python scripts/sheet_mirror.py                # mirror every stale sheet
+    python scripts/sheet_mirror.py --file data/students.xlsx
+"""
+
+import datetime
+import functools
+import hashlib
+import json
+import os
+import re
+import sys
+
+from startup import lazy_import
+from xlsx_package import sheet_fingerprints
+
+pd = lazy_import('pandas')
+
+FINGERPRINT_KEY = b'ugo_sheet_fingerprint'
+# Positions of the columns stored as type-tagged text
+TAGGED_KEY = b'ugo_tagged_columns'
+
+# Type tags for values of mixed columns: 'i:42', 's:n/a', 'dt:2024-01-31T00:00:00'
+_TAGS = {
+    bool: 'b', int: 'i', float: 'f', str: 's',
+    datetime.datetime: 'dt', datetime.date: 'd', datetime.time: 't',
+}
+_UNTAG = {
+    'b': lambda text: text == 'True',
+    'i': int,
+    'f': float,
+    's': str,
+    'dt': datetime.datetime.fromisoformat,
+    'd': datetime.date.fromisoformat,
+    't': datetime.time.fromisoformat,
+    'ts': lambda text: pd.Timestamp(text),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _pyarrow():
+    """(pyarrow, pyarrow.parquet), or None if pyarrow is not installed"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow, pyarrow.parquet
+
+
+def available():
+    return _pyarrow() is not None
+
+
+def default_mirror_dir(file_path):
+    """data/students.xlsx -> data/mirror/students"""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(directory, 'mirror', stem)
+
+
+def _tag(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    tag = _TAGS.get(type(value))
+    if tag is None and isinstance(value, pd.Timestamp):
+        tag = 'ts'
+    if tag is None:
+        raise TypeError(f"cannot mirror {type(value).__name__} values")
+    if tag in ('dt', 'd', 't', 'ts'):
+        return f'{tag}:{value.isoformat()}'
+    return f'{tag}:{value!r}' if tag == 'f' else f'{tag}:{value}'
+
+
+def _untag(text):
+    if text is None or text != text:
+        return float('nan')
+    tag, _, value = text.partition(':')
+    return _UNTAG[tag](value)
+
+
+def _encode(df):
+    """(frame Arrow can store, positions of tagged columns): mixed object columns become tagged text"""
+    tagged = []
+    encoded = df.copy(deep=False)
+    for i, name in enumerate(df.columns):
+        if df.dtypes.iloc[i] != object:
+            continue
+        column = df.iloc[:, i]
+        if len({type(value) for value in column.dropna()}) > 1:
+            encoded[name] = pd.Series([_tag(value) for value in column], index=df.index, dtype=object)
+            tagged.append(i)
+    return encoded, tagged
+
+
+def _decode(table):
+    """The frame a mirror file was made from"""
+    df = table.to_pandas()
+    tagged = json.loads((table.schema.metadata or {}).get(TAGGED_KEY, b'[]'))
+    for i in tagged:
+        name = df.columns[i]
+        df[name] = pd.Series([_untag(text) for text in df[name]], index=df.index, dtype=object)
+    # Missing text comes back from Arrow as None; pandas parses it as NaN
+    for i, name in enumerate(df.columns):
+        if i not in tagged and df.dtypes.iloc[i] == object and df[name].isna().any():
+            df[name] = df[name].where(df[name].notna(), float('nan'))
+    return df
+
+
+class SheetMirror:
+    """Parquet files for the sheets of one workbook"""
+
+    def __init__(self, file_path, mirror_dir=None, fingerprints=None):
+        self.file_path = file_path
+        self.mirror_dir = mirror_dir or default_mirror_dir(file_path)
+        # sheet_fingerprints() of the file, if the caller already has them
+        self._fingerprints = fingerprints
+
+    def sheet_path(self, sheet_name):
+        slug = re.sub(r'[^\w.-]+', '_', sheet_name).strip('_') or 'sheet'
+        digest = hashlib.sha1(sheet_name.encode('utf-8')).hexdigest()[:8]
+        return os.path.join(self.mirror_dir, f"{slug}-{digest}.parquet")
+
+    @property
+    def fingerprints(self):
+        """Current fingerprint of each sheet in the workbook (computed once, see forget_fingerprints)"""
+        if self._fingerprints is None:
+            self._fingerprints = sheet_fingerprints(self.file_path)
+        return self._fingerprints
+
+    def forget_fingerprints(self):
+        """Call after the workbook file changed"""
+        self._fingerprints = None
+
+    def fresh(self, sheet_name):
+        """True if the mirror of sheet_name matches the sheet in the workbook"""
+        arrow = _pyarrow()
+        path = self.sheet_path(sheet_name)
+        if arrow is None or not os.path.exists(path):
+            return False
+        try:
+            metadata = arrow[1].read_schema(path).metadata or {}
+        except (OSError, arrow[0].ArrowException):
+            return False
+        fingerprint = self.fingerprints.get(sheet_name)
+        return fingerprint is not None and metadata.get(FINGERPRINT_KEY) == fingerprint.encode()
+
+    def read(self, sheet_name):
+        """The sheet's frame from the mirror, or None if it is missing or stale"""
+        if not self.fresh(sheet_name):
+            return None
+        pa, pq = _pyarrow()
+        try:
+            table = pq.read_table(self.sheet_path(sheet_name), memory_map=True)
+        except (OSError, pa.ArrowException):
+            return None
+        return _decode(table)
+
+    def store(self, sheet_name, df):
+        """
+        Mirror a frame freshly parsed from the workbook; returns True if stored.
+
+        Nothing is stored when pyarrow is missing, the sheet's data cannot
+        be converted, or the copy would not read back as the same frame.
+        """
+        arrow = _pyarrow()
+        fingerprint = self.fingerprints.get(sheet_name)
+        if arrow is None or fingerprint is None:
+            return False
+        pa, pq = arrow
+
+        try:
+            encoded, tagged = _encode(df)
+            table = pa.Table.from_pandas(encoded, preserve_index=False)
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}),
+                FINGERPRINT_KEY: fingerprint.encode(),
+                TAGGED_KEY: json.dumps(tagged).encode(),
+            })
+            restored = _decode(table)
+        except (pa.ArrowException, TypeError, ValueError, KeyError):
+            self.discard(sheet_name)
+            return False
+        if not (restored.columns.equals(df.columns) and list(restored.dtypes) == list(df.dtypes)
+                and restored.equals(df)):
+            self.discard(sheet_name)
+            return False
+
+        path = self.sheet_path(sheet_name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.mirror_dir, exist_ok=True)
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+        except (OSError, pa.ArrowException):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        return True
+
+    def discard(self, sheet_name):
+        path = self.sheet_path(sheet_name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def read_sheet(file_path, sheet_name):
+    """One sheet as a DataFrame: from the mirror if it is fresh, else parsed (and mirrored)"""
+    mirror = SheetMirror(file_path)
+    df = mirror.read(sheet_name) if available() else None
+    if df is None:
+        df = pd.read_excel(file_path, sheet_name=sheet_name)
+        if available():
+            mirror.store(sheet_name, df)
+    return df
+
+
+def sync_mirror(file_path, sheet_names=None):
+    """
+    Mirror every sheet (or just sheet_names) whose mirror is missing or stale.
+
+    Returns {'mirrored': [...], 'fresh': [...], 'skipped': [...]}; skipped
+    sheets could not be stored and are read from the workbook.
+    """
+    result = {'mirrored': [], 'fresh': [], 'skipped': []}
+    if not available():
+        return result
+
+    mirror = SheetMirror(file_path)
+    names = [name for name in mirror.fingerprints if sheet_names is None or name in sheet_names]
+    stale = [name for name in names if not mirror.fresh(name)]
+    result['fresh'] = [name for name in names if name not in stale]
+    if stale:
+        with pd.ExcelFile(file_path, engine='openpyxl') as excel_file:
+            for name in stale:
+                stored = mirror.store(name, excel_file.parse(name))
+                result['mirrored' if stored else 'skipped'].append(name)
+    return result
+
+
+def main():
+    import argparse
+
+    from run_log import add_output_arguments, configure_from_args, emit_summary, log
+
+    parser = argparse.ArgumentParser(description='Mirror the workbook sheets as Parquet files for fast reads')
+    parser.add_argument('--file', '-f', default=None, help='Path to Excel file (default: data/students.xlsx)')
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    file_path = args.file
+    if file_path is None:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        file_path = os.path.join(os.path.dirname(script_dir), 'data', 'students.xlsx')
+    if not os.path.exists(file_path):
+        log.error(f"❌ File not found: {file_path}")
+        emit_summary({'success': False, 'error': f'File not found: {file_path}'})
+        return 1
+    if not available():
+        log.error("❌ pyarrow is not installed (pip install pyarrow)")
+        emit_summary({'success': False, 'error': 'pyarrow is not installed'})
+        return 1
+
+    result = sync_mirror(file_path)
+    log.info(f"🗂️  Mirror: {default_mirror_dir(file_path)}")
+    for name in result['mirrored']:
+        log.info(f"  ✅ {name}: mirrored")
+    for name in result['fresh']:
+        log.info(f"  ⏭️  {name}: already up to date")
+    for name in result['skipped']:
+        log.info(f"  ⚠️  {name}: cannot be stored as Parquet unchanged, read from the workbook")
+    emit_summary({'success': True, **result})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,19 +7,120 @@ Intelligently updates Master_Database with cohort sheet data:
 - Merges duplicate records by name
 """
 
-import pandas as pd
-import numpy as np
 from datetime import datetime
+import hashlib
+import json
 import os
 
+from profile_cache import cached_columns
+from run_manifest import manifest_path, load_manifest, save_manifest
+from startup import lazy_import
+from workbook_session import WorkbookSession, RunTimer
+from xlsx_stream import iter_frames, read_header
+from fuzzy_matcher import FuzzyNameIndex, REVIEW_THRESHOLD
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+# Sheets laid out like the accounting workbook; all others use the cohort layout
+ACC_SHEETS = ['ACC C1', 'ACC C2', 'Database']
+
+# Source header aliases for the student name, in order of preference
+NAME_COLUMNS = ['Full Name', 'Scholar  Name', 'Scholar Name', 'Full_Name']
+
+# Master column -> source header aliases (first non-empty alias wins)
+ACC_COLUMN_MAP = {
+    'Student_ID': ['Student_ID'],
+    'Cohort': ['Cohort'],
+    'District': ['District'],
+    'Contact_Number': ['Contact'],
+    'Program': ['Program'],
+    'College': [' College Name ', 'Name'],
+    'Current_Year': ['Studying year '],
+    'Scholarship_Starting_Year': ['U-Go Scholarship starting year'],
+    'Total_College_Fee': ['Total College Fee'],
+    'Total_Scholarship_Amount': ['U-Go Scholarship  (full course)'],
+    'Year_1_Fee': ['1st Year fee'],
+    'Year_1_Payment': ['1st Year Payment'],
+    'Year_2_Fee': ['2nd Year fee'],
+    'Year_2_Payment': ['2nd Year Payment'],
+    'Year_3_Fee': ['3rd Year fee'],
+    'Year_3_Payment': ['3rd Year Payment'],
+    'Year_4_Fee': ['4th Year fee'],
+    'Year_4_Payment': ['4th Year Payment'],
+    'Total_Amount_Paid': ['Total Amount paid '],
+    'Total_Due': ['Due'],
+    'Books_Total': ['Books'],
+    'Uniform_Total': ['Uniform'],
+    'Books_Uniform_Total': ['Total (Books + Uniform)'],
+    'Year_1_GPA': ['Year 1 GPA'],
+    'Year_2_GPA': ['Year 2 GPA'],
+    'Year_3_GPA': ['Year 3 GPA'],
+    'Year_4_GPA': ['Year 4 Gpa'],
+    'Overall_Status': ['Overall Status'],
+}
+
+COHORT_COLUMN_MAP = {
+    'District': ['District'],
+    'Address': ['Address'],
+    'Contact_Number': ['Contact Number'],
+    'Father_Name': ["Father's Name", 'Father_Name'],
+    'Father_Contact': ["Father's Contact", 'Father_Contact'],
+    'Mother_Name': ["Mother's Name", 'Mother_Name'],
+    'Mother_Contact': ["Mother's Contact", 'Mother_Contact'],
+    'Program': ['Program'],
+    'College': ['College'],
+    'Current_Year': ['Current Year'],
+    'Program_Structure': ['Program Structure (Year/Semester)'],
+    'Scholarship_Type': ['Scholarship type ', 'Scholarship Type'],
+    'Scholarship_Percentage': ['Scholarship %'],
+    'Scholarship_Starting_Year': ['Scholarship Starting Year'],
+    'Scholarship_Status': ['Scholarship Status'],
+    'Remarks': ['Remarks'],
+    'Year_1_GPA': ['Year 1 GPA'],
+    'Year_2_GPA': ['Year 2 GPA'],
+    'Year_3_GPA': ['Year 3 GPA'],
+    'Year_4_GPA': ['Year 4 Gpa'],
+    'Overall_Status': ['Overall Status'],
+    'Participation': ['Participation in Activities', 'Participation ', 'Participation'],
+}
+
+
+def header_key(header):
+    """Normalize a header for matching: drop Excel CR escapes, collapse whitespace"""
+    return ' '.join(str(header).replace('_x000d_', ' ').split())
+
+
+def is_blank(values):
+    """Boolean mask of null or whitespace-only cells"""
+    return values.isna() | values.astype(str).str.strip().eq('')
+
+
+def is_blank_frame(df):
+    """is_blank for every column of a DataFrame"""
+    return df.isna() | df.astype(str).apply(lambda col: col.str.strip().eq(''))
+
+
+NAME_COLUMN_KEYS = [header_key(col) for col in NAME_COLUMNS]
+
 class SmartConsolidator:
-    def __init__(self, file_path=None):
+    def __init__(self, file_path=None, chunk_size=None, full=False, fuzzy=True, workers=1):
         if file_path is None:
             script_dir = os.path.dirname(os.path.abspath(__file__))
             project_root = os.path.dirname(script_dir)
             file_path = os.path.join(project_root, "data", "students.xlsx")
         
         self.file_path = file_path
+        # Stream cohort sheets in batches of this many rows (None = parse whole sheets)
+        self.chunk_size = chunk_size
+        # Reprocess every cohort sheet, ignoring the last run's manifest
+        self.full = full
+        # Also match names that differ in spacing, initials or small typos
+        self.fuzzy = fuzzy
+        # Parse and map cohort sheets in this many processes (merge stays serial)
+        self.workers = workers or os.cpu_count() or 1
+        self.manifest_file = manifest_path(file_path, 'consolidator')
+        self.review_file = os.path.splitext(file_path)[0] + '_fuzzy_review.csv'
         self.master_columns = [
             'id',  # Numeric ID - FIRST COLUMN
             'Student_ID',
@@ -67,10 +168,21 @@ class SmartConsolidator:
         ]
         
         self.cohort_sheets = ['ACC C1', 'ACC C2', 'C1', 'C2', 'C3', 'Database']
+        self.session = None
+        self.stats = None
         self.existing_master = None
         self.new_records = []
         self.updated_count = 0
         self.added_count = 0
+        self.skipped_sheets = []
+        # Raw headers of the cohort sheets processed this run
+        self.headers = {}
+        # Sheet -> mapped headers gone since the last analysis, and the new ones
+        self.header_changes = {}
+        self.fuzzy_matches = []
+        self.backup_id = None
+        self.total_students = None
+        self.saved = False
         
     def clean_column_names(self, df):
         """Remove extra spaces and newlines from column names"""
@@ -87,8 +199,7 @@ class SmartConsolidator:
         """Load existing Master_Database"""
         print("\n📖 Loading existing Master_Database...")
         try:
-            df = pd.read_excel(self.file_path, sheet_name='Master_Database')
-            df = self.clean_column_names(df)
+            df = self.clean_column_names(self.session.sheet('Master_Database').copy())
             
             # Ensure id column exists
             if 'id' not in df.columns:
@@ -107,125 +218,267 @@ class SmartConsolidator:
             self.existing_master = pd.DataFrame(columns=self.master_columns)
             return self.existing_master
     
-    def process_cohort_sheet(self, sheet_name, df):
-        """Process a single cohort sheet"""
+    def column_map_for(self, sheet_name):
+        """Column mapping table for a cohort sheet"""
+        return ACC_COLUMN_MAP if sheet_name in ACC_SHEETS else COHORT_COLUMN_MAP
+    
+    def map_sheet(self, sheet_name, df):
+        """Map a whole cohort sheet onto master columns in one vectorized pass.
+
+        Returns a DataFrame with one row per named student and only the
+        master columns the sheet provides, plus Full_Name and Source_Sheet.
+        """
         df = df.dropna(how='all')
         
-        # Determine name column
-        name_col = None
-        for col in ['Full Name', 'Scholar  Name', 'Scholar Name', 'Full_Name']:
-            if col in df.columns:
-                name_col = col
-                break
+        # First source column for each normalized header
+        lookup = {}
+        for col in df.columns:
+            lookup.setdefault(header_key(col), col)
         
+        # Determine name column
+        name_col = next((lookup[key] for key in NAME_COLUMN_KEYS if key in lookup), None)
         if name_col is None:
             print(f"   ⚠️  No name column found in {sheet_name}")
-            return []
+            return pd.DataFrame(columns=['Full_Name', 'Source_Sheet'])
         
-        df = df[df[name_col].notna()]
+        names = df[name_col]
+        names = names[names.notna()].astype(str).str.strip()
+        names = names[(names != '') & (names.str.lower() != 'nan')]
+        df = df.loc[names.index]
         
-        records = []
-        for idx, row in df.iterrows():
-            full_name = str(row.get(name_col, '')).strip()
-            if not full_name or full_name.lower() in ['nan', '']:
+        column_map = self.column_map_for(sheet_name)
+        mapped = {}
+        for master_col, aliases in column_map.items():
+            present = [lookup[header_key(alias)] for alias in aliases if header_key(alias) in lookup]
+            if not present:
                 continue
-            
-            # Build record based on sheet type
-            if sheet_name in ['ACC C1', 'ACC C2', 'Database']:
-                record = self.process_acc_database_row(row, sheet_name)
-            else:  # C1, C2, C3
-                record = self.process_cohort_row(row, sheet_name)
-            
-            record['Full_Name'] = full_name
-            record['Source_Sheet'] = sheet_name
-            records.append(record)
+            # Coalesce alias columns: first non-empty value wins
+            values = df[present[0]]
+            for alias_col in present[1:]:
+                values = values.where(~is_blank(values), df[alias_col])
+            mapped[master_col] = values
         
-        return records
+        result = pd.DataFrame(mapped, index=df.index)
+        result['Full_Name'] = names
+        result['Source_Sheet'] = sheet_name
+        return result.reset_index(drop=True)
     
-    def process_acc_database_row(self, row, sheet_name):
-        """Process ACC/Database sheet row"""
-        return {
-            'Student_ID': row.get('Student_ID', ''),
-            'Cohort': row.get('Cohort', ''),
-            'District': row.get('District', ''),
-            'Contact_Number': row.get('Contact', ''),
-            'Program': row.get('Program', ''),
-            'College': str(row.get(' College Name ', '') or row.get('Name', '')).strip(),
-            'Current_Year': row.get('Studying year ', ''),
-            'Scholarship_Starting_Year': row.get('U-Go Scholarship starting year', ''),
-            'Total_College_Fee': row.get('Total College Fee', ''),
-            'Total_Scholarship_Amount': row.get('U-Go Scholarship  (full course)', ''),
-            'Year_1_Fee': row.get('1st Year fee', ''),
-            'Year_1_Payment': row.get('1st Year Payment', ''),
-            'Year_2_Fee': row.get('2nd Year fee', ''),
-            'Year_2_Payment': row.get('2nd Year Payment', ''),
-            'Year_3_Fee': row.get('3rd Year fee', ''),
-            'Year_3_Payment': row.get('3rd Year Payment', ''),
-            'Year_4_Fee': row.get('4th Year fee', ''),
-            'Year_4_Payment': row.get('4th Year Payment', ''),
-            'Total_Amount_Paid': row.get('Total Amount paid ', ''),
-            'Total_Due': row.get('Due', ''),
-            'Books_Total': row.get('Books', ''),
-            'Uniform_Total': row.get('Uniform', ''),
-            'Books_Uniform_Total': row.get('Total (Books + Uniform)', ''),
-            'Year_1_GPA': row.get('Year 1 GPA', ''),
-            'Year_2_GPA': row.get('Year 2 GPA', ''),
-            'Year_3_GPA': row.get('Year 3 GPA', ''),
-            'Year_4_GPA': row.get('Year 4 Gpa', ''),
-            'Overall_Status': row.get('Overall Status', ''),
-        }
+    def load_sheet_records(self, sheet_name):
+        """Parse one cohort sheet and map it onto master columns"""
+        if self.chunk_size:
+            self.headers[sheet_name] = read_header(self.file_path, sheet_name)
+            return self.stream_sheet(sheet_name)
+        # Shallow copy so header cleanup doesn't touch the shared frame
+        df = self.session.sheet(sheet_name).copy(deep=False)
+        self.headers[sheet_name] = list(df.columns)
+        df = self.clean_column_names(df)
+        return self.map_sheet(sheet_name, df)
     
-    def process_cohort_row(self, row, sheet_name):
-        """Process C1/C2/C3 sheet row"""
-        return {
-            'District': row.get('District', ''),
-            'Address': row.get('Address', ''),
-            'Contact_Number': row.get('Contact Number', ''),
-            'Father_Name': row.get("Father's Name", row.get('Father_Name', '')),
-            'Father_Contact': row.get("Father's Contact", row.get('Father_Contact', '')),
-            'Mother_Name': row.get("Mother's Name", row.get('Mother_Name', '')),
-            'Mother_Contact': row.get("Mother's Contact", row.get('Mother_Contact', '')),
-            'Program': row.get('Program', ''),
-            'College': row.get('College', ''),
-            'Current_Year': row.get('Current Year', ''),
-            'Program_Structure': row.get('Program Structure (Year/Semester)', ''),
-            'Scholarship_Type': row.get('Scholarship type ', row.get('Scholarship Type', '')),
-            'Scholarship_Percentage': row.get('Scholarship %', ''),
-            'Scholarship_Starting_Year': row.get('Scholarship Starting Year', ''),
-            'Scholarship_Status': row.get('Scholarship Status', ''),
-            'Remarks': row.get('Remarks', ''),
-            'Year_1_GPA': row.get('Year 1 GPA', ''),
-            'Year_2_GPA': row.get('Year 2 GPA', ''),
-            'Year_3_GPA': row.get('Year 3 GPA', ''),
-            'Year_4_GPA': row.get('Year 4 Gpa', ''),
-            'Overall_Status': row.get('Overall Status', ''),
-            'Participation': row.get('Participation in Activities', row.get('Participation ', row.get('Participation', ''))),
+    def stream_sheet(self, sheet_name):
+        """Map a cohort sheet batch by batch, reading only the columns the mapping uses"""
+        wanted = set(NAME_COLUMN_KEYS)
+        for aliases in self.column_map_for(sheet_name).values():
+            wanted.update(header_key(alias) for alias in aliases)
+        
+        chunks = [
+            self.map_sheet(sheet_name, self.clean_column_names(chunk))
+            for chunk in iter_frames(self.file_path, sheet_name, self.chunk_size,
+                                     columns=lambda header: header_key(header) in wanted)
+        ]
+        if not chunks:
+            return pd.DataFrame(columns=['Full_Name', 'Source_Sheet'])
+        return pd.concat(chunks, ignore_index=True)
+    
+    def check_headers(self, sheet_name, known_columns):
+        """
+        Warn when headers the column mapping reads are gone since the last analysis.
+
+        known_columns is the analyzer's cached schema ({sheet: columns}); a
+        mapped header that was there and is missing now was most likely
+        renamed, and its data would silently stop reaching Master_Database.
+        """
+        if sheet_name not in known_columns or sheet_name not in self.headers:
+            return
+        before = {header_key(col) for col in known_columns[sheet_name]}
+        now = {header_key(col) for col in self.headers[sheet_name]}
+        mapped = set(NAME_COLUMN_KEYS)
+        for aliases in self.column_map_for(sheet_name).values():
+            mapped.update(header_key(alias) for alias in aliases)
+        
+        missing = sorted(key for key in before - now if key in mapped)
+        if not missing:
+            return
+        added = sorted(now - before)
+        self.header_changes[sheet_name] = {'missing': missing, 'new': added}
+        print(f"   ⚠️  Mapped header(s) gone since the last analysis: {', '.join(missing)}")
+        if added:
+            print(f"      New header(s), possibly renamed: {', '.join(added)}")
+    
+    def schema_hash(self):
+        """Hash of everything that shapes the output, so mapping changes force a rebuild"""
+        schema = {
+            'master_columns': self.master_columns,
+            'acc_sheets': ACC_SHEETS,
+            'name_columns': NAME_COLUMNS,
+            'acc_map': ACC_COLUMN_MAP,
+            'cohort_map': COHORT_COLUMN_MAP,
+            'fuzzy': self.fuzzy,
         }
+        return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+    
+    def content_hash(self, records):
+        """Hash of a mapped sheet's values"""
+        digest = hashlib.sha256('\x1f'.join(map(str, records.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(records, index=False).values.tobytes())
+        return digest.hexdigest()
+    
+    def normalize_names(self, names):
+        """Vectorized normalize_name for a Series of names"""
+        return names.where(names.notna(), '').astype(str).str.strip().str.lower()
+    
+    def combine_sources(self, sources):
+        """Union of comma-separated Source_Sheet values, sorted"""
+        combined = set()
+        for value in sources:
+            if pd.notna(value):
+                combined.update(str(value).split(', '))
+        combined.discard('')
+        return ', '.join(sorted(combined))
+    
+    def resolve_fuzzy_keys(self, master_df, key_to_idx, incoming, keys):
+        """
+        Map name keys with no exact match onto a fuzzy match.
+        
+        Unmatched names are looked up in a blocking index of the master
+        (and of names already seen this run). Returns {key: canonical key}
+        and records every fuzzy merge in self.fuzzy_matches.
+        """
+        def column(df, name):
+            return df[name].tolist() if name in df.columns else [None] * len(df)
+        
+        index = FuzzyNameIndex()
+        master_rows = master_df.loc[key_to_idx.values]
+        for key, name, district, contact in zip(key_to_idx.index, column(master_rows, 'Full_Name'),
+                                                column(master_rows, 'District'), column(master_rows, 'Contact_Number')):
+            index.add(key, name, district, contact)
+        
+        firsts = incoming.assign(_key=keys).drop_duplicates('_key')
+        firsts = firsts[~firsts['_key'].isin(key_to_idx.index)]
+        
+        canonical = {}
+        for key, name, sheet, district, contact in zip(firsts['_key'], firsts['Full_Name'], firsts['Source_Sheet'],
+                                                       column(firsts, 'District'), column(firsts, 'Contact_Number')):
+            match = index.match(name, district, contact)
+            if match is None:
+                index.add(key, name, district, contact)
+                continue
+            
+            target, matched_name, score = match
+            canonical[key] = target
+            in_master = target in key_to_idx.index
+            self.fuzzy_matches.append({
+                'Incoming_Name': name,
+                'Source_Sheet': sheet,
+                'Matched_Name': matched_name,
+                'Matched_ID': master_df.at[key_to_idx[target], 'id'] if in_master else '',
+                'Matched_In': 'Master_Database' if in_master else 'this run',
+                'Score': round(score, 3),
+                'Needs_Review': score < REVIEW_THRESHOLD,
+            })
+        
+        return canonical
     
-    def merge_records(self, existing, new_data):
-        """Merge new data into existing record, keeping non-null values"""
-        merged = existing.copy()
-        
-        for key, value in new_data.items():
-            # Update if:
-            # 1. Existing value is null/empty AND new value is not
-            # 2. OR it's Source_Sheet (append sources)
-            if key == 'Source_Sheet':
-                # Combine source sheets
-                existing_sources = set(str(merged.get(key, '')).split(', '))
-                new_sources = set(str(value).split(', '))
-                combined = existing_sources.union(new_sources)
-                combined.discard('')
-                merged[key] = ', '.join(sorted(combined))
-            elif pd.isna(merged.get(key)) or merged.get(key) == '' or str(merged.get(key)).strip() == '':
-                if pd.notna(value) and str(value).strip() != '':
-                    merged[key] = value
-        
-        merged['Last_Updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        return merged
+    def write_review_report(self):
+        """
+        Save low-confidence fuzzy merges as a CSV next to the workbook.
+
+        The report of an earlier run is removed when this run has nothing
+        to review, so it never lists merges that are no longer pending.
+        """
+        review = [m for m in self.fuzzy_matches if m['Needs_Review']]
+        if self.fuzzy_matches:
+            print(f"\n🔍 Fuzzy name matches: {len(self.fuzzy_matches)} ({len(review)} need review)")
+        if review:
+            pd.DataFrame(review).drop(columns='Needs_Review').to_csv(self.review_file, index=False)
+            print(f"   📝 Review report: {os.path.basename(self.review_file)}")
+        elif os.path.exists(self.review_file):
+            os.remove(self.review_file)
+    
+    def merge_batch(self, master_df, incoming):
+        """
+        Merge all incoming records into master_df in one batch.
+        
+        Records are matched on the normalized name. Existing students only
+        get their empty fields filled, new students are appended with a
+        single concat, and Source_Sheet values are combined for both.
+        """
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        master_df = master_df.reset_index(drop=True).astype(object)
+        
+        keys = self.normalize_names(incoming['Full_Name'])
+        incoming = incoming[keys != ''].reset_index(drop=True)
+        keys = keys[keys != ''].reset_index(drop=True)
+        if len(incoming) == 0:
+            return master_df
+        
+        # Join on the normalized name (last master row wins, as before)
+        master_keys = self.normalize_names(master_df['Full_Name']) if 'Full_Name' in master_df.columns else pd.Series(dtype=object)
+        master_keys = master_keys[master_keys != '']
+        key_to_idx = pd.Series(master_keys.index, index=master_keys.values)
+        key_to_idx = key_to_idx[~key_to_idx.index.duplicated(keep='last')]
+        
+        if self.fuzzy:
+            canonical = self.resolve_fuzzy_keys(master_df, key_to_idx, incoming, keys)
+            keys = keys.map(canonical).fillna(keys)
+        
+        # Collapse incoming duplicates: first non-empty value per column
+        value_cols = [c for c in incoming.columns if c != 'Source_Sheet']
+        values = incoming[value_cols].mask(is_blank_frame(incoming[value_cols]))
+        grouped = values.groupby(keys, sort=False).first()
+        sources = incoming['Source_Sheet'].groupby(keys, sort=False).agg(list)
+        
+        matched_mask = grouped.index.isin(key_to_idx.index)
+        matched = grouped[matched_mask]
+        new = grouped[~matched_mask]
+        
+        self.added_count += len(new)
+        self.updated_count += len(incoming) - len(new)
+        
+        # UPDATE existing students: fill only empty fields, column-wise
+        if len(matched) > 0:
+            target_idx = key_to_idx.loc[matched.index].values
+            for col in value_cols:
+                if col not in master_df.columns:
+                    master_df[col] = pd.Series(np.nan, index=master_df.index, dtype=object)
+                current = master_df.loc[target_idx, col]
+                update = matched[col].set_axis(target_idx)
+                fill = is_blank(current) & update.notna()
+                master_df.loc[fill.index[fill], col] = update[fill]
+            
+            if 'Source_Sheet' not in master_df.columns:
+                master_df['Source_Sheet'] = ''
+            master_df.loc[target_idx, 'Source_Sheet'] = [
+                self.combine_sources([existing, *new_sources])
+                for existing, new_sources in zip(master_df.loc[target_idx, 'Source_Sheet'], sources.loc[matched.index])
+            ]
+            master_df.loc[target_idx, 'Last_Updated'] = now
+        
+        # APPEND new students in one concat
+        if len(new) > 0:
+            max_id = pd.to_numeric(master_df['id'], errors='coerce').max() if len(master_df) > 0 else 0
+            next_id = int(max_id) + 1 if pd.notna(max_id) else 1
+            
+            new_rows = new.reset_index(drop=True)
+            new_rows['Source_Sheet'] = [self.combine_sources(s) for s in sources.loc[new.index]]
+            new_rows['id'] = range(next_id, next_id + len(new_rows))
+            new_rows['Last_Updated'] = now
+            master_df = pd.concat([master_df, new_rows], ignore_index=True)
+        
+        return master_df
     
     def consolidate(self):
         """Main consolidation process"""
+        timer = RunTimer()
         print("=" * 80)
         print("🔄 SMART DATABASE CONSOLIDATION")
         print("=" * 80)
@@ -237,60 +490,120 @@ class SmartConsolidator:
             print(f"\n❌ ERROR: File not found at {self.file_path}")
             return False
         
-        # Load existing master
-        master_df = self.load_master_database()
-        max_id = master_df['id'].max() if len(master_df) > 0 else 0
-        next_id = max_id + 1
-        
-        # Create name-to-index mapping for fast lookup
-        name_to_idx = {}
-        for idx, row in master_df.iterrows():
-            normalized = self.normalize_name(row.get('Full_Name', ''))
-            if normalized:
-                name_to_idx[normalized] = idx
-        
-        # Process each cohort sheet
-        for sheet_name in self.cohort_sheets:
-            print(f"\n📊 Processing {sheet_name}...")
-            try:
-                df = pd.read_excel(self.file_path, sheet_name=sheet_name)
-                df = self.clean_column_names(df)
-                records = self.process_cohort_sheet(sheet_name, df)
-                
-                print(f"   ✓ Found {len(records)} students")
+        # Open the workbook once for load, process and save
+        self.session = WorkbookSession(self.file_path)
+        try:
+            self.run(self.session)
+        finally:
+            self.session.close()
+        
+        self.stats = timer.report()
+        return True
+    
+    def summary(self):
+        """Machine-readable result of the last run"""
+        return {
+            'success': True,
+            'updated': self.updated_count,
+            'added': self.added_count,
+            'total_students': self.total_students,
+            'saved': self.saved,
+            'skipped_sheets': self.skipped_sheets,
+            'fuzzy_matches': len(self.fuzzy_matches),
+            'fuzzy_needs_review': sum(1 for m in self.fuzzy_matches if m['Needs_Review']),
+            'header_changes': self.header_changes,
+            'backup': self.backup_id,
+            **(self.stats or {}),
+        }
+    
+    def run(self, session, save=True):
+        """
+        Consolidate using an open workbook session, then save.
+        
+        With save=False the new Master_Database is only handed to the
+        session; the manifest is written after the caller's session.save().
+        """
+        self.session = session
+        
+        # Compare sheet fingerprints with the last successful run
+        manifest = {} if self.full else load_manifest(self.manifest_file)
+        schema = self.schema_hash()
+        if manifest and manifest.get('schema') != schema:
+            print("\n   ℹ️  Column mappings changed since last run - rebuilding from all sheets")
+            manifest = {}
+        if 'Master_Database' not in session.sheet_names:
+            manifest = {}
+        previous = manifest.get('sheets', {})
+        
+        fingerprints = session.sheet_fingerprints(self.cohort_sheets)
+        pending = [
+            name for name in self.cohort_sheets
+            if name not in fingerprints or previous.get(name, {}).get('fingerprint') != fingerprints[name]
+        ]
+        self.skipped_sheets = [name for name in self.cohort_sheets if name not in pending]
+        
+        if not pending:
+            print("\n✅ No cohort sheet changed since the last run - nothing to do")
+            print("   (use --full to force a complete rebuild)")
+            return None
+        
+        # Start mapping changed sheets in worker processes while the master loads
+        pool = None
+        futures = {}
+        if self.workers > 1 and len(pending) > 1:
+            print(f"\n⚙️  Mapping {len(pending)} sheets in {min(self.workers, len(pending))} processes")
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(max_workers=min(self.workers, len(pending)))
+            futures = {
+                name: pool.submit(map_sheet_job, self.file_path, name, self.chunk_size)
+                for name in pending
+            }
+        
+        try:
+            # Load existing master
+            master_df = self.load_master_database()
+            # Columns of each sheet as of the last analysis, to spot renamed headers
+            known_columns = cached_columns(self.file_path)
+            
+            # Collect mapped sheets in cohort_sheets order, then merge everything in one batch
+            frames = []
+            contents = {name: previous[name]['content'] for name in self.skipped_sheets}
+            for sheet_name in self.cohort_sheets:
+                if sheet_name not in pending:
+                    print(f"\n⏭️  {sheet_name} unchanged since last run - skipped")
+                    continue
                 
-                # Update or append each record
-                for record in records:
-                    normalized_name = self.normalize_name(record.get('Full_Name', ''))
+                print(f"\n📊 Processing {sheet_name}...")
+                try:
+                    if sheet_name in futures:
+                        records, self.headers[sheet_name] = futures[sheet_name].result()
+                    else:
+                        records = self.load_sheet_records(sheet_name)
+                    
+                    print(f"   ✓ Found {len(records)} students")
+                    self.check_headers(sheet_name, known_columns)
                     
-                    if normalized_name in name_to_idx:
-                        # UPDATE existing student
-                        idx = name_to_idx[normalized_name]
-                        existing = master_df.loc[idx].to_dict()
-                        merged = self.merge_records(existing, record)
-                        
-                        # Update in dataframe
-                        for key, value in merged.items():
-                            master_df.at[idx, key] = value
-                        
-                        self.updated_count += 1
+                    content = self.content_hash(records)
+                    if previous.get(sheet_name, {}).get('content') == content:
+                        print("   ⏭️  Same data as last run - skipped")
+                        self.skipped_sheets.append(sheet_name)
                     else:
-                        # APPEND new student
-                        record['id'] = next_id
-                        record['Last_Updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        
-                        # Add to dataframe
-                        new_row = pd.DataFrame([record])
-                        master_df = pd.concat([master_df, new_row], ignore_index=True)
-                        
-                        # Add to lookup
-                        name_to_idx[normalized_name] = len(master_df) - 1
-                        
-                        self.added_count += 1
-                        next_id += 1
-                
-            except Exception as e:
-                print(f"   ✗ Error processing {sheet_name}: {e}")
+                        frames.append(records)
+                    contents[sheet_name] = content
+                    
+                except Exception as e:
+                    print(f"   ✗ Error processing {sheet_name}: {e}")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        
+        if not frames:
+            # Files were re-saved but no sheet data changed: just refresh fingerprints
+            print("\n✅ No cohort data changed since the last run - nothing to do")
+            self.save_manifest(schema, fingerprints, contents)
+            return None
+        
+        master_df = self.merge_batch(master_df, pd.concat(frames, ignore_index=True))
         
         # Ensure all master columns exist
         for col in self.master_columns:
@@ -312,56 +625,114 @@ class SmartConsolidator:
         print(f"Total students in Master_Database: {len(master_df)}")
         print(f"ID range: 1 to {master_df['id'].max()}")
         
+        self.write_review_report()
+        
+        def record_state():
+            # Fingerprint the saved file so the next run can skip unchanged sheets
+            self.save_manifest(schema, session.sheet_fingerprints(self.cohort_sheets), contents)
+        
+        if not save:
+            session.set_sheet('Master_Database', master_df)
+            session.after_save(record_state)
+            self.total_students = len(master_df)
+            return master_df
+        
         # Save
         print("\n💾 Saving Master_Database...")
         self.save_master(master_df)
+        record_state()
         
-        return True
+        return master_df
+    
+    def save_manifest(self, schema, fingerprints, contents):
+        """Record the state of each cohort sheet after a successful run"""
+        save_manifest(self.manifest_file, {
+            'schema': schema,
+            'last_run': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'sheets': {
+                name: {'fingerprint': fingerprints[name], 'content': contents[name]}
+                for name in contents if name in fingerprints
+            },
+        })
     
     def save_master(self, master_df):
         """Save updated Master_Database back to Excel"""
         try:
-            # Backup original file
-            backup_path = self.file_path.replace('.xlsx', f'_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx')
-            print(f"   📦 Creating backup: {os.path.basename(backup_path)}")
-            
-            import shutil
-            shutil.copy2(self.file_path, backup_path)
-            
-            # Load all sheets
-            with pd.ExcelFile(self.file_path) as xls:
-                all_sheets = {name: pd.read_excel(xls, name) 
-                             for name in xls.sheet_names 
-                             if name != 'Master_Database'}
-            
-            # Add updated master
-            all_sheets['Master_Database'] = master_df
+            # Snapshot the original file (only changed parts take new space)
+            backup = self.session.backup(label='consolidator')
+            self.backup_id = backup['id']
+            print(f"   📦 Backup snapshot: {backup['id']}")
             
-            # Write all sheets
-            with pd.ExcelWriter(self.file_path, engine='openpyxl', mode='w') as writer:
-                for sheet_name, data in all_sheets.items():
-                    data.to_excel(writer, sheet_name=sheet_name, index=False)
+            # Only Master_Database is rewritten, the cohort sheets are copied as-is
+            self.session.save_sheet('Master_Database', master_df)
             
+            self.saved = True
+            self.total_students = len(master_df)
             print(f"   ✓ Master_Database saved with {len(master_df)} students")
-            print(f"   ✓ Backup created: {os.path.basename(backup_path)}")
+            print(f"   ✓ Backup created: {backup['id']} (restore with scripts/backup_store.py)")
             
         except Exception as e:
             print(f"   ✗ Error saving: {e}")
             raise
 
 
+def map_sheet_job(file_path, sheet_name, chunk_size=None):
+    """Process-pool entry point: parse and map one cohort sheet in its own process; returns (records, header)"""
+    consolidator = SmartConsolidator(file_path, chunk_size=chunk_size)
+    with WorkbookSession(file_path) as session:
+        consolidator.session = session
+        records = consolidator.load_sheet_records(sheet_name)
+        return records, consolidator.headers[sheet_name]
+
+
 if __name__ == "__main__":
-    consolidator = SmartConsolidator()
+    import argparse
+    import sys
     
-    if consolidator.consolidate():
-        print("\n" + "=" * 80)
-        print("✅ CONSOLIDATION COMPLETED SUCCESSFULLY!")
-        print("=" * 80)
-        print("\n📝 What happened:")
-        print(f"  • Updated {consolidator.updated_count} existing students with new data")
-        print(f"  • Added {consolidator.added_count} new students")
-        print(f"  • All changes saved to Master_Database")
-        print(f"  • Original file backed up")
-        print("\n🚀 Your Electron app will automatically see the updates!")
+    from run_log import add_output_arguments, configure_from_args, emit_summary, redirected_prints
+    
+    parser = argparse.ArgumentParser(description='Consolidate cohort sheets into Master_Database')
+    parser.add_argument('--file', '-f', default=None, help='Path to Excel file (default: data/students.xlsx)')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Stream cohort sheets in batches of this many rows to bound memory')
+    parser.add_argument('--full', action='store_true',
+                        help='Reprocess every cohort sheet, even if unchanged since the last run')
+    parser.add_argument('--no-fuzzy', action='store_true',
+                        help='Only merge students whose names match exactly')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Parse cohort sheets in this many processes (0 = one per CPU core)')
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    
+    consolidator = SmartConsolidator(args.file, chunk_size=args.chunk_size, full=args.full,
+                                     fuzzy=not args.no_fuzzy, workers=args.workers)
+    
+    with redirected_prints(args):
+        try:
+            succeeded = consolidator.consolidate()
+        except Exception as e:
+            emit_summary({'success': False, 'error': str(e)})
+            raise
+        
+        if succeeded:
+            print("\n" + "=" * 80)
+            print("✅ CONSOLIDATION COMPLETED SUCCESSFULLY!")
+            print("=" * 80)
+            print("\n📝 What happened:")
+            print(f"  • Updated {consolidator.updated_count} existing students with new data")
+            print(f"  • Added {consolidator.added_count} new students")
+            if consolidator.saved:
+                print(f"  • All changes saved to Master_Database")
+                print(f"  • Original file backed up")
+            else:
+                print(f"  • No cohort sheet changed, workbook left untouched")
+            print("\n🚀 Your Electron app will automatically see the updates!")
+        else:
+            print("\n❌ Consolidation failed")
+    
+    if succeeded:
+        emit_summary(consolidator.summary())
     else:
-        print("\n❌ Consolidation failed")
\ No newline at end of file
+        emit_summary({'success': False, 'error': f'File not found: {consolidator.file_path}'})
+        sys.exit(1)
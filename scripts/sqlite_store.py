@@ -0,0 +1,513 @@
+"""
+SQLite Store
+The student data in an SQLite file instead of the workbook, laid out
+like the app's PostgreSQL database (scripts/migrate.js, databaseService.js):
+
+    Master_Database -> master_database   (+ cohort_<cohort> tables)
+    Participations  -> participations
+    other sheets    -> sheet_<name>      (kept as they are, e.g. the cohort sheets)
+
+SqliteSession has the WorkbookSession interface, so the pipeline stages
+run unchanged on either store (data_pipeline.py --backend sqlite), and
+the scripts can be tried locally without a PostgreSQL server.
+
+save() writes every pending change in one transaction. Master_Database
+and Participations are upserted set-based through a temporary table
+(rows no longer in the frame are deleted), appended rows are inserted,
+and the cohort tables are refreshed from master_database. master_database
+is indexed on student_id, the normalized full name and the columns
+migrate.js indexes; participations on student_id and event_date.
+
+Columns are declared without a type, so every value keeps the type it has
+in the workbook (a VARCHAR column would turn phone numbers into text, a
+DECIMAL one '001' into 1). Student_ID is indexed but not UNIQUE: new
+students have none until generate_student_ids numbers them.
+
+participations.student_id and the cohort tables' id hold master ids but
+have no foreign key. The assign_ids stage renumbers students and remaps
+participations.student_id to the new ids in the same save; a cascade
+would delete the participations of every changed id before they are
+written back. Foreign keys are not enforced either, so databases created
+with the earlier ON DELETE CASCADE schema keep their participations too.
+
+Usage:
+    python scripts/sqlite_store.py import                 # data/students.xlsx -> data/students.db
+    python scripts/sqlite_store.py import --file data/students.xlsx --db data/students.db
+    python scripts/sqlite_store.py export --output students.xlsx
+"""
+
+import datetime
+import glob
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+
+from backup_store import SNAPSHOT_TIME_FORMAT, default_store_dir
+from startup import lazy_import
+from workbook_session import WorkbookSession
+
+pd = lazy_import('pandas')
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(os.path.dirname(SCRIPT_DIR), 'data', 'students.db')
+
+# Database backups kept in data/backups/<db name>/db
+DB_BACKUPS_KEPT = 20
+
+MASTER_COLUMNS = [
+    'student_id', 'full_name', 'source_sheet', 'cohort', 'district', 'address', 'contact_number',
+    'program', 'college', 'current_year', 'program_structure', 'scholarship_percentage',
+    'scholarship_starting_year', 'scholarship_status', 'total_college_fee', 'total_scholarship_amount',
+    'total_due', 'books_total', 'uniform_total', 'books_uniform_total', 'year_1_fee', 'year_1_payment',
+    'year_2_fee', 'year_3_fee', 'year_4_fee', 'year_1_gpa', 'participation', 'last_updated',
+    'year_2_payment', 'year_2_gpa', 'remarks', 'father_name', 'father_contact', 'mother_name',
+    'mother_contact', 'scholarship_type', 'total_amount_paid', 'year_3_payment', 'year_4_payment',
+    'year_3_gpa', 'year_4_gpa', 'overall_status', 'photo_url',
+]
+# Copied from master_database into each cohort_<cohort> table
+COHORT_COLUMNS = [
+    'full_name', 'scholarship_starting_year', 'current_year', 'scholarship_type',
+    'scholarship_percentage', 'contact_number', 'district', 'address', 'program',
+    'program_structure', 'college', 'scholarship_status', 'remarks',
+    'year_1_gpa', 'year_2_gpa', 'year_3_gpa', 'year_4_gpa',
+    'overall_status', 'participation', 'last_updated',
+]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS sheets (
+    name TEXT PRIMARY KEY,
+    table_name TEXT UNIQUE NOT NULL,
+    position INTEGER NOT NULL,
+    columns TEXT NOT NULL,
+    fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS master_database (
+    id INTEGER PRIMARY KEY,
+    {', '.join(MASTER_COLUMNS)},
+    name_key,
+    created_at DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS participations (
+    participation_id INTEGER PRIMARY KEY,
+    student_id INTEGER,
+    event_name, event_date, event_type, role, hours, notes, created_at, updated_at
+);
+CREATE INDEX IF NOT EXISTS idx_master_student_id ON master_database(student_id);
+CREATE INDEX IF NOT EXISTS idx_master_name_key ON master_database(name_key);
+CREATE INDEX IF NOT EXISTS idx_master_cohort ON master_database(cohort);
+CREATE INDEX IF NOT EXISTS idx_master_full_name ON master_database(full_name);
+CREATE INDEX IF NOT EXISTS idx_master_college ON master_database(college);
+CREATE INDEX IF NOT EXISTS idx_master_district ON master_database(district);
+CREATE INDEX IF NOT EXISTS idx_participations_student_id ON participations(student_id);
+CREATE INDEX IF NOT EXISTS idx_participations_event_date ON participations(event_date);
+"""
+
+# Sheets stored in the tables of the app's schema: sheet -> (table, primary key)
+SCHEMA_TABLES = {
+    'Master_Database': ('master_database', 'id'),
+    'Participations': ('participations', 'participation_id'),
+}
+# Written first: master_database, then the tables that refer to its ids
+WRITE_ORDER = ['Master_Database', 'Participations']
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def name_key(name):
+    """Full_Name as the consolidator matches it: trimmed and lower-cased"""
+    if _sql_value(name) is None:
+        return None
+    return str(name).strip().lower()
+
+
+def cohort_table_name(cohort):
+    """'C1' -> cohort_c1, as getCohortTableName() in databaseService.js"""
+    return 'cohort_' + re.sub(r'\W+', '_', str(cohort).lower()).strip('_')
+
+
+def _sql_value(value):
+    """A cell as SQLite stores it: empty cells become NULL, dates ISO text"""
+    if value is None or value is pd.NaT:
+        return None
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        value = value.item()  # numpy scalars
+    if isinstance(value, float):
+        return None if value != value else value
+    if isinstance(value, str):
+        return value if value != '' else None
+    if isinstance(value, (bool, int, bytes)):
+        return value
+    return str(value)
+
+
+def _rows(df):
+    return [tuple(_sql_value(value) for value in row) for row in df.itertuples(index=False, name=None)]
+
+
+def _digest(rows, previous=''):
+    data = json.dumps(rows, default=str, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256((previous + data).encode('utf-8')).hexdigest()
+
+
+class SqliteSession(WorkbookSession):
+    """The WorkbookSession interface over an SQLite database file"""
+
+    def __init__(self, file_path=None):
+        super().__init__(file_path or DEFAULT_DB, mirror=False)
+        self._connection = None
+        # sheet name -> (table, original headers), from the sheets catalog
+        self._catalog = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            # Transactions are begun and committed explicitly, see _transaction()
+            self._connection = sqlite3.connect(self.file_path, isolation_level=None)
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    @property
+    def catalog(self):
+        if self._catalog is None:
+            rows = self.connection.execute('SELECT name, table_name, columns FROM sheets ORDER BY position')
+            self._catalog = {name: (table, json.loads(columns)) for name, table, columns in rows}
+        return self._catalog
+
+    @property
+    def sheet_names(self):
+        """Sheet names in workbook order (from the sheets catalog)"""
+        if self._sheet_names is None:
+            self._sheet_names = list(self.catalog)
+        return self._sheet_names
+
+    @staticmethod
+    def _column(sheet_name, header):
+        """Database column of a sheet header (snake_case in the app's tables)"""
+        return str(header).lower() if sheet_name in SCHEMA_TABLES else str(header)
+
+    def _order_key(self, sheet_name):
+        return SCHEMA_TABLES[sheet_name][1] if sheet_name in SCHEMA_TABLES else '_row'
+
+    def _load(self, sheet_name):
+        table, headers = self.catalog[sheet_name]
+        columns = ', '.join(_quote(self._column(sheet_name, header)) for header in headers) or 'NULL'
+        rows = self.connection.execute(
+            f'SELECT {columns} FROM {_quote(table)} ORDER BY {_quote(self._order_key(sheet_name))}'
+        ).fetchall()
+        if not headers:
+            return pd.DataFrame(index=range(len(rows)))
+        df = pd.DataFrame.from_records(rows, columns=headers) if rows else pd.DataFrame(columns=headers)
+        for i, header in enumerate(headers):
+            column = df.iloc[:, i]
+            if column.dtype != object:
+                continue
+            # NULLs come back as None; a parsed sheet has NaN (float64 if the column is empty)
+            if column.isna().all():
+                df[header] = column.astype('float64')
+            elif column.isna().any():
+                df[header] = column.where(column.notna(), float('nan'))
+        return df
+
+    def _transaction(self):
+        return _Transaction(self.connection)
+
+    def _table_for_new_sheet(self, sheet_name):
+        if sheet_name in SCHEMA_TABLES:
+            return SCHEMA_TABLES[sheet_name][0]
+        base = 'sheet_' + (re.sub(r'\W+', '_', sheet_name.lower()).strip('_') or 'sheet')
+        taken = {table for table, _ in self.catalog.values()}
+        table, n = base, 1
+        while table in taken:
+            n += 1
+            table = f'{base}_{n}'
+        return table
+
+    def _add_columns(self, table, columns):
+        existing = {row[1] for row in self.connection.execute(f'PRAGMA table_info({_quote(table)})')}
+        for column in columns:
+            if column not in existing:
+                self.connection.execute(f'ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)}')
+
+    def _write_sheet(self, sheet_name, df):
+        """Replace a sheet's rows (inside a transaction); returns the new fingerprint"""
+        headers = [str(header) for header in df.columns]
+        table = self.catalog[sheet_name][0] if sheet_name in self.catalog else self._table_for_new_sheet(sheet_name)
+        columns = [self._column(sheet_name, header) for header in headers]
+        rows = _rows(df)
+        fingerprint = _digest([headers, rows])
+
+        if sheet_name in SCHEMA_TABLES:
+            key = SCHEMA_TABLES[sheet_name][1]
+            if key not in columns:
+                raise ValueError(f"{sheet_name} needs an '{key}' column to be saved to the database")
+            if sheet_name == 'Master_Database':
+                names = df.columns.get_loc('Full_Name') if 'Full_Name' in df.columns else None
+                columns = columns + ['name_key']
+                rows = [row + (name_key(row[names]) if names is not None else None,) for row in rows]
+            self._add_columns(table, columns)
+            self._upsert(table, key, columns, rows)
+        else:
+            self.connection.execute(f'DROP TABLE IF EXISTS {_quote(table)}')
+            self.connection.execute(
+                f'CREATE TABLE {_quote(table)} (_row INTEGER PRIMARY KEY'
+                + ''.join(f', {_quote(column)}' for column in columns) + ')'
+            )
+            self._insert(table, columns, rows)
+
+        position = self.sheet_names.index(sheet_name)
+        self.connection.execute(
+            'INSERT INTO sheets (name, table_name, position, columns, fingerprint) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET position = excluded.position, columns = excluded.columns, '
+            'fingerprint = excluded.fingerprint',
+            (sheet_name, table, position, json.dumps(headers), fingerprint),
+        )
+        self.catalog[sheet_name] = (table, headers)
+
+    def _insert(self, table, columns, rows):
+        if not columns:
+            self.connection.executemany(f'INSERT INTO {_quote(table)} DEFAULT VALUES', [()] * len(rows))
+            return
+        placeholders = ', '.join('?' * len(columns))
+        self.connection.executemany(
+            f"INSERT INTO {_quote(table)} ({', '.join(map(_quote, columns))}) VALUES ({placeholders})", rows
+        )
+
+    def _upsert(self, table, key, columns, rows):
+        """
+        Make `table` hold exactly `rows`, matched on `key`, in three statements.
+
+        The rows are loaded into a temporary table; rows whose key is gone
+        are deleted, the rest are inserted or updated in place. Rows in
+        other tables that refer to deleted keys are left as they are.
+        """
+        names = ', '.join(map(_quote, columns))
+        self.connection.execute('DROP TABLE IF EXISTS temp.incoming')
+        self.connection.execute(f'CREATE TEMP TABLE incoming AS SELECT {names} FROM {_quote(table)} WHERE 0')
+        self._insert('incoming', columns, rows)
+        self.connection.execute(
+            f'DELETE FROM {_quote(table)} WHERE {_quote(key)} NOT IN '
+            f'(SELECT {_quote(key)} FROM temp.incoming WHERE {_quote(key)} IS NOT NULL)'
+        )
+        updates = ', '.join(f'{_quote(column)} = excluded.{_quote(column)}' for column in columns if column != key)
+        self.connection.execute(
+            f'INSERT INTO {_quote(table)} ({names}) SELECT {names} FROM temp.incoming WHERE true '
+            f'ON CONFLICT({_quote(key)}) DO ' + (f'UPDATE SET {updates}' if updates else 'NOTHING')
+        )
+        self.connection.execute('DROP TABLE temp.incoming')
+
+    def _append(self, sheet_name, df):
+        table, headers = self.catalog[sheet_name]
+        if [str(header) for header in df.columns] != headers:
+            raise ValueError(f"Rows appended to {sheet_name} must have its columns in order")
+        columns = [self._column(sheet_name, header) for header in headers]
+        rows = _rows(df)
+        if sheet_name == 'Master_Database':
+            names = headers.index('Full_Name') if 'Full_Name' in headers else None
+            columns = columns + ['name_key']
+            rows = [row + (name_key(row[names]) if names is not None else None,) for row in rows]
+        self._insert(table, columns, rows)
+        previous = self.connection.execute('SELECT fingerprint FROM sheets WHERE name = ?', (sheet_name,)).fetchone()
+        self.connection.execute('UPDATE sheets SET fingerprint = ? WHERE name = ?',
+                                (_digest(rows, previous[0] or ''), sheet_name))
+
+    def _refresh_cohort_tables(self):
+        """Make each cohort_<cohort> table match master_database, like updateCohortTable() does per student"""
+        conn = self.connection
+        cohorts = [row[0] for row in conn.execute(
+            'SELECT DISTINCT cohort FROM master_database WHERE cohort IS NOT NULL')]
+        current = {}
+        for cohort in cohorts:
+            current.setdefault(cohort_table_name(cohort), []).append(cohort)
+
+        names = ', '.join(COHORT_COLUMNS)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in COHORT_COLUMNS)
+        for table, values in current.items():
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {_quote(table)} ('
+                f'id INTEGER PRIMARY KEY, {names})'
+            )
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {_quote(f"idx_{table}_full_name")} ON {_quote(table)}(full_name)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {_quote(f"idx_{table}_college")} ON {_quote(table)}(college)')
+            members = f"SELECT id FROM master_database WHERE cohort IN ({', '.join('?' * len(values))})"
+            conn.execute(f'DELETE FROM {_quote(table)} WHERE id NOT IN ({members})', values)
+            conn.execute(
+                f'INSERT INTO {_quote(table)} (id, {names}) SELECT id, {names} FROM master_database '
+                f"WHERE cohort IN ({', '.join('?' * len(values))}) ON CONFLICT(id) DO UPDATE SET {updates}",
+                values,
+            )
+
+        # Cohorts no one is in any more keep an empty table, as in PostgreSQL
+        existing = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'cohort\\_%' ESCAPE '\\'")]
+        for table in existing:
+            if table not in current:
+                conn.execute(f'DELETE FROM {_quote(table)}')
+
+    def _write(self, replace, append):
+        """Write replaced sheets and appended rows in one transaction"""
+        order = sorted(replace, key=lambda name: (WRITE_ORDER + [name]).index(name))
+        with self._transaction():
+            for name in order:
+                self._write_sheet(name, self.frames[name])
+            for name in sorted(append, key=lambda name: (WRITE_ORDER + [name]).index(name)):
+                self._append(name, append[name])
+            if 'Master_Database' in replace or 'Master_Database' in append:
+                self._refresh_cohort_tables()
+
+    def save(self):
+        """
+        Write every pending change in one transaction.
+
+        If any statement fails nothing is written and the changes stay
+        pending. Written sheets are re-read on next use.
+        """
+        if self.has_changes:
+            try:
+                self._write(self.dirty, self.appended)
+            except Exception:
+                self._catalog = None
+                raise
+            self._forget(self.dirty | set(self.appended))
+            self.dirty.clear()
+            self.appended.clear()
+        self._run_after_save()
+
+    def save_sheet(self, sheet_name, df):
+        """Write one sheet now; other pending changes stay pending"""
+        self.set_sheet(sheet_name, df)
+        try:
+            self._write({sheet_name}, {})
+        except Exception:
+            self._catalog = None
+            raise
+        self.dirty.discard(sheet_name)
+        self._forget([sheet_name])
+
+    def sheet_fingerprints(self, sheet_names=None):
+        """{sheet name: content fingerprint} of the saved sheets"""
+        rows = self.connection.execute('SELECT name, fingerprint FROM sheets ORDER BY position')
+        return {name: fingerprint for name, fingerprint in rows
+                if fingerprint and (sheet_names is None or name in sheet_names)}
+
+    def backup(self, label=None):
+        """
+        Copy the database to data/backups/<db name>/db with SQLite's backup API.
+
+        Returns a record with the snapshot 'id' and 'path'; only the newest
+        DB_BACKUPS_KEPT copies are kept.
+        """
+        backup_dir = os.path.join(default_store_dir(self.file_path), 'db')
+        os.makedirs(backup_dir, exist_ok=True)
+        created = datetime.datetime.now()
+        snapshot_id = created.strftime(SNAPSHOT_TIME_FORMAT)
+        n = 1
+        while glob.glob(os.path.join(backup_dir, f'{snapshot_id}*.db')):
+            n += 1
+            snapshot_id = f"{created.strftime(SNAPSHOT_TIME_FORMAT)}_{n}"
+        suffix = '_' + re.sub(r'[^\w-]+', '_', label) if label else ''
+        path = os.path.join(backup_dir, f'{snapshot_id}{suffix}.db')
+
+        target = sqlite3.connect(path)
+        try:
+            self.connection.backup(target)
+        finally:
+            target.close()
+
+        for old in sorted(glob.glob(os.path.join(backup_dir, '*.db')))[:-DB_BACKUPS_KEPT]:
+            os.remove(old)
+        return {'id': snapshot_id, 'created': created.isoformat(timespec='seconds'),
+                'label': label, 'database': os.path.basename(self.file_path), 'path': path}
+
+    def close(self):
+        """Close the connection (it is opened again on next use)"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, or ROLLBACK if the block raises"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+def import_workbook(file_path, db_path):
+    """Copy every sheet of a workbook into the database; returns {sheet name: rows}"""
+    with WorkbookSession(file_path) as workbook, SqliteSession(db_path) as store:
+        sheets = workbook.all_sheets()
+        for name, df in sheets.items():
+            store.set_sheet(name, df)
+        store.save()
+    return {name: len(df) for name, df in sheets.items()}
+
+
+def export_workbook(db_path, output_path):
+    """Write every sheet in the database to a new workbook; returns {sheet name: rows}"""
+    with SqliteSession(db_path) as store:
+        sheets = store.all_sheets()
+    with pd.ExcelWriter(output_path, engine='openpyxl', mode='w') as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return {name: len(df) for name, df in sheets.items()}
+
+
+def main():
+    import argparse
+
+    from run_log import add_output_arguments, configure_from_args, emit_summary, log
+
+    default_file = os.path.join(os.path.dirname(SCRIPT_DIR), 'data', 'students.xlsx')
+    parser = argparse.ArgumentParser(description='Copy the student data between the workbook and an SQLite database')
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite database (default: data/students.db)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help='Copy every sheet of the workbook into the database')
+    import_parser.add_argument('--file', '-f', default=default_file, help='Workbook to import (default: data/students.xlsx)')
+    export_parser = commands.add_parser('export', help='Write the database out as a workbook')
+    export_parser.add_argument('--output', '-o', required=True, help='Workbook to write')
+    for command_parser in (import_parser, export_parser):
+        add_output_arguments(command_parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    try:
+        if args.command == 'import':
+            if not os.path.exists(args.file):
+                log.error(f"❌ File not found: {args.file}")
+                emit_summary({'success': False, 'error': f'File not found: {args.file}'})
+                return 1
+            counts = import_workbook(args.file, args.db)
+            log.info(f"✅ Imported {args.file} into {args.db}")
+        else:
+            if not os.path.exists(args.db):
+                log.error(f"❌ Database not found: {args.db}")
+                emit_summary({'success': False, 'error': f'Database not found: {args.db}'})
+                return 1
+            counts = export_workbook(args.db, args.output)
+            log.info(f"✅ Exported {args.db} to {args.output}")
+    except (sqlite3.Error, ValueError) as e:
+        log.error(f"❌ {e}")
+        emit_summary({'success': False, 'error': str(e)})
+        return 1
+
+    for name, rows in counts.items():
+        log.info(f"  📄 {name}: {rows} rows")
+    emit_summary({'success': True, 'sheets': counts})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Script Startup
+Keeps the data scripts quick to start: heavy libraries (pandas, numpy,
+openpyxl) are bound with lazy_import() and only loaded when first used,
+so paths like --help, --test or a missing file never pay for them.
+
+--profile-startup (added by run_log.add_output_arguments) re-runs the
+command under `python -X importtime` and prints where the import time
+went, by top-level package and by module.
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+
+PROFILE_FLAG = '--profile-startup'
+# Rows shown in each section of the startup profile
+PROFILE_TOP = 15
+
+
+def lazy_import(name):
+    """
+    Module object for `name` that is only imported on first attribute access.
+
+    Already-imported modules are returned as they are.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def parse_importtime(lines):
+    """
+    Records from `-X importtime` output lines.
+
+    Returns (module, self_us, cumulative_us, depth) tuples; other lines
+    are ignored.
+    """
+    records = []
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        depth = (len(name) - len(module) - 1) // 2
+        records.append((module, int(fields[0]), int(fields[1]), depth))
+    return records
+
+
+def startup_report(records, top=PROFILE_TOP):
+    """Text report of import cost by top-level package and by module"""
+    total = sum(self_us for _, self_us, _, _ in records)
+    packages = {}
+    for module, self_us, _, _ in records:
+        package = module.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    lines = [
+        "=" * 60,
+        f"🚀 STARTUP PROFILE: {total / 1000:.1f} ms importing {len(records)} modules",
+        "=" * 60,
+        "By package (self time):",
+    ]
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {package:<32} {self_us / 1000:8.1f} ms  {self_us / max(total, 1):6.1%}")
+
+    lines.append("Slowest imports (cumulative, top level only):")
+    top_level = [record for record in records if record[3] == 0]
+    for module, _, cumulative, _ in sorted(top_level, key=lambda record: -record[2])[:top]:
+        lines.append(f"  {module:<32} {cumulative / 1000:8.1f} ms")
+    return '\n'.join(lines)
+
+
+def import_cost_ms(module, cwd=None):
+    """Total import time of `module` in a fresh interpreter, in ms"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, cwd=cwd)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else module)
+    records = parse_importtime(result.stderr.splitlines())
+    return sum(self_us for _, self_us, _, _ in records) / 1000
+
+
+def profile_startup(argv=None):
+    """
+    Re-run this script under -X importtime and print the startup profile.
+
+    The run itself behaves as usual (its stdout is passed through); the
+    profile goes to stderr. Returns the run's exit code.
+    """
+    argv = [arg for arg in (sys.argv if argv is None else argv) if arg != PROFILE_FLAG]
+    script = os.path.abspath(argv[0])
+    result = subprocess.run([sys.executable, '-X', 'importtime', script, *argv[1:]],
+                            stdout=None, stderr=subprocess.PIPE, text=True)
+
+    other = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+    if other:
+        sys.stderr.write('\n'.join(other) + '\n')
+    sys.stderr.write(startup_report(parse_importtime(result.stderr.splitlines())) + '\n')
+    return result.returncode
@@ -0,0 +1,192 @@
+"""
+Synthetic Workbook Generator
+Builds a students.xlsx look-alike of any size for benchmarking: cohort
+sheets with the real header layouts (ACC C1, ACC C2, Database, C1-C3),
+a Master_Database and a Participations sheet. Output is deterministic
+for a given size and seed.
+
+Usage:
+    python scripts/synthetic_workbook.py 10000 data/synthetic_10k.xlsx
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+
+FIRST_NAMES = ['Aarati', 'Anita', 'Asmita', 'Binda', 'Bimala', 'Dipa', 'Gita', 'Kabita', 'Kamala', 'Laxmi',
+               'Manisha', 'Nirmala', 'Pooja', 'Rajesh', 'Ram', 'Sabina', 'Santoshi', 'Sarita', 'Sharmila',
+               'Sita', 'Sunita', 'Susmita', 'Usha', 'Yamuna', 'Hari', 'Krishna', 'Bishnu', 'Suman']
+MIDDLE_NAMES = ['', '', '', 'Kumari', 'Bahadur', 'Maya', 'Devi', 'Prasad']
+# Surnames are built from syllables so every student gets a distinct name
+SYLLABLES = ['ba', 'ru', 'wal', 'ne', 'bhu', 'jel', 'ho', 'ra', 'che', 'pang', 'gu', 'rung', 'kha', 'dka',
+             'ma', 'gar', 'pa', 'ri', 'yar', 'shre', 'stha', 'ta', 'mang', 'tha', 'dhi', 'ka', 'ki']
+DISTRICTS = ['Dhading', 'Kathmandu', 'Gorkha', 'Nuwakot', 'Makwanpur', 'Sindhupalchok', 'Lalitpur']
+COLLEGES = ['Adarsha Multiple Campus', 'Shree Medical and Technical College', 'Dhading Campus',
+            'Nilkantha Multiple Campus', 'Kathmandu Model College']
+PROGRAMS = ['BBS', 'B.ED', 'BSc Nursing', 'BBA', 'BCA', 'Diploma in Agriculture']
+YEARS = ['1st year', '2nd year', '3rd year', '4th year']
+EVENTS = ['One day Life Skill and Leadership Traning Dhading', 'Workshop on AI - 2023-05-15',
+          'Tech Conference 2023 | Participant | 8 hours', 'Volunteer Work, Community Service, 10 hours, 2023-06-20',
+          'Speaker at Workshop - 15/05/2023 - 3 hours', 'Seminar; Training session; Hackathon 2023']
+
+ACC_HEADER = [' College Name ', 'Scholar  Name', 'District', 'Program', 'Studying year ',
+              'U-Go Scholarship starting year', 'Total College Fee',
+              'U-Go Scholarship _x000d__x000d__x000d__x000d__x000d_\n(full course)',
+              '1st Year fee', '2nd Year fee', '3rd Year fee', '4th Year fee',
+              '1st Year Payment', '2nd Year Payment', 'Total Amount paid ', 'Due',
+              'Books', 'Uniform', 'Total (Books + Uniform)']
+DATABASE_HEADER = [' College Name ', 'Scholar  Name', 'Cohort', 'Contact', 'District', 'Program',
+                   'Studying year ', 'U-Go Scholarship starting year', 'Total College Fee',
+                   '1st Year Payment', '2nd Year Payment', 'Total Amount paid ', 'Due',
+                   'Year 1 GPA', 'Year 2 GPA', 'Overall Status']
+COHORT_HEADER = ['S.N', 'Full Name', 'Scholarship Starting Year', 'Current Year', 'Scholarship Type',
+                 'Scholarship %', 'Contact Number', 'District', 'Address', 'Program',
+                 'Program Structure (Year/Semester)', 'College', 'Scholarship Status', 'Remarks',
+                 'Year 1 GPA', 'Year 2 GPA', 'Overall Status', 'Participation ']
+MASTER_HEADER = ['id', 'Student_ID', 'Full_Name', 'Source_Sheet', 'Cohort', 'District', 'Address',
+                 'Contact_Number', 'Program', 'College', 'Current_Year', 'Program_Structure',
+                 'Scholarship_Percentage', 'Scholarship_Starting_Year', 'Scholarship_Status',
+                 'Total_College_Fee', 'Total_Scholarship_Amount', 'Total_Due', 'Year_1_GPA',
+                 'Participation', 'Last_Updated']
+PARTICIPATION_HEADER = ['participation_id', 'student_id', 'event_name', 'event_date', 'event_type',
+                        'role', 'hours', 'notes', 'created_at', 'updated_at']
+
+COHORTS = ['C1', 'C2', 'C3']
+
+
+def surname(index):
+    """Distinct pronounceable surname for each index: 0 -> 'Baba', 1 -> 'Baru', ..."""
+    syllables = []
+    while True:
+        index, digit = divmod(index, len(SYLLABLES))
+        syllables.append(SYLLABLES[digit])
+        if not index and len(syllables) >= 2:
+            break
+    return ''.join(reversed(syllables)).capitalize()
+
+
+def make_students(rows, rng):
+    """rows synthetic students with every field the sheets draw from"""
+    students = []
+    for i in range(rows):
+        middle = rng.choice(MIDDLE_NAMES)
+        parts = [rng.choice(FIRST_NAMES), middle, surname(i)]
+        fee = rng.randrange(40, 400) * 500
+        students.append({
+            'seq': i + 1,
+            'name': ' '.join(part for part in parts if part),
+            'cohort': COHORTS[min(i * len(COHORTS) // rows, len(COHORTS) - 1)],
+            'district': rng.choice(DISTRICTS),
+            'address': f"{rng.choice(DISTRICTS)}-{rng.randrange(1, 12)}",
+            'contact': 9700000000 + rng.randrange(0, 99999999),
+            'program': rng.choice(PROGRAMS),
+            'college': rng.choice(COLLEGES),
+            'year': rng.choice(YEARS),
+            'start_year': rng.choice(YEARS[:2]),
+            'fee': fee,
+            'paid': fee // rng.choice([1, 2, 4]),
+            'gpa': round(rng.uniform(2.0, 4.0), 2),
+            'participation': rng.choice(EVENTS) if rng.random() < 0.6 else None,
+        })
+    return students
+
+
+def _acc_row(s):
+    return [s['college'], s['name'], s['district'], s['program'], s['year'], s['start_year'], s['fee'],
+            s['fee'], s['fee'] // 4, s['fee'] // 4, s['fee'] // 4, s['fee'] // 4,
+            s['paid'], None, s['paid'], s['fee'] - s['paid'], 2950, 6000, 8950]
+
+
+def _database_row(s):
+    return [s['college'], s['name'], s['cohort'], s['contact'], s['district'], s['program'], s['year'],
+            s['start_year'], s['fee'], s['paid'], None, s['paid'], s['fee'] - s['paid'],
+            s['gpa'], None, 'Active']
+
+
+def _cohort_row(s, index):
+    return [index, s['name'], s['start_year'], s['year'], 'Full Scholarship', 1.0, s['contact'],
+            s['district'], s['address'], s['program'], 'Year', s['college'], 'Active ', None,
+            s['gpa'], None, None, s['participation']]
+
+
+def _master_row(s, now):
+    sources = {s['cohort'], 'Database'}
+    if s['cohort'] != 'C3' and s['seq'] % 2 == 0:
+        sources.add(f"ACC {s['cohort']}")
+    sources = ', '.join(sorted(sources))
+    return [s['seq'], f"UGO_{s['cohort']}_{s['seq']:03d}", s['name'], sources, s['cohort'], s['district'],
+            s['address'], s['contact'], s['program'], s['college'], s['year'], 'Year', 1.0,
+            s['start_year'], 'Active ', s['fee'], s['fee'], s['fee'] - s['paid'], s['gpa'],
+            s['participation'], now]
+
+
+def generate_workbook(path, rows, seed=42, participations=True):
+    """
+    Write a synthetic workbook with `rows` students to path.
+
+    Every student appears in one cohort sheet (C1-C3) and in Database;
+    roughly half also appear in an ACC sheet, so the consolidator sees
+    the same overlap it does on the real file.
+    """
+    rng = random.Random(seed)
+    students = make_students(rows, rng)
+    now = datetime(2026, 1, 1).isoformat()
+
+    workbook = Workbook(write_only=True)
+
+    for sheet_name, cohort in (('ACC C1', 'C1'), ('ACC C2', 'C2')):
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append(ACC_HEADER)
+        sheet.append([None] * 8 + ['Sem 1', 'Sem 3', 'Sem 5', 'Sem 7', 'Paid', 'Paid'])
+        for s in students:
+            if s['cohort'] == cohort and s['seq'] % 2 == 0:
+                sheet.append(_acc_row(s))
+
+    sheet = workbook.create_sheet('Database')
+    sheet.append(DATABASE_HEADER)
+    sheet.append([None] * 13 + ['1st Semester', '3rd Semester'])
+    for s in students:
+        sheet.append(_database_row(s))
+
+    for cohort in COHORTS:
+        sheet = workbook.create_sheet(cohort)
+        sheet.append(COHORT_HEADER)
+        sheet.append([None] * 14 + ['1st Semester', '3rd Semester'])
+        members = [s for s in students if s['cohort'] == cohort]
+        for index, s in enumerate(members, 1):
+            sheet.append(_cohort_row(s, index))
+
+    sheet = workbook.create_sheet('Master_Database')
+    sheet.append(MASTER_HEADER)
+    for s in students:
+        sheet.append(_master_row(s, now))
+
+    sheet = workbook.create_sheet('Participations')
+    sheet.append(PARTICIPATION_HEADER)
+    if participations:
+        participation_id = 0
+        start = datetime(2025, 1, 1)
+        for s in students[::2]:
+            if not s['participation']:
+                continue
+            participation_id += 1
+            created = (start + timedelta(minutes=participation_id)).isoformat()
+            sheet.append([participation_id, s['seq'], s['participation'][:50], None, 'Other',
+                          'Participant', 0, s['participation'], created, created])
+
+    workbook.save(path)
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate a synthetic students.xlsx')
+    parser.add_argument('rows', type=int, help='Number of students')
+    parser.add_argument('output', help='Path of the workbook to write')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    generate_workbook(args.output, args.rows, seed=args.seed)
+    print(f"✅ Wrote {args.rows} students to {args.output}")
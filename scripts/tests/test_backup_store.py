@@ -0,0 +1,51 @@
+import os
+import zipfile
+
+from backup_store import KEEP_LAST, BackupStore, restore_workbook
+
+
+def write_workbook(path, text):
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr('[Content_Types].xml', '<Types/>')
+        zf.writestr('xl/worksheets/sheet1.xml', text)
+
+
+def read_sheet(path):
+    with zipfile.ZipFile(path) as zf:
+        return zf.read('xl/worksheets/sheet1.xml').decode('utf-8')
+
+
+def test_restore_oldest_snapshot_of_a_full_store(tmp_path):
+    workbook = tmp_path / 'students.xlsx'
+    store = BackupStore.for_workbook(str(workbook))
+    ids = []
+    for n in range(KEEP_LAST):
+        write_workbook(workbook, f'<sheet>{n}</sheet>')
+        ids.append(store.snapshot(str(workbook))['id'])
+    write_workbook(workbook, '<sheet>current</sheet>')
+
+    record, safety = restore_workbook(str(workbook), ids[0])
+
+    assert record['id'] == ids[0]
+    assert read_sheet(workbook) == '<sheet>0</sheet>'
+    # The state before the restore can be restored in turn
+    restore_workbook(str(workbook), safety['id'], str(tmp_path / 'previous.xlsx'))
+    assert read_sheet(tmp_path / 'previous.xlsx') == '<sheet>current</sheet>'
+
+
+def test_restore_keeps_file_mode(tmp_path):
+    workbook = tmp_path / 'students.xlsx'
+    write_workbook(workbook, '<sheet>saved</sheet>')
+    os.chmod(workbook, 0o644)
+    store = BackupStore.for_workbook(str(workbook))
+    snapshot_id = store.snapshot(str(workbook))['id']
+
+    store.restore(snapshot_id, str(workbook))
+    assert os.stat(workbook).st_mode & 0o777 == 0o644
+
+    umask = os.umask(0o022)
+    try:
+        store.restore(snapshot_id, str(tmp_path / 'restored.xlsx'))
+    finally:
+        os.umask(umask)
+    assert os.stat(tmp_path / 'restored.xlsx').st_mode & 0o777 == 0o644
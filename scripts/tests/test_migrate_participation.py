@@ -0,0 +1,27 @@
+import pandas as pd
+
+from migrate_participation import PARTICIPATION_COLUMNS, migrate_participations
+from xlsx_package import write_sheet
+
+
+def test_changed_sheet_invalidates_the_manifest(tmp_path):
+    workbook = str(tmp_path / 'students.xlsx')
+    master = pd.DataFrame({
+        'id': [1, 2],
+        'Full_Name': ['Ram Thapa', 'Sita Rai'],
+        'Participation': ['Workshop on AI - 2023-05-15', 'Seminar B - 2023-02-15'],
+    })
+    with pd.ExcelWriter(workbook, engine='openpyxl') as writer:
+        master.to_excel(writer, sheet_name='Master_Database', index=False)
+        pd.DataFrame(columns=PARTICIPATION_COLUMNS).to_excel(writer, sheet_name='Participations', index=False)
+
+    assert migrate_participations(workbook)['records_created'] == 2
+    assert migrate_participations(workbook)['students_unchanged'] == 2
+
+    # The sheet is emptied behind the manifest's back: every student is migrated again
+    write_sheet(workbook, 'Participations', pd.DataFrame(columns=PARTICIPATION_COLUMNS))
+    summary = migrate_participations(workbook)
+
+    assert summary['students_unchanged'] == 0
+    assert summary['records_created'] == 2
+    assert len(pd.read_excel(workbook, sheet_name='Participations')) == 2
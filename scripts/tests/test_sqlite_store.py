@@ -0,0 +1,35 @@
+import pandas as pd
+
+from data_pipeline import DataPipeline
+from sqlite_store import SqliteSession
+
+
+def test_assign_ids_keeps_participations(tmp_path):
+    db = str(tmp_path / 'students.db')
+    master = pd.DataFrame({
+        'id': [5, 6, 7],
+        'Student_ID': ['UGO_C1_001', 'UGO_C1_002', 'UGO_C2_001'],
+        'Full_Name': ['Ram Thapa', 'Sita Rai', 'Hari Gurung'],
+        'Source_Sheet': ['C1', 'C1', 'C2'],
+        'Cohort': ['C1', 'C1', 'C2'],
+    })
+    participations = pd.DataFrame({
+        'participation_id': [1, 2, 3],
+        'student_id': [7, 5, 6],
+        'event_name': ['Workshop', 'Seminar', 'Hackathon'],
+    })
+    with SqliteSession(db) as session:
+        session.set_sheet('Master_Database', master)
+        session.set_sheet('Participations', participations)
+        session.save()
+
+    summary = DataPipeline(db, stages=['assign_ids'], backend='sqlite').run()
+
+    assert summary['success'] and summary['saved']
+    with SqliteSession(db) as session:
+        assert session.sheet('Master_Database')['id'].tolist() == [1, 2, 3]
+        # Each participation still belongs to the same student
+        expected = participations.assign(student_id=[3, 1, 2])
+        assert session.sheet('Participations').equals(expected)
+        cohort_ids = session.connection.execute('SELECT id FROM cohort_c1 ORDER BY id').fetchall()
+        assert cohort_ids == [(1,), (2,)]
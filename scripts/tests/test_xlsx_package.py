@@ -0,0 +1,59 @@
+import datetime
+import os
+import zipfile
+
+import pandas as pd
+
+from xlsx_package import append_rows, write_sheet
+
+
+def make_workbook(path, **sheets):
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+
+
+def test_dates_read_back_as_dates(tmp_path):
+    workbook = tmp_path / 'students.xlsx'
+    make_workbook(workbook, Participations=pd.DataFrame({'student_id': [1], 'date': ['old']}))
+    df = pd.DataFrame({
+        'student_id': [1, 2, 3],
+        'date': pd.to_datetime(['2024-01-15 00:00', '2024-02-29 13:30', None]),
+    })
+
+    write_sheet(str(workbook), 'Participations', df)
+    append_rows(str(workbook), 'Participations', pd.DataFrame({
+        'student_id': [4], 'date': [datetime.date(1900, 1, 1)]}))
+
+    result = pd.read_excel(workbook, sheet_name='Participations')
+    assert pd.api.types.is_datetime64_any_dtype(result['date'])
+    expected = pd.concat([df, pd.DataFrame({'student_id': [4], 'date': pd.to_datetime(['1900-01-01'])})],
+                         ignore_index=True)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_rewrite_keeps_file_mode(tmp_path):
+    workbook = tmp_path / 'students.xlsx'
+    make_workbook(workbook, Master_Database=pd.DataFrame({'id': [1, 2]}))
+    os.chmod(workbook, 0o644)
+
+    write_sheet(str(workbook), 'Master_Database', pd.DataFrame({'id': [1]}))
+
+    assert os.stat(workbook).st_mode & 0o777 == 0o644
+
+
+def test_ranges_follow_the_row_count(tmp_path):
+    workbook = tmp_path / 'students.xlsx'
+    make_workbook(workbook, Master_Database=pd.DataFrame({'id': [1, 2, 3]}))
+    with pd.ExcelWriter(workbook, engine='openpyxl', mode='a', if_sheet_exists='overlay') as writer:
+        sheet = writer.book['Master_Database']
+        sheet.auto_filter.ref = 'A1:A4'
+        sheet.merge_cells('A2:A3')
+
+    write_sheet(str(workbook), 'Master_Database', pd.DataFrame({'id': [1]}))
+
+    with zipfile.ZipFile(workbook) as zf:
+        xml = zf.read('xl/worksheets/sheet1.xml').decode('utf-8')
+    assert 'ref="A1:A2"' in xml
+    assert 'mergeCell' not in xml
+    assert pd.read_excel(workbook, sheet_name='Master_Database')['id'].tolist() == [1]
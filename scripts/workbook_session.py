@@ -0,0 +1,296 @@
+"""
+Workbook Session
+Opens students.xlsx once and shares the parsed sheets between the
+load, process and save steps of a script run.
+
+Changes can also be collected with set_sheet()/append_rows() and written
+together by save(), so several steps in one process rewrite the file
+only once.
+
+With pyarrow installed, sheets are read from their Parquet mirror while
+it is fresh (see sheet_mirror), parsed sheets are mirrored, and sheets
+written by save() are parsed again so their mirrors stay current.
+
+open_session() opens the same interface on the SQLite store instead
+(see sqlite_store).
+"""
+
+import sys
+import time
+
+from backup_store import backup_workbook
+from sheet_mirror import SheetMirror, available as mirror_available
+from startup import lazy_import
+from xlsx_package import sheet_fingerprints, sheet_names as sheet_names_on_file, update_sheets, write_sheet
+
+pd = lazy_import('pandas')
+
+BACKENDS = ['xlsx', 'sqlite']
+
+
+def open_session(file_path, backend='xlsx'):
+    """A WorkbookSession of an .xlsx file, or an SqliteSession of a database file"""
+    if backend == 'sqlite':
+        from sqlite_store import SqliteSession
+        return SqliteSession(file_path)
+    if backend != 'xlsx':
+        raise ValueError(f"Unknown backend: {backend}")
+    return WorkbookSession(file_path)
+
+
+class WorkbookSession:
+    """Parse each sheet of a workbook at most once per run"""
+
+    def __init__(self, file_path, mirror=True):
+        self.file_path = file_path
+        self.frames = {}
+        self.dirty = set()
+        self.appended = {}
+        # Sheets written by save() and not parsed again since
+        self.written = set()
+        self._excel = None
+        self._sheet_names = None
+        self._on_save = []
+        # Parquet copies of the sheets; None without pyarrow
+        self.mirror = SheetMirror(file_path) if mirror and mirror_available() else None
+        # Re-parse written sheets in save() to refresh their mirrors (callers
+        # with idle time, like the data worker, can do it later instead)
+        self.mirror_on_save = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _open(self):
+        if self._excel is None:
+            self._excel = pd.ExcelFile(self.file_path, engine='openpyxl')
+        return self._excel
+
+    @property
+    def sheet_names(self):
+        """Sheet names in workbook order (read from the workbook manifest)"""
+        if self._sheet_names is None:
+            self._sheet_names = sheet_names_on_file(self.file_path)
+        return self._sheet_names
+
+    def has_sheet(self, sheet_name):
+        return sheet_name in self.sheet_names
+
+    def sheet(self, sheet_name):
+        """
+        Return the parsed sheet, parsing it on first use.
+
+        The frame is shared: callers that change it should work on a copy
+        or hand the result back through set_sheet().
+        """
+        if sheet_name not in self.frames:
+            if sheet_name not in self.sheet_names:
+                raise KeyError(f"Worksheet named '{sheet_name}' not found")
+            df = self._load(sheet_name)
+            if sheet_name in self.appended:
+                df = pd.concat([df, self.appended[sheet_name]], ignore_index=True)
+            self.frames[sheet_name] = df
+            self.written.discard(sheet_name)
+        return self.frames[sheet_name]
+
+    def _load(self, sheet_name):
+        """The sheet as stored: from its fresh mirror, else parsed (and mirrored)"""
+        df = self.mirror.read(sheet_name) if self.mirror is not None else None
+        if df is None:
+            df = self._open().parse(sheet_name)
+            if self.mirror is not None:
+                self.mirror.store(sheet_name, df)
+        return df
+
+    def set_sheet(self, sheet_name, df):
+        """Replace a sheet's frame (adds the sheet if it is new); written by save()"""
+        self.frames[sheet_name] = df
+        self.dirty.add(sheet_name)
+        self.appended.pop(sheet_name, None)
+        if sheet_name not in self.sheet_names:
+            self._sheet_names.append(sheet_name)
+
+    def append_rows(self, sheet_name, df):
+        """
+        Add rows to the end of an existing sheet; written by save().
+
+        df's columns must be in the sheet's column order. Unless the whole
+        sheet is being replaced anyway, save() appends the rows without
+        rewriting the ones already in the file.
+        """
+        if sheet_name not in self.sheet_names:
+            raise KeyError(f"Worksheet named '{sheet_name}' not found")
+        if df.empty:
+            return
+        if sheet_name in self.frames:
+            self.frames[sheet_name] = pd.concat([self.frames[sheet_name], df], ignore_index=True)
+        if sheet_name in self.dirty:
+            return
+        pending = self.appended.get(sheet_name)
+        self.appended[sheet_name] = df if pending is None else pd.concat([pending, df], ignore_index=True)
+
+    def after_save(self, callback):
+        """Run callback() once the pending changes have been written by save()"""
+        self._on_save.append(callback)
+
+    @property
+    def has_changes(self):
+        return bool(self.dirty or self.appended)
+
+    def save(self):
+        """
+        Write every pending change in one rewrite of the file.
+
+        Existing sheets are replaced or appended to in place and all other
+        sheets are copied byte for byte. Adding a new sheet rewrites the
+        whole workbook, parsing every sheet not loaded yet. Written sheets
+        are re-read on next use, so the session keeps matching the file.
+        """
+        if self.has_changes:
+            on_file = set(sheet_names_on_file(self.file_path))
+            if self.dirty - on_file:
+                self._rewrite_all()
+            else:
+                self.close()
+                update_sheets(self.file_path,
+                              replace={name: self.frames[name] for name in self.dirty},
+                              append=self.appended)
+                self._forget(self.dirty | set(self.appended))
+            self.dirty.clear()
+            self.appended.clear()
+            self._refresh_mirror()
+        self._run_after_save()
+
+    def _run_after_save(self):
+        callbacks, self._on_save = self._on_save, []
+        for callback in callbacks:
+            callback()
+
+    def sheet_fingerprints(self, sheet_names=None):
+        """{sheet name: content fingerprint} of the saved file (see xlsx_package)"""
+        return sheet_fingerprints(self.file_path, sheet_names)
+
+    def backup(self, label=None):
+        """Snapshot the saved file (see backup_store); returns the record with its 'id'"""
+        return backup_workbook(self.file_path, label=label)
+
+    def all_sheets(self):
+        """Every sheet in workbook order, parsing the ones not loaded yet"""
+        return {name: self.sheet(name) for name in self.sheet_names}
+
+    def save_sheet(self, sheet_name, df):
+        """
+        Write one sheet back to the workbook file.
+
+        An existing sheet is replaced in place and every other sheet is
+        copied byte for byte. A new sheet needs the whole workbook
+        rewritten, which parses every sheet not loaded yet.
+        """
+        exists = sheet_name in self.sheet_names
+        self.set_sheet(sheet_name, df)
+        if exists:
+            self.close()
+            write_sheet(self.file_path, sheet_name, df)
+            self.dirty.discard(sheet_name)
+            self._forget([sheet_name])
+            self._refresh_mirror()
+            return
+
+        self._rewrite_all()
+        self.dirty.clear()
+        self.appended.clear()
+        self._refresh_mirror()
+
+    def _rewrite_all(self):
+        """Write every sheet with ExcelWriter (needed when adding a sheet)"""
+        all_sheets = self.all_sheets()
+        self.close()
+        with pd.ExcelWriter(self.file_path, engine='openpyxl', mode='w') as writer:
+            for name, data in all_sheets.items():
+                data.to_excel(writer, sheet_name=name, index=False)
+        self._forget(all_sheets)
+
+    def _forget(self, sheet_names):
+        """Drop parsed frames so the next sheet() call re-reads them from the file"""
+        for name in sheet_names:
+            self.frames.pop(name, None)
+            self.written.add(name)
+        if self.mirror is not None:
+            self.mirror.forget_fingerprints()
+
+    def _refresh_mirror(self):
+        """Parse the sheets just written, which mirrors them again"""
+        if self.mirror is None or not self.mirror_on_save:
+            return
+        for name in sorted(self.written):
+            if name in self.sheet_names:
+                self.sheet(name)
+
+    def close(self):
+        """Release the file handle (needed before rewriting the file on Windows)"""
+        if self._excel is not None:
+            self._excel.close()
+            self._excel = None
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB, or None if unavailable"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD),
+                ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize / (1024 * 1024)
+    except (AttributeError, OSError):
+        pass
+
+    return None
+
+
+class RunTimer:
+    """Wall-clock time and peak memory for one script run"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+
+    def stats(self):
+        peak = peak_memory_mb()
+        return {
+            'seconds': round(time.perf_counter() - self.started, 3),
+            'peak_memory_mb': round(peak, 1) if peak is not None else None,
+        }
+
+    def report(self):
+        stats = self.stats()
+        memory = f"{stats['peak_memory_mb']:.1f} MB" if stats['peak_memory_mb'] is not None else 'n/a'
+        print(f"⏱️  Run time: {stats['seconds']:.2f}s | Peak memory: {memory}")
+        return stats
@@ -0,0 +1,518 @@
+"""
+XLSX Package Helpers
+Works on the xlsx zip container directly: maps sheet names to their XML
+parts, fingerprints sheets without parsing any cell data, and rewrites or
+appends to a single sheet while copying every other part unchanged.
+
+Dates and times are written as Excel serial numbers with one of the
+built-in date formats, added to the workbook's cell styles when needed,
+so they read back as dates. Sheets with Excel tables are rewritten with
+pandas instead, since the tables' ranges live in parts of their own.
+"""
+
+import datetime
+import hashlib
+import numbers
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+
+from startup import lazy_import
+
+pd = lazy_import('pandas')
+
+WORKBOOK_PART = 'xl/workbook.xml'
+WORKBOOK_RELS_PART = 'xl/_rels/workbook.xml.rels'
+SHARED_STRINGS_PART = 'xl/sharedStrings.xml'
+STYLES_PART = 'xl/styles.xml'
+CONTENT_TYPES_PART = '[Content_Types].xml'
+CALC_CHAIN_PART = 'xl/calcChain.xml'
+
+# Built-in number formats Excel (and openpyxl) read as a date, a time, a date with time
+DATE_FORMATS = {'date': 14, 'time': 21, 'datetime': 22}
+EPOCH_1900 = datetime.datetime(1899, 12, 30)
+EPOCH_1904 = datetime.datetime(1904, 1, 1)
+
+# Characters XML 1.0 does not allow, even escaped
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_ROOT_TAG = re.compile(rb'<(\w+:)?worksheet[\s>]')
+
+
+class UnsupportedSheet(ValueError):
+    """A sheet the in-place writers cannot update correctly"""
+
+
+def _local(tag):
+    """Tag or attribute name without its namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _attr(element, name):
+    for key, value in element.attrib.items():
+        if _local(key) == name:
+            return value
+    return None
+
+
+def read_sheet_parts(zf):
+    """Ordered {sheet name: zip part name} for an open ZipFile"""
+    rels_root = ET.fromstring(zf.read(WORKBOOK_RELS_PART))
+    targets = {}
+    for rel in rels_root:
+        target = rel.get('Target', '')
+        if target.startswith('/'):
+            part = target.lstrip('/')
+        else:
+            part = posixpath.normpath(posixpath.join('xl', target))
+        targets[rel.get('Id')] = part
+
+    workbook_root = ET.fromstring(zf.read(WORKBOOK_PART))
+    parts = {}
+    for element in workbook_root.iter():
+        if _local(element.tag) == 'sheet':
+            parts[element.get('name')] = targets.get(_attr(element, 'id'))
+    return parts
+
+
+def sheet_parts(file_path):
+    """Ordered {sheet name: zip part name} read from the workbook manifest"""
+    with zipfile.ZipFile(file_path) as zf:
+        return read_sheet_parts(zf)
+
+
+def sheet_names(file_path):
+    """Sheet names in workbook order, without loading any cell data"""
+    return list(sheet_parts(file_path))
+
+
+def sheet_fingerprints(file_path, names=None):
+    """
+    {sheet name: sha256} of each sheet's raw XML plus the shared strings table.
+
+    Cells can point into the shared strings table, so a sheet only counts
+    as unchanged when both its own part and that table are byte-identical.
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        parts = read_sheet_parts(zf)
+        strings = hashlib.sha256()
+        if SHARED_STRINGS_PART in zf.namelist():
+            strings.update(zf.read(SHARED_STRINGS_PART))
+        strings_digest = strings.hexdigest()
+
+        fingerprints = {}
+        for name, part in parts.items():
+            if names is not None and name not in names:
+                continue
+            digest = hashlib.sha256(zf.read(part))
+            digest.update(strings_digest.encode())
+            fingerprints[name] = digest.hexdigest()
+        return fingerprints
+
+
+def column_letter(index):
+    """0 -> 'A', 26 -> 'AA'"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _escape(text):
+    """&, < and > as entities, like xml.sax.saxutils.escape (which pulls in urllib and ssl)"""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+class DateStyles:
+    """
+    Cell style indices for dates, added to a workbook's styles.xml on first use.
+
+    xml is the styles part (None if the workbook has none); changed tells
+    whether it needs writing back.
+    """
+
+    def __init__(self, xml, date1904=False):
+        self.xml = xml
+        self.epoch = EPOCH_1904 if date1904 else EPOCH_1900
+        self.date1904 = date1904
+        self.indices = {}
+        self.changed = False
+
+    def index(self, kind):
+        if kind not in self.indices:
+            self.indices[kind] = self._add(DATE_FORMATS[kind])
+        return self.indices[kind]
+
+    def _add(self, number_format):
+        match = self.xml and re.search(
+            rb'<(\w+:)?cellXfs\b[^>]*?(/>|>(.*?)</(?:\w+:)?cellXfs>)', self.xml, re.S)
+        if not match:
+            raise UnsupportedSheet("The workbook has no cell styles to format dates with")
+        prefix = match.group(1) or b''
+        body = match.group(3) or b''
+        entries = re.findall(rb'<' + re.escape(prefix) + rb'xf\b[^>]*', body)
+        for i, entry in enumerate(entries):
+            if re.search(rb'\snumFmtId="' + str(number_format).encode() + rb'"', entry) \
+                    and re.search(rb'\sapplyNumberFormat="(1|true)"', entry):
+                return i
+        xf = (b'<' + prefix + b'xf numFmtId="' + str(number_format).encode()
+              + b'" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>')
+        element = (b'<' + prefix + b'cellXfs count="' + str(len(entries) + 1).encode() + b'">'
+                   + body + xf + b'</' + prefix + b'cellXfs>')
+        self.xml = self.xml[:match.start()] + element + self.xml[match.end():]
+        self.changed = True
+        return len(entries)
+
+    def serial(self, value):
+        """(Excel serial number, format kind) of a date, time or datetime"""
+        if isinstance(value, datetime.datetime):
+            value = value.replace(tzinfo=None)
+            days = (value - self.epoch) / datetime.timedelta(days=1)
+            kind = 'datetime'
+        elif isinstance(value, datetime.date):
+            days = (value - self.epoch.date()).days
+            kind = 'date'
+        else:
+            seconds = value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+            return seconds / 86400, 'time'
+        # Excel counts a 29 February 1900 that never was
+        if not self.date1904 and days < 61:
+            days -= 1
+        if days < 0 or (not self.date1904 and days < 1):
+            raise ValueError(f"{value} is before the workbook's first date")
+        return days, kind
+
+
+def _cell_xml(ref, value, prefix, styles):
+    """One <c> element with an inline value, or '' for an empty cell"""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        if value == '':
+            return ''
+    elif type(value).__name__ in ('bool', 'bool_'):
+        return f'<{prefix}c r="{ref}" t="b"><{prefix}v>{int(value)}</{prefix}v></{prefix}c>'
+    elif isinstance(value, numbers.Number):
+        if value != value:
+            return ''
+        if isinstance(value, numbers.Integral):
+            return f'<{prefix}c r="{ref}"><{prefix}v>{int(value)}</{prefix}v></{prefix}c>'
+        number = float(value)
+        if number in (float('inf'), float('-inf')):
+            value = str(number)
+        else:
+            return f'<{prefix}c r="{ref}"><{prefix}v>{number!r}</{prefix}v></{prefix}c>'
+    elif isinstance(value, (datetime.date, datetime.time)):
+        if value != value:  # NaT
+            return ''
+        try:
+            serial, kind = styles.serial(value)
+        except ValueError:
+            value = value.isoformat(sep=' ') if isinstance(value, datetime.datetime) else value.isoformat()
+        else:
+            number = serial if isinstance(serial, int) else repr(float(serial))
+            return (f'<{prefix}c r="{ref}" s="{styles.index(kind)}">'
+                    f'<{prefix}v>{number}</{prefix}v></{prefix}c>')
+    else:
+        if value != value:  # float-like missing values such as pd.NA
+            return ''
+        value = str(value)
+
+    text = _escape(_ILLEGAL_XML.sub('', value))
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<{prefix}c r="{ref}" t="inlineStr"><{prefix}is><{prefix}t{space}>{text}</{prefix}t></{prefix}is></{prefix}c>'
+
+
+def _missing(value):
+    try:
+        return bool(value != value)
+    except TypeError:  # pd.NA refuses to be a bool
+        return True
+
+
+def sheet_rows_xml(rows, start_row, width, prefix, styles):
+    """<row> elements for value tuples, numbered from start_row (styles: DateStyles)"""
+    letters = [column_letter(i) for i in range(width)]
+    parts = []
+    for offset, row in enumerate(rows):
+        number = start_row + offset
+        cells = []
+        for letter, value in zip(letters, row):
+            try:
+                cell = _cell_xml(f'{letter}{number}', value, prefix, styles)
+            except TypeError:
+                cell = '' if _missing(value) else _cell_xml(f'{letter}{number}', str(value), prefix, styles)
+            if cell:
+                cells.append(cell)
+        parts.append(f'<{prefix}row r="{number}">{"".join(cells)}</{prefix}row>')
+    return ''.join(parts)
+
+
+def _frame_values(df):
+    yield from df.itertuples(index=False, name=None)
+
+
+def _frame_rows(df):
+    yield tuple(str(col) for col in df.columns)
+    yield from df.itertuples(index=False, name=None)
+
+
+def _drop_calc_chain(zf, name, data):
+    """Remove calcChain references; Excel rebuilds the chain when it opens the file"""
+    if name == CONTENT_TYPES_PART:
+        return re.sub(rb'<Override[^>]*PartName="/xl/calcChain\.xml"[^>]*/>', b'', data)
+    if name == WORKBOOK_RELS_PART:
+        return re.sub(rb'<Relationship[^>]*Target="(/xl/)?calcChain\.xml"[^>]*/>', b'', data)
+    return data
+
+
+def rewrite_parts(file_path, replacements):
+    """
+    Rewrite the workbook with some parts replaced and every other part copied as-is.
+
+    replacements maps part name -> new bytes. The new file is written
+    next to the old one and swapped in atomically.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(suffix='.xlsx', dir=directory)
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(file_path) as zin, \
+                zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zout:
+            drop_calc_chain = CALC_CHAIN_PART in zin.namelist()
+            for info in zin.infolist():
+                if drop_calc_chain and info.filename == CALC_CHAIN_PART:
+                    continue
+                if info.filename in replacements:
+                    data = replacements[info.filename]
+                else:
+                    data = zin.read(info.filename)
+                    if drop_calc_chain:
+                        data = _drop_calc_chain(zin, info.filename, data)
+                zout.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED)
+        # mkstemp creates the file as 0600; keep the workbook's own permissions
+        shutil.copymode(file_path, tmp_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _sheet_prefix(xml, sheet_name):
+    root = _ROOT_TAG.search(xml)
+    if root is None:
+        raise ValueError(f"Unexpected XML in worksheet '{sheet_name}'")
+    return (root.group(1) or b'').decode()
+
+
+def _set_dimension(xml, prefix, ref):
+    prefix_bytes = re.escape(prefix.encode())
+    return re.sub(rb'(<' + prefix_bytes + rb'dimension\s+ref=")[^"]*(")',
+                  lambda m: m.group(1) + ref.encode() + m.group(2), xml, count=1)
+
+
+def sheet_row_count(file_path, sheet_name):
+    """
+    Rows in a sheet (header included) from its <dimension> tag, or None.
+
+    Only the first few KB of the sheet are read.
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        parts = read_sheet_parts(zf)
+        if sheet_name not in parts:
+            raise KeyError(f"Worksheet named '{sheet_name}' not found")
+        with zf.open(parts[sheet_name]) as f:
+            head = f.read(4096)
+    match = re.search(rb'<(?:\w+:)?dimension\s+ref="[A-Z]+\d+(?::[A-Z]+(\d+))?"', head)
+    if match is None:
+        return None
+    return int(match.group(1)) if match.group(1) else 1
+
+
+def _last_row(xml, prefix_bytes, data_start, end):
+    """Number of the last <row> between data_start and end, 0 if there is none"""
+    last_row_at = xml.rfind(b'<' + prefix_bytes + b'row', data_start, end)
+    if last_row_at == -1:
+        return 0
+    tag_end = xml.find(b'>', last_row_at)
+    number = re.search(rb'\sr="(\d+)"', xml[last_row_at:tag_end])
+    if number:
+        return int(number.group(1))
+    return len(re.findall(rb'<' + re.escape(prefix_bytes) + rb'row[\s>]', xml[data_start:end]))
+
+
+def _check_ranges(xml, prefix, sheet_name):
+    """Refuse sheets whose Excel tables would need their ranges rewritten in other parts"""
+    if re.search(rb'<' + re.escape(prefix.encode()) + rb'tablePart\b', xml):
+        raise UnsupportedSheet(f"Worksheet '{sheet_name}' has Excel tables")
+
+
+def _resize_ranges(xml, prefix, last_row):
+    """
+    Fit range references to a sheet whose data now ends at last_row.
+
+    The autoFilter is stretched or shrunk to the new last row; merged
+    cells below the header row described the old data and are removed.
+    """
+    prefix_bytes = re.escape(prefix.encode())
+    xml = re.sub(rb'(<' + prefix_bytes + rb'autoFilter\b[^>]*?\sref="[A-Z]+\d+:[A-Z]+)\d+(")',
+                 lambda m: m.group(1) + str(last_row).encode() + m.group(2), xml, count=1)
+
+    merges = re.search(rb'<' + prefix_bytes + rb'mergeCells\b[^>]*?(?:/>|>.*?</' + prefix_bytes + rb'mergeCells>)',
+                       xml, re.S)
+    if merges is None:
+        return xml
+    kept = [cell for cell in re.findall(rb'<' + prefix_bytes + rb'mergeCell\b[^>]*/>', merges.group(0))
+            if re.search(rb'\sref="[A-Z]+1:[A-Z]+1"', cell)]
+    if kept:
+        element = (b'<' + prefix.encode() + b'mergeCells count="' + str(len(kept)).encode() + b'">'
+                   + b''.join(kept) + b'</' + prefix.encode() + b'mergeCells>')
+    else:
+        element = b''
+    return xml[:merges.start()] + element + xml[merges.end():]
+
+
+def _appended_xml(xml, prefix, df, sheet_name, styles):
+    """Sheet XML with df's rows added after the last used row"""
+    prefix_bytes = prefix.encode()
+    _check_ranges(xml, prefix, sheet_name)
+
+    close_tag = b'</' + prefix_bytes + b'sheetData>'
+    end = xml.rfind(close_tag)
+    if end == -1:
+        empty = re.search(rb'<' + re.escape(prefix_bytes) + rb'sheetData\s*/>', xml)
+        if empty is None:
+            raise ValueError(f"No sheetData in worksheet '{sheet_name}'")
+        xml = xml[:empty.start()] + b'<' + prefix_bytes + b'sheetData>' + close_tag + xml[empty.end():]
+        end = xml.rfind(close_tag)
+
+    # Last used row: the r attribute of the last <row>, or the number of rows
+    data_start = xml.find(b'<' + prefix_bytes + b'sheetData')
+    last_row = _last_row(xml, prefix_bytes, data_start, end)
+
+    width = len(df.columns)
+    rows = sheet_rows_xml(_frame_values(df), last_row + 1, width, prefix, styles).encode('utf-8')
+    xml = xml[:end] + rows + xml[end:]
+    xml = _resize_ranges(xml, prefix, last_row + len(df))
+
+    dimension = re.search(rb'<' + re.escape(prefix_bytes) + rb'dimension\s+ref="[A-Z]+\d+(?::([A-Z]+)\d+)?"', xml)
+    last_column = dimension.group(1).decode() if dimension and dimension.group(1) else 'A'
+    if len(last_column) < len(column_letter(width - 1)) or (
+            len(last_column) == len(column_letter(width - 1)) and last_column < column_letter(width - 1)):
+        last_column = column_letter(width - 1)
+    return _set_dimension(xml, prefix, f'A1:{last_column}{last_row + len(df)}')
+
+
+def _replaced_xml(xml, prefix, df, sheet_name, styles):
+    """Sheet XML with its cell data replaced by df (header row first)"""
+    prefix_bytes = prefix.encode()
+    _check_ranges(xml, prefix, sheet_name)
+
+    width = len(df.columns)
+    height = len(df) + 1
+    rows = sheet_rows_xml(_frame_rows(df), 1, width, prefix, styles).encode('utf-8')
+    sheet_data = b'<' + prefix_bytes + b'sheetData>' + rows + b'</' + prefix_bytes + b'sheetData>'
+
+    data_pattern = re.compile(
+        rb'<' + re.escape(prefix_bytes) + rb'sheetData\s*/>|<' + re.escape(prefix_bytes)
+        + rb'sheetData[\s>].*?</' + re.escape(prefix_bytes) + rb'sheetData>', re.S)
+    match = data_pattern.search(xml)
+    if match is None:
+        raise ValueError(f"No sheetData in worksheet '{sheet_name}'")
+    old_height = _last_row(xml, prefix_bytes, match.start(), match.end())
+    xml = xml[:match.start()] + sheet_data + xml[match.end():]
+    if old_height != height:
+        xml = _resize_ranges(xml, prefix, height)
+    return _set_dimension(xml, prefix, f'A1:{column_letter(max(width, 1) - 1)}{height}')
+
+
+def update_sheets(file_path, replace=None, append=None):
+    """
+    Replace and/or append to several existing sheets in one rewrite.
+
+    replace maps sheet name -> DataFrame written as the sheet's new cell
+    data (see write_sheet); append maps sheet name -> DataFrame whose
+    rows go after the last used row (see append_rows). Every other part
+    is copied unchanged. Raises KeyError if a sheet does not exist.
+
+    Workbooks the XML writers cannot update correctly (sheets with Excel
+    tables, no cell styles for dates) are updated through openpyxl.
+    """
+    replace = replace or {}
+    append = {name: df for name, df in (append or {}).items() if not df.empty}
+    if not replace and not append:
+        return
+
+    replacements = {}
+    with zipfile.ZipFile(file_path) as zf:
+        parts = read_sheet_parts(zf)
+        for sheet_name in list(replace) + list(append):
+            if sheet_name not in parts:
+                raise KeyError(f"Worksheet named '{sheet_name}' not found")
+        names = zf.namelist()
+        date1904 = re.search(rb'\sdate1904="(1|true)"', zf.read(WORKBOOK_PART)) is not None
+        styles = DateStyles(zf.read(STYLES_PART) if STYLES_PART in names else None, date1904)
+        try:
+            for sheet_name in set(replace) | set(append):
+                part = parts[sheet_name]
+                xml = zf.read(part)
+                prefix = _sheet_prefix(xml, sheet_name)
+                if sheet_name in replace:
+                    xml = _replaced_xml(xml, prefix, replace[sheet_name], sheet_name, styles)
+                if sheet_name in append:
+                    xml = _appended_xml(xml, prefix, append[sheet_name], sheet_name, styles)
+                replacements[part] = xml
+        except UnsupportedSheet:
+            replacements = None
+    if replacements is None:
+        _update_with_openpyxl(file_path, replace, append)
+        return
+
+    if styles.changed:
+        replacements[STYLES_PART] = styles.xml
+    rewrite_parts(file_path, replacements)
+
+
+def _update_with_openpyxl(file_path, replace, append):
+    """Slow path of update_sheets: replace the sheets through pandas' openpyxl writer"""
+    frames = dict(replace)
+    for sheet_name, df in append.items():
+        current = frames.get(sheet_name)
+        if current is None:
+            current = pd.read_excel(file_path, sheet_name=sheet_name)
+        df = df.set_axis(current.columns, axis=1)
+        frames[sheet_name] = pd.concat([current, df], ignore_index=True)
+    with pd.ExcelWriter(file_path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
+        for sheet_name, df in frames.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def append_rows(file_path, sheet_name, df):
+    """
+    Append a DataFrame's rows after the last used row of an existing sheet.
+
+    The columns of df must already be in the sheet's column order; no
+    header is written. Existing rows are copied as raw XML, never parsed,
+    so the cost depends on the rows added rather than the sheet size.
+    """
+    update_sheets(file_path, append={sheet_name: df})
+
+
+def write_sheet(file_path, sheet_name, df):
+    """
+    Replace one existing sheet's cell data in place.
+
+    Only the sheet's <sheetData> and <dimension> change (and its
+    autoFilter and merged cells, if the row count does): column widths,
+    views and other settings are kept, and every other part of the
+    workbook is copied unchanged, apart from date formats added to the
+    styles. Strings are written inline so the shared strings table is
+    left alone. Raises KeyError if the sheet does not exist.
+    """
+    update_sheets(file_path, replace={sheet_name: df})
@@ -0,0 +1,131 @@
+"""
+Streaming XLSX Reader
+Reads large sheets in row batches through openpyxl's read-only mode,
+so scripts can work on 100k+ row workbooks with bounded memory.
+"""
+
+from startup import lazy_import
+
+openpyxl = lazy_import('openpyxl')
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _header_names(raw_header):
+    """Name headers like pandas does: blanks become 'Unnamed: N', duplicates get '.1', '.2'"""
+    names = []
+    seen = {}
+    for i, value in enumerate(raw_header):
+        name = f'Unnamed: {i}' if value is None or str(value).strip() == '' else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _clean_header(raw_header):
+    """Header names with trailing blank cells dropped, like pandas does"""
+    raw_header = list(raw_header)
+    while raw_header and raw_header[-1] is None:
+        raw_header.pop()
+    return _header_names(raw_header)
+
+
+def _select(header, columns):
+    """Positions of the wanted columns; columns is None, a list of names or a predicate"""
+    if columns is None:
+        return list(range(len(header)))
+    if callable(columns):
+        return [i for i, name in enumerate(header) if columns(name)]
+    wanted = set(columns)
+    return [i for i, name in enumerate(header) if name in wanted]
+
+
+def open_workbook(file_path):
+    """
+    Open a workbook read-only, to stream several of its sheets.
+
+    Opening costs a scan of every sheet that lacks a <dimension> element
+    (as sheets written by pandas do), so open once and pass the workbook
+    to each SheetStream. Close it when done.
+    """
+    return openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+
+
+class SheetStream:
+    """Row batches of one sheet, opened read-only"""
+
+    def __init__(self, file_path, sheet_name, chunk_size=DEFAULT_CHUNK_SIZE, columns=None, workbook=None):
+        self.file_path = file_path
+        self.sheet_name = sheet_name
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        self.columns = columns
+        # An open_workbook() of file_path to read from (left open)
+        self.workbook = workbook
+
+    def __iter__(self):
+        workbook = self.workbook or open_workbook(self.file_path)
+        try:
+            if self.sheet_name not in workbook.sheetnames:
+                raise KeyError(f"Worksheet named '{self.sheet_name}' not found")
+            rows = workbook[self.sheet_name].iter_rows(values_only=True)
+
+            header = _clean_header(next(rows, ()))
+            positions = _select(header, self.columns)
+            self.header = [header[i] for i in positions]
+            width = len(header)
+
+            batch = []
+            for row in rows:
+                if len(row) < width:
+                    row = tuple(row) + (None,) * (width - len(row))
+                batch.append(tuple(row[i] for i in positions))
+                if len(batch) >= self.chunk_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            if workbook is not self.workbook:
+                workbook.close()
+
+
+def read_header(file_path, sheet_name):
+    """Column names of a sheet without reading its data"""
+    workbook = open_workbook(file_path)
+    try:
+        if sheet_name not in workbook.sheetnames:
+            raise KeyError(f"Worksheet named '{sheet_name}' not found")
+        raw_header = next(workbook[sheet_name].iter_rows(max_row=1, values_only=True), ())
+    finally:
+        workbook.close()
+    return _clean_header(raw_header)
+
+
+def iter_row_batches(file_path, sheet_name, chunk_size=DEFAULT_CHUNK_SIZE, columns=None):
+    """Yield (header, rows) with at most chunk_size value tuples per batch"""
+    stream = SheetStream(file_path, sheet_name, chunk_size, columns)
+    for batch in stream:
+        yield stream.header, batch
+
+
+def iter_frames(file_path, sheet_name, chunk_size=DEFAULT_CHUNK_SIZE, columns=None):
+    """Yield the sheet as DataFrames of at most chunk_size rows"""
+    import pandas as pd
+
+    for header, batch in iter_row_batches(file_path, sheet_name, chunk_size, columns):
+        yield pd.DataFrame.from_records(batch, columns=header)
+
+
+def read_columns(file_path, sheet_name, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Read only some columns of a sheet into one DataFrame, streaming the rest past"""
+    import pandas as pd
+
+    frames = list(iter_frames(file_path, sheet_name, chunk_size, columns))
+    if not frames:
+        header = read_header(file_path, sheet_name)
+        return pd.DataFrame(columns=[header[i] for i in _select(header, columns)])
+    return pd.concat(frames, ignore_index=True)
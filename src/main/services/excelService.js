@@ -4,7 +4,7 @@ import XLSX from 'xlsx';
 import path from 'path';
 import { fileURLToPath } from 'url';
 import fs from 'fs';
-import { spawn } from 'child_process';
+import { requestWorker, stopWorker } from './pythonWorker.js';
 
 // __dirname replacement for ES modules
 const __filename = fileURLToPath(import.meta.url);
@@ -1140,62 +1140,30 @@ ipcMain.handle('excel:addCohort', (event, cohortName) => {
 });
 
 /**
- * Run Python consolidator script
+ * Run the data pipeline (consolidate, Student_IDs, participations)
+ * in the warm Python worker
  */
 ipcMain.handle('excel:runConsolidator', async () => {
     try {
-        console.log('🔄 Running Python consolidator script...');
-
-        // Get script path
-        const scriptPath = path.resolve(__dirname, '../../scripts/smart_consolidator.py');
-
-        // Check if Python is available
-        const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
-
-        return new Promise((resolve, reject) => {
-            const process = spawn(pythonCommand, [scriptPath]);
-
-            let output = '';
-            let errorOutput = '';
-
-            process.stdout.on('data', (data) => {
-                const text = data.toString();
-                console.log(text);
-                output += text;
-            });
-
-            process.stderr.on('data', (data) => {
-                const text = data.toString();
-                console.error(text);
-                errorOutput += text;
-            });
-
-            process.on('close', (code) => {
-                if (code === 0) {
-                    // Success - refresh cache
-                    readExcelFile();
-
-                    resolve({
-                        success: true,
-                        message: 'Consolidation completed successfully',
-                        output: output
-                    });
-                } else {
-                    reject({
-                        success: false,
-                        error: `Script exited with code ${code}`,
-                        output: errorOutput || output
-                    });
-                }
-            });
-
-            process.on('error', (error) => {
-                reject({
-                    success: false,
-                    error: error.message
-                });
-            });
-        });
+        console.log('🔄 Running Python data pipeline...');
+
+        const summary = await requestWorker('pipeline', { file: excelPath });
+        const consolidation = summary.stages?.find((stage) => stage.stage === 'consolidate');
+
+        if (!summary.success) {
+            return { success: false, error: summary.error, summary };
+        }
+
+        // Success - refresh cache
+        readExcelFile();
+
+        return {
+            success: true,
+            message: consolidation
+                ? `Consolidation completed: ${consolidation.updated} updated, ${consolidation.added} added`
+                : 'Consolidation completed successfully',
+            summary
+        };
 
     } catch (err) {
         console.error('Error running consolidator:', err);
@@ -1203,5 +1171,10 @@ ipcMain.handle('excel:runConsolidator', async () => {
     }
 });
 
+// Stop the Python worker together with the app
+app.on('will-quit', () => {
+    stopWorker();
+});
+
 console.log('✅ Excel Service initialized');
 console.log(`📁 Excel path: ${excelPath}`);
\ No newline at end of file
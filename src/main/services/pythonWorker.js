@@ -0,0 +1,136 @@
+/* eslint-disable prettier/prettier */
+import path from 'path';
+import readline from 'readline';
+import { fileURLToPath } from 'url';
+import { spawn } from 'child_process';
+
+// __dirname replacement for ES modules
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = path.dirname(__filename);
+
+const workerScript = path.resolve(__dirname, '../../scripts/data_worker.py');
+const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
+// A request still unanswered after this long is taken to have hung the worker
+const REQUEST_TIMEOUT_MS = 10 * 60 * 1000;
+
+let worker = null;
+let nextId = 1;
+const pending = new Map();
+
+/**
+ * Fail every request still waiting on `child` (a worker that went away)
+ */
+function rejectPending(child, message) {
+    for (const [id, request] of pending) {
+        if (request.child !== child) continue;
+        pending.delete(id);
+        request.reject(new Error(message));
+    }
+}
+
+/**
+ * Start the Python data worker (scripts/data_worker.py) if it is not running.
+ * It keeps pandas imported and the parsed workbook cached between requests.
+ */
+function startWorker() {
+    if (worker) return worker;
+
+    console.log('🐍 Starting Python data worker...');
+    const child = spawn(pythonCommand, [workerScript], { stdio: ['pipe', 'pipe', 'pipe'] });
+    worker = child;
+
+    // One JSON response per stdout line
+    readline.createInterface({ input: child.stdout }).on('line', (line) => {
+        let response;
+        try {
+            response = JSON.parse(line);
+        } catch {
+            // The line cannot be matched to a request, so no later response can be trusted
+            // either: fail everything waiting and start a fresh worker on the next request
+            console.error('Python worker sent an invalid line:', line);
+            if (worker === child) worker = null;
+            rejectPending(child, 'Python worker sent an invalid response');
+            child.kill();
+            return;
+        }
+
+        const request = pending.get(response.id);
+        if (!request) return;
+        pending.delete(response.id);
+
+        if (response.ok) {
+            request.resolve(response.result);
+        } else {
+            request.reject(new Error(response.error));
+        }
+    });
+
+    // Everything the scripts print goes to stderr
+    child.stderr.on('data', (data) => {
+        console.error(data.toString());
+    });
+
+    child.on('error', (error) => {
+        console.error('Python worker error:', error);
+        if (worker === child) worker = null;
+        rejectPending(child, error.message);
+    });
+
+    child.on('exit', (code) => {
+        console.log(`🐍 Python data worker exited (code ${code})`);
+        if (worker === child) worker = null;
+        rejectPending(child, `Python worker exited with code ${code}`);
+    });
+
+    return child;
+}
+
+/**
+ * Send one request to the worker, starting it on first use.
+ * Resolves with the method's result; rejects with its error, or after
+ * timeoutMs without a response (the worker is then killed, and a fresh
+ * one started on the next request).
+ */
+export function requestWorker(method, params = {}, timeoutMs = REQUEST_TIMEOUT_MS) {
+    const child = startWorker();
+    const id = nextId++;
+
+    return new Promise((resolve, reject) => {
+        const timer = setTimeout(() => {
+            if (!pending.has(id)) return;
+            pending.delete(id);
+            reject(new Error(`Python worker did not answer ${method} within ${timeoutMs / 1000}s`));
+            // The worker handles one request at a time, so everything queued behind it is stuck too
+            console.error(`Python worker timed out on ${method}, restarting it`);
+            if (worker === child) worker = null;
+            rejectPending(child, 'Python worker was restarted after a request timed out');
+            child.kill();
+        }, timeoutMs);
+        const settle = (callback) => (value) => {
+            clearTimeout(timer);
+            callback(value);
+        };
+
+        pending.set(id, { resolve: settle(resolve), reject: settle(reject), child });
+        child.stdin.write(JSON.stringify({ id, method, params }) + '\n', (error) => {
+            if (error && pending.has(id)) {
+                pending.delete(id);
+                clearTimeout(timer);
+                reject(error);
+            }
+        });
+    });
+}
+
+/**
+ * Ask the worker to exit (it is started again on the next request)
+ */
+export function stopWorker() {
+    if (!worker) return;
+    const child = worker;
+    worker = null;
+    child.stdin.end(JSON.stringify({ id: 0, method: 'shutdown' }) + '\n');
+    setTimeout(() => {
+        if (child.exitCode === null) child.kill();
+    }, 2000).unref();
+}